@@ -0,0 +1,160 @@
+# =========================================================
+# build_speed_profile.py
+# - traffic_ts/*.bin 수집 이력 → 시간대(5분 버킷, KST) 속도 프로파일
+#   · links.npy : (링크 x 288) float16  (표본 없는 칸은 NaN)
+#   · areas.npy : (권역 + 1 x 288) float16, 마지막 행 = 전체 평균. 빈 칸 없음
+#   · grid.npy  : (격자 행 x 열) int32 → 권역 행 번호 (링크가 없는 칸은 가장 가까운 권역)
+#   · link_grid.npy : 잘게 나눈 격자(PROFILE_LINK_CELL_DEG) 칸 → 가장 가까운 링크 행 번호
+#                     (표본 있는 링크만, PROFILE_LINK_MAX_KM 보다 멀면 -1 → 권역 속도 사용)
+#   · meta.json : link_ids / 격자 원점·크기 / 생성 시각  (마지막에 써서 버전 역할)
+# - 권역 = PROFILE_CELL_DEG 격자 칸, 링크 좌표 = link_map.tsv 에서 그 링크에 붙은 충전소 좌표 평균
+# - 수집기 없이(API 키 없이) 돌아감: 경로/시계열 읽기는 traffic_store.py
+# - 백엔드 services/speed_profile.py 가 np.load(mmap_mode="r") 로 읽음 → 조회 O(1)
+# =========================================================
+import csv
+import json
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+
+from traffic_store import DATA_DIR, IN_LINK_MAP, TS_DIR, read_timeseries
+
+OUT_DIR = DATA_DIR / "speed_profile"
+BUCKET_MIN = 5
+N_BUCKETS = 24 * 60 // BUCKET_MIN
+CELL_DEG = float(os.getenv("PROFILE_CELL_DEG", "0.01"))  # 약 1km
+LINK_CELL_DEG = float(os.getenv("PROFILE_LINK_CELL_DEG", "0.002"))  # 약 200m
+LINK_MAX_KM = float(os.getenv("PROFILE_LINK_MAX_KM", "0.5"))
+KM_PER_DEG = 111.0
+KST_OFFSET_S = 9 * 3600
+
+
+def _link_coords():
+    """link_id → (lat, lon) : 링크에 붙은 충전소 좌표 평균"""
+    acc = {}
+    with open(IN_LINK_MAP, encoding="utf-8") as f:
+        for r in csv.DictReader(f, delimiter="\t"):
+            try:
+                lat, lon = float(r["lat"]), float(r["lon"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            a = acc.setdefault(r["link_id"], [0.0, 0.0, 0])
+            a[0] += lat; a[1] += lon; a[2] += 1
+    return {l: (a[0] / a[2], a[1] / a[2]) for l, a in acc.items()}
+
+
+def _fill_circular(row: np.ndarray) -> np.ndarray:
+    """하루 주기로 보고 NaN 칸을 양옆 값으로 선형 보간"""
+    ok = np.isfinite(row)
+    if ok.all() or not ok.any():
+        return row
+    x = np.arange(len(row))
+    xp = x[ok]
+    return np.interp(x, np.r_[xp - len(row), xp, xp + len(row)], np.r_[row[ok], row[ok], row[ok]])
+
+
+def _nearest_link_grid(lat, lon, has_data, lat0, lon0, H, W):
+    """잘게 나눈 격자 칸 중심 → 가장 가까운 (표본 있는) 링크 행 번호, LINK_MAX_KM 넘으면 -1"""
+    rows = int(np.ceil(H * CELL_DEG / LINK_CELL_DEG))
+    cols = int(np.ceil(W * CELL_DEG / LINK_CELL_DEG))
+    out = np.full(rows * cols, -1, dtype=np.int32)
+    cand = np.flatnonzero(has_data)
+    if len(cand) == 0:
+        return out.reshape(rows, cols)
+
+    kx = KM_PER_DEG * np.cos(np.radians(float(lat.mean())))  # 경도 1도 ≈ kx km
+    ly, lx = lat[cand] * KM_PER_DEG, lon[cand] * kx
+    gy, gx = np.divmod(np.arange(rows * cols), cols)
+    cy = (lat0 + (gy + 0.5) * LINK_CELL_DEG) * KM_PER_DEG
+    cx = (lon0 + (gx + 0.5) * LINK_CELL_DEG) * kx
+    step = max(1, 4_000_000 // len(cand))  # (칸 x 링크) 거리 행렬 크기 상한
+    for s in range(0, len(cy), step):
+        d2 = (cy[s:s + step, None] - ly[None, :]) ** 2 + (cx[s:s + step, None] - lx[None, :]) ** 2
+        j = np.argmin(d2, axis=1)
+        near = d2[np.arange(len(j)), j] <= LINK_MAX_KM ** 2
+        out[s:s + step] = np.where(near, cand[j], -1)
+    return out.reshape(rows, cols)
+
+
+def _save(path: Path, arr: np.ndarray):
+    tmp = path.with_name(path.name + ".tmp.npy")
+    np.save(tmp, arr)
+    os.replace(tmp, path)
+
+
+def build(out_dir: Path = OUT_DIR):
+    coords = _link_coords()
+    link_ids = sorted(coords)
+    index = {int(l): i for i, l in enumerate(link_ids) if l.isdigit()}
+    L = len(link_ids)
+
+    # (링크, 버킷) 합/개수 → 평균
+    sums = np.zeros(L * N_BUCKETS)
+    cnts = np.zeros(L * N_BUCKETS)
+    samples = 0
+    for part in sorted(TS_DIR.glob("*.bin")):
+        rec = read_timeseries(part)
+        ok = np.isfinite(rec["speed"]) & (rec["speed"] > 0)
+        rec = rec[ok]
+        li = np.fromiter((index.get(int(x), -1) for x in rec["link_id"]), dtype=np.int64, count=len(rec))
+        keep = li >= 0
+        b = ((rec["ts"][keep] + KST_OFFSET_S) % 86400) // (BUCKET_MIN * 60)
+        flat = li[keep] * N_BUCKETS + b
+        sums += np.bincount(flat, weights=rec["speed"][keep].astype(np.float64), minlength=L * N_BUCKETS)
+        cnts += np.bincount(flat, minlength=L * N_BUCKETS)
+        samples += int(keep.sum())
+    sums = sums.reshape(L, N_BUCKETS)
+    cnts = cnts.reshape(L, N_BUCKETS)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        links = sums / cnts
+
+    # 격자 권역
+    lat = np.array([coords[l][0] for l in link_ids])
+    lon = np.array([coords[l][1] for l in link_ids])
+    lat0, lon0 = float(lat.min()) - CELL_DEG, float(lon.min()) - CELL_DEG
+    H = int((lat.max() - lat0) // CELL_DEG) + 2
+    W = int((lon.max() - lon0) // CELL_DEG) + 2
+    cell = ((lat - lat0) // CELL_DEG).astype(np.int64) * W + ((lon - lon0) // CELL_DEG).astype(np.int64)
+    used, area_of_link = np.unique(cell, return_inverse=True)
+    A = len(used)
+
+    # 권역 프로파일 = 권역 안 링크들의 표본 가중 평균, 빈 칸은 전체 평균 → 전체 평균은 하루 주기 보간
+    a_sum = np.zeros((A, N_BUCKETS)); a_cnt = np.zeros((A, N_BUCKETS))
+    np.add.at(a_sum, area_of_link, sums)
+    np.add.at(a_cnt, area_of_link, cnts)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        glob = _fill_circular(sums.sum(axis=0) / cnts.sum(axis=0))
+        areas = a_sum / a_cnt
+    areas = np.where(np.isfinite(areas), areas, glob[None, :])
+    areas = np.vstack([areas, glob[None, :]])
+
+    # 격자 칸 → 권역 (빈 칸은 중심이 가장 가까운 권역)
+    cy, cx = np.divmod(used, W)
+    gy, gx = np.divmod(np.arange(H * W), W)
+    nearest = np.argmin((gy[:, None] - cy[None, :]) ** 2 + (gx[:, None] - cx[None, :]) ** 2, axis=1)
+    grid = nearest.astype(np.int32).reshape(H, W)
+    link_grid = _nearest_link_grid(lat, lon, (cnts > 0).any(axis=1), lat0, lon0, H, W)
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    _save(out_dir / "links.npy", links.astype(np.float16))
+    _save(out_dir / "areas.npy", areas.astype(np.float16))
+    _save(out_dir / "grid.npy", grid)
+    _save(out_dir / "link_grid.npy", link_grid)
+    meta = {
+        "link_ids": link_ids,
+        "lat0": lat0, "lon0": lon0, "cellDeg": CELL_DEG, "rows": H, "cols": W,
+        "linkCellDeg": LINK_CELL_DEG, "linkRows": int(link_grid.shape[0]), "linkCols": int(link_grid.shape[1]),
+        "bucketMin": BUCKET_MIN, "areas": A, "samples": samples, "builtAt": int(time.time()),
+    }
+    tmp = out_dir / "meta.json.tmp"
+    tmp.write_text(json.dumps(meta), encoding="utf-8")
+    os.replace(tmp, out_dir / "meta.json")
+    return meta
+
+
+if __name__ == "__main__":
+    m = build()
+    print(f"[OK] speed profile: links={len(m['link_ids'])} areas={m['areas']} grid={m['rows']}x{m['cols']} "
+          f"samples={m['samples']} → {OUT_DIR}")
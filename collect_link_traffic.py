@@ -3,6 +3,24 @@
 # - link_map.tsv -> unique LINK_ID
 # - 서울시 TrafficInfo (XML) 호출
 # - link_traffic.tsv 생성
+# - httpx.AsyncClient(연결 재사용) + 토큰 버킷(초당 호출 수) + 동시 요청 수 제한
+# - HTTP 오류 / ERROR-* 결과는 지수 backoff(+jitter)로 재시도, 상태별 카운터 출력
+# - bulk 모드(기본): START..END 페이지 단위로 전체를 받아 XMLPullParser(iterparse)로 흘려 읽고
+#   link_map.tsv 에 있는 link_id만 남김 → 페이지에서 빠진 링크만 링크별 호출
+#   (TRAFFIC_MODE=link 이면 예전처럼 전부 링크별 호출)
+# - SEOUL_API_BASE 로 로컬 stub 서버에 붙여 테스트 가능
+# - `python collect_link_traffic.py daemon` : TRAFFIC_INTERVAL_S 마다 반복 수집
+#   · link_traffic.tsv 는 tmp 파일에 쓰고 os.replace → 백엔드는 반쯤 쓴 파일을 볼 일이 없고
+#     mtime 이 바뀌는 것으로 새 버전을 알아챈다(main.refresh_twins / road_graph)
+#   · 시계열: traffic_ts/YYYYMMDDHH.bin (KST 시간 단위) 에 (link_id, ts, speed, travel_time) 레코드 append
+#   · 보존: TRAFFIC_TS_RETENTION_DAYS 지난 파티션 / TRAFFIC_TS_MAX_MB 넘는 오래된 파티션 삭제
+#   · 경로/저장 형식은 traffic_store.py (API 키 없이 쓰는 link_baseline / build_speed_profile 과 공유)
+#   · 받은 속도는 모두 링크별 P² 스케치(link_baseline.py)에 넣고 link_baseline.npz 로 저장
+#     → 백엔드가 링크·시간대별 자유주행 속도 대비 혼잡도를 계산
+# - `python collect_link_traffic.py adaptive` : 링크별 수집 주기를 다르게 (PollScheduler)
+#   · 백엔드 GET /traffic/priority 의 hot/warm 링크(DOWN·CRITICAL 충전기, 최근 autopilot top-K)는 자주,
+#     나머지는 드물게. 속도 변동이 큰 링크는 주기를 더 줄임
+#   · due 시각 힙에서 때가 된 링크만 꺼내 호출. 꺼낸 수가 bulk 1회 비용(페이지+stragglers) 이상이면 bulk
 # =========================================================
 
 # ===== .env 로드 =====
@@ -20,62 +38,94 @@ for p in ENV_PATHS:
         load_dotenv(p)
         break
 
-SEOUL_API_KEY = os.getenv("SEOUL_API_KEY")
-print("SEOUL_API_KEY =", repr(SEOUL_API_KEY))
-
-if not SEOUL_API_KEY:
-    raise SystemExit("SEOUL_API_KEY 환경변수(.env) 설정 필요")
+SEOUL_API_KEY = os.getenv("SEOUL_API_KEY")  # 검사는 main() 에서 (import 만으로는 종료하지 않음 → 테스트/재사용 가능)
 # =====================
 
+import asyncio
 import csv
+import heapq
+import math
+import random
+import sys
 import time
-import requests
+from collections import Counter
+import httpx
+
+from link_baseline import P2Sketches
+from traffic_store import (  # 경로 / 시계열 저장 (API 키 없이 쓰는 오프라인 스크립트와 공유)
+    BASE_DIR, DATA_DIR, IN_LINK_MAP, OUT_TRAFFIC, TS_DIR, BASELINE_PATH, KST, TS_DTYPE,
+    RETENTION_DAYS, MAX_TS_MB, _float, write_traffic_tsv, append_timeseries, read_timeseries, apply_retention,
+)
 import xml.etree.ElementTree as ET
-from pathlib import Path
 
 # -------------------------
-# 경로
+# 데몬
 # -------------------------
-BASE_DIR = Path(r"D:\DigitalTwin\ev-twin-ai-demo")
-DATA_DIR = BASE_DIR / "data"
+INTERVAL_S = float(os.getenv("TRAFFIC_INTERVAL_S", "300"))
+BASELINE_SAVE_S = float(os.getenv("TRAFFIC_BASELINE_SAVE_S", "60"))  # adaptive 모드 저장 간격
 
-IN_LINK_MAP = DATA_DIR / "link_map.tsv"
-OUT_TRAFFIC = DATA_DIR / "link_traffic.tsv"
+# -------------------------
+# adaptive 모드 (링크 우선순위별 수집 주기)
+# -------------------------
+BACKEND_URL = os.getenv("EV_TWIN_BACKEND_URL", "http://127.0.0.1:8000")
+PRIORITY_REFRESH_S = float(os.getenv("TRAFFIC_PRIORITY_REFRESH_S", "60"))
+TIER_INTERVAL_S = {  # 2 = hot, 1 = warm, 0 = cold
+    2: float(os.getenv("TRAFFIC_HOT_INTERVAL_S", "60")),
+    1: float(os.getenv("TRAFFIC_WARM_INTERVAL_S", "300")),
+    0: float(os.getenv("TRAFFIC_COLD_INTERVAL_S", "1800")),
+}
+TIER_NAMES = {2: "hot", 1: "warm", 0: "cold"}
+# 변동이 커도 이보다 자주는 안 함. 단 가장 짧은 tier 주기보다 길게 잡히지는 않는다 (설정한 주기를 덮어쓰지 않게)
+MIN_INTERVAL_S = min(float(os.getenv("TRAFFIC_MIN_INTERVAL_S", "30")), min(TIER_INTERVAL_S.values()))
+VOL_ALPHA = 0.3   # 속도 변동 EWMA
+VOL_GAIN = 4.0    # 주기 = tier 주기 / (1 + VOL_GAIN * 변동)  (변동 0.25 → 절반)
+TICK_S = 5.0
 
 # -------------------------
 # 서울시 TrafficInfo API
 # -------------------------
-API_BASE = "http://openapi.seoul.go.kr:8088"
+API_BASE = os.getenv("SEOUL_API_BASE", "http://openapi.seoul.go.kr:8088")
 SERVICE = "TrafficInfo"
 TYPE = "xml"          # ✅ 핵심
 START = 1
 END = 1
+PAGE_SIZE = int(os.getenv("TRAFFIC_PAGE_SIZE", "1000"))  # 서울 열린데이터 1회 최대 1000건
+MODE = os.getenv("TRAFFIC_MODE", "bulk")                 # bulk | link
+
+# -------------------------
+# 호출 제한 (API 쿼터에 맞춰 조정)
+# -------------------------
+RATE_PER_SEC = float(os.getenv("TRAFFIC_RATE_PER_SEC", "100"))   # 토큰 버킷 충전 속도
+BURST = int(os.getenv("TRAFFIC_BURST", "20"))                    # 토큰 버킷 크기
+CONCURRENCY = int(os.getenv("TRAFFIC_CONCURRENCY", "32"))         # 동시 요청 수
+MAX_RETRIES = int(os.getenv("TRAFFIC_MAX_RETRIES", "3"))
+BACKOFF_BASE_S = 0.5
+TIMEOUT_S = 10.0
+
+
+def _url(link_id: str) -> str:
+    return f"{API_BASE}/{SEOUL_API_KEY}/{TYPE}/{SERVICE}/{START}/{END}/{link_id}"
 
 
-def fetch_traffic_xml(link_id: str):
+def _page_url(start: int, end: int) -> str:
+    return f"{API_BASE}/{SEOUL_API_KEY}/{TYPE}/{SERVICE}/{start}/{end}/"
+
+
+def parse_traffic_xml(text: str):
     """
     return:
       (dict, "OK")
       (None, "INFO-200")
-      (None, "ERROR-xxx")
+      (None, "ERROR-xxx:메시지")
     """
-    url = f"{API_BASE}/{SEOUL_API_KEY}/{TYPE}/{SERVICE}/{START}/{END}/{link_id}"
-
-    try:
-        r = requests.get(url, timeout=10)
-    except Exception as e:
-        return None, f"REQUEST_FAIL:{e}"
-
-    if r.status_code != 200:
-        return None, f"HTTP_{r.status_code}"
-
     try:
-        root = ET.fromstring(r.text)
+        root = ET.fromstring(text)
     except Exception:
         return None, "XML_PARSE_FAIL"
 
     # RESULT 코드 확인
-    result = root.find(".//RESULT")
+    # 오류/데이터 없음 응답은 <RESULT> 가 루트
+    result = root if root.tag == "RESULT" else root.find(".//RESULT")
     if result is not None:
         code = result.findtext("CODE")
         msg = result.findtext("MESSAGE")
@@ -98,7 +148,221 @@ def fetch_traffic_xml(link_id: str):
     }, "OK"
 
 
-def main():
+def _retryable(status: str) -> bool:
+    return status.startswith(("REQUEST_FAIL", "HTTP_", "ERROR-"))
+
+
+class TokenBucket:
+    """초당 rate개 토큰, 최대 burst개까지 적립. acquire()는 토큰이 생길 때까지 대기"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.t = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.t) * self.rate)
+                self.t = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+async def _with_retries(bucket: TokenBucket, stats: Counter, once):
+    """
+    once() → (data, status). 재시도 가능한 실패(요청 실패/HTTP 오류/ERROR-*)는
+    BACKOFF_BASE_S * 2^n (+jitter) 뒤에 MAX_RETRIES번까지 다시 호출
+    """
+    for attempt in range(MAX_RETRIES + 1):
+        await bucket.acquire()
+        try:
+            data, status = await once()
+        except Exception as e:
+            data, status = None, f"REQUEST_FAIL:{type(e).__name__}"
+
+        if not _retryable(status) or attempt == MAX_RETRIES:
+            return data, status
+        stats["retry"] += 1
+        await asyncio.sleep(BACKOFF_BASE_S * (2 ** attempt) * (0.5 + random.random()))
+
+
+async def fetch_traffic_xml_async(client: httpx.AsyncClient, bucket: TokenBucket, link_id: str, stats: Counter):
+    """링크 1개 조회 (START=1/END=1)"""
+
+    async def once():
+        r = await client.get(_url(link_id))
+        if r.status_code != 200:
+            return None, f"HTTP_{r.status_code}"
+        return parse_traffic_xml(r.text)
+
+    return await _with_retries(bucket, stats, once)
+
+
+async def fetch_traffic_page_async(
+    client: httpx.AsyncClient, bucket: TokenBucket, start: int, end: int, wanted: set, stats: Counter
+):
+    """
+    START..END 페이지 1개를 스트리밍으로 파싱.
+    return ({"rows": {link_id: {speed, travel_time}}, "total": list_total_count}, "OK") | (None, 상태)
+    wanted 에 없는 row는 바로 버린다(elem.clear) → 페이지가 커도 메모리 일정
+    """
+
+    async def once():
+        parser = ET.XMLPullParser(events=("end",))
+        rows, total, code, msg = {}, None, None, None
+        async with client.stream("GET", _page_url(start, end)) as r:
+            if r.status_code != 200:
+                return None, f"HTTP_{r.status_code}"
+            try:
+                async for chunk in r.aiter_bytes():
+                    parser.feed(chunk)
+                    for _, el in parser.read_events():
+                        if el.tag == "row":
+                            link_id = el.findtext("link_id")
+                            if link_id in wanted:
+                                rows[link_id] = {
+                                    "speed": el.findtext("prcs_spd"),
+                                    "travel_time": el.findtext("prcs_trv_time"),
+                                }
+                            el.clear()
+                        elif el.tag == "list_total_count":
+                            total = int(el.text or 0)
+                        elif el.tag == "CODE":
+                            code = el.text
+                        elif el.tag == "MESSAGE":
+                            msg = el.text
+                parser.close()
+            except ET.ParseError:
+                return None, "XML_PARSE_FAIL"
+
+        if code == "INFO-200":
+            return None, "INFO-200"
+        if code is not None and code != "INFO-000":
+            return None, f"{code}:{msg}"
+        return {"rows": rows, "total": total}, "OK"
+
+    return await _with_retries(bucket, stats, once)
+
+
+async def collect_traffic(
+    link_ids,
+    rate: float = RATE_PER_SEC,
+    burst: int = BURST,
+    concurrency: int = CONCURRENCY,
+    bucket: TokenBucket = None,
+    transport: httpx.AsyncBaseTransport = None,
+):
+    """
+    bucket 을 넘기면 그 토큰 버킷을 같이 쓴다 (adaptive 모드: 여러 번 호출해도 전체 호출 속도 유지)
+    transport: httpx.AsyncClient 에 그대로 넘김 (테스트에서 httpx.MockTransport)
+    return (out_rows, 상태별 카운터)
+    카운터 키: OK / INFO-200 / NO_ROW / XML_PARSE_FAIL / HTTP_xxx / ERROR-xxx / REQUEST_FAIL / retry
+    """
+    stats: Counter = Counter()
+    out_rows = []
+    bucket = bucket or TokenBucket(rate, burst)
+    queue: asyncio.Queue = asyncio.Queue()
+    for link_id in link_ids:
+        queue.put_nowait(link_id)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=httpx.Timeout(TIMEOUT_S), transport=transport) as client:
+
+        async def worker():
+            while True:
+                try:
+                    link_id = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                data, status = await fetch_traffic_xml_async(client, bucket, link_id, stats)
+                stats[status.split(":")[0]] += 1
+                if status == "OK" and data:
+                    out_rows.append({
+                        "link_id": link_id,
+                        "speed": data["speed"],
+                        "travel_time": data["travel_time"],
+                    })
+                done = sum(v for k, v in stats.items() if k != "retry")
+                if done % 500 == 0 or done == len(link_ids):
+                    print(f"[CALL] {done}/{len(link_ids)} {dict(stats)}")
+
+        await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+
+    out_rows.sort(key=lambda r: r["link_id"])
+    return out_rows, stats
+
+
+async def collect_traffic_bulk(
+    link_ids,
+    page_size: int = PAGE_SIZE,
+    rate: float = RATE_PER_SEC,
+    burst: int = BURST,
+    concurrency: int = CONCURRENCY,
+    bucket: TokenBucket = None,
+    transport: httpx.AsyncBaseTransport = None,
+):
+    """
+    1페이지로 list_total_count 를 알아낸 뒤 나머지 페이지를 동시에 받는다.
+    페이지에서 못 찾은 링크(stragglers)만 collect_traffic 으로 링크별 호출.
+    return (out_rows, 상태별 카운터)  (페이지 상태는 "page:" 접두어)
+    """
+    wanted = set(link_ids)
+    stats: Counter = Counter()
+    found = {}
+    bucket = bucket or TokenBucket(rate, burst)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=httpx.Timeout(TIMEOUT_S), transport=transport) as client:
+        sem = asyncio.Semaphore(max(1, concurrency))
+
+        async def page(start: int, end: int):
+            async with sem:
+                data, status = await fetch_traffic_page_async(client, bucket, start, end, wanted, stats)
+            stats["page:" + status.split(":")[0]] += 1
+            if data:
+                found.update(data["rows"])
+            return data
+
+        first = await page(1, page_size)
+        total = (first or {}).get("total") or 0
+        await asyncio.gather(*(page(s, min(s + page_size - 1, total)) for s in range(page_size + 1, total + 1, page_size)))
+
+    stragglers = sorted(wanted - found.keys())
+    print(f"[BULK] total={total} pages={sum(v for k, v in stats.items() if k.startswith('page:'))} "
+          f"matched={len(found)}/{len(wanted)} stragglers={len(stragglers)}")
+
+    out_rows = [{"link_id": k, **v} for k, v in found.items()]
+    if stragglers:
+        rows, link_stats = await collect_traffic(stragglers, concurrency=concurrency, bucket=bucket, transport=transport)
+        out_rows += rows
+        stats.update(link_stats)
+
+    out_rows.sort(key=lambda r: r["link_id"])
+    return out_rows, stats
+
+
+_BASELINE = {"sk": None, "saved": 0.0}
+
+
+def feed_baseline(out_rows, ts: int, force_save: bool = True):
+    """수집 결과를 링크 기준선 스케치에 넣고 (force_save 또는 BASELINE_SAVE_S 지났으면) 저장"""
+    if _BASELINE["sk"] is None:
+        _BASELINE["sk"] = P2Sketches.load(BASELINE_PATH)
+    sk = _BASELINE["sk"]
+    sk.update([r["link_id"] for r in out_rows], [_float(r["speed"]) for r in out_rows], ts)
+    now = time.monotonic()
+    if force_save or now - _BASELINE["saved"] >= BASELINE_SAVE_S:
+        sk.save(BASELINE_PATH)
+        _BASELINE["saved"] = now
+
+
+def load_link_ids():
     if not IN_LINK_MAP.exists():
         raise SystemExit(f"입력 파일 없음: {IN_LINK_MAP}")
 
@@ -109,34 +373,198 @@ def main():
 
     unique_links = sorted({r["link_id"] for r in rows})
     print(f"[OK] unique link_id: {len(unique_links)}")
+    return unique_links
 
-    out_rows = []
 
-    for i, link_id in enumerate(unique_links, 1):
-        data, status = fetch_traffic_xml(link_id)
+async def sweep_once(unique_links, keep_history: bool = True):
+    """수집 1회 → link_traffic.tsv 원자적 교체 + 시계열 append. 결과가 0건이면 이전 스냅샷 유지"""
+    collect = collect_traffic_bulk if MODE == "bulk" else collect_traffic
+    t0 = time.perf_counter()
+    ts = int(time.time())
+    out_rows, stats = await collect(unique_links)
+    print(f"[OK] {time.perf_counter() - t0:.1f}s status={dict(stats)}")
 
-        print(f"[CALL] {i}/{len(unique_links)} {link_id} {status}")
+    if not out_rows:
+        print("[WARN] 수집 결과 0건 → link_traffic.tsv 유지")
+        return out_rows, stats
+
+    feed_baseline(out_rows, ts)  # 스냅샷보다 먼저 → 백엔드가 새 스냅샷을 볼 때 기준선도 최신
+    write_traffic_tsv(OUT_TRAFFIC, out_rows)
+    print(f"[OK] saved: {OUT_TRAFFIC} rows={len(out_rows)}")
+    if keep_history:
+        part = append_timeseries(out_rows, ts)
+        removed = apply_retention(ts)
+        print(f"[OK] timeseries: {part.name} (+{len(out_rows)}) retention_removed={removed}")
+    return out_rows, stats
+
+
+async def run_daemon(unique_links, interval_s: float = INTERVAL_S):
+    """interval_s 간격(시작 시각 기준)으로 sweep_once 반복. 한 번 실패해도 다음 주기에 다시 시도"""
+    while True:
+        t0 = time.monotonic()
+        try:
+            await sweep_once(unique_links)
+        except Exception as e:
+            print(f"[ERR] sweep failed: {type(e).__name__}: {e}")
+        await asyncio.sleep(max(0.0, interval_s - (time.monotonic() - t0)))
+
+
+class PollScheduler:
+    """링크별 다음 수집 시각(due) 힙. 재스케줄은 새 항목 push + 옛 항목은 꺼낼 때 버림(lazy)"""
+
+    def __init__(self, link_ids, now: float):
+        self.tier = {l: 0 for l in link_ids}
+        self.vol = {}
+        self.last_speed = {}
+        self.last_poll = {}
+        self.due = {}
+        self.heap = []
+        for l in link_ids:
+            self._push(l, now)  # 처음엔 전부 바로
+
+    def _push(self, link_id: str, due: float):
+        self.due[link_id] = due
+        heapq.heappush(self.heap, (due, link_id))
+
+    def interval(self, link_id: str) -> float:
+        base = TIER_INTERVAL_S[self.tier[link_id]]
+        return max(MIN_INTERVAL_S, base / (1.0 + VOL_GAIN * self.vol.get(link_id, 0.0)))
+
+    def set_tiers(self, hot: set, warm: set, now: float):
+        for l, old in self.tier.items():
+            t = 2 if l in hot else 1 if l in warm else 0
+            if t == old:
+                continue
+            self.tier[l] = t
+            # 뜨거워진 링크는 다음 수집을 앞당긴다 (식은 링크는 다음 수집 후 새 주기)
+            new_due = max(now, self.last_poll.get(l, now) + self.interval(l))
+            if new_due < self.due[l]:
+                self._push(l, new_due)
+
+    def observe(self, link_id: str, speed: float):
+        if link_id not in self.tier or math.isnan(speed):
+            return
+        prev = self.last_speed.get(link_id)
+        if prev is not None:
+            change = abs(speed - prev) / max(prev, 1.0)
+            self.vol[link_id] = (1 - VOL_ALPHA) * self.vol.get(link_id, 0.0) + VOL_ALPHA * change
+        self.last_speed[link_id] = speed
+
+    def pop_due(self, now: float):
+        out = []
+        while self.heap and self.heap[0][0] <= now:
+            d, l = heapq.heappop(self.heap)
+            if self.due.get(l) == d:
+                out.append(l)
+        return out
+
+    def polled(self, link_ids, now: float):
+        for l in link_ids:
+            if l in self.tier:
+                self.last_poll[l] = now
+                self._push(l, now + self.interval(l))
+
+    def next_due(self):
+        while self.heap and self.due.get(self.heap[0][1]) != self.heap[0][0]:
+            heapq.heappop(self.heap)
+        return self.heap[0][0] if self.heap else None
+
+
+def _read_snapshot():
+    if not OUT_TRAFFIC.exists():
+        return {}
+    with open(OUT_TRAFFIC, encoding="utf-8") as f:
+        return {r["link_id"]: r for r in csv.DictReader(f, delimiter="\t")}
+
+
+async def fetch_priorities(client: httpx.AsyncClient):
+    """백엔드 GET /traffic/priority → (hot, warm) 링크 집합. 실패하면 None (이전 tier 유지)"""
+    try:
+        r = await client.get(f"{BACKEND_URL}/traffic/priority")
+        r.raise_for_status()
+        j = r.json()
+        return set(j.get("hot") or []), set(j.get("warm") or [])
+    except Exception as e:
+        print(f"[WARN] priority fetch failed: {type(e).__name__}")
+        return None
 
-        if status == "OK" and data:
-            out_rows.append({
-                "link_id": link_id,
-                "speed": data["speed"],
-                "travel_time": data["travel_time"],
-            })
 
-        time.sleep(0.05)  # 과호출 방지
+async def run_adaptive(unique_links, tick_s: float = TICK_S):
+    """
+    우선순위 기반 수집 루프. 스냅샷은 링크별 최신값을 합쳐 원자적으로 교체,
+    시계열에는 이번에 받은 링크만 append
+    """
+    latest = _read_snapshot()
+    bucket = TokenBucket(RATE_PER_SEC, BURST)
+    sched = PollScheduler(unique_links, time.time())
+    bulk_cost = None  # 마지막 bulk 1회의 호출 수 (페이지 + stragglers)
+    next_prio = 0.0
+    polled_by_tier: Counter = Counter()
+
+    async with httpx.AsyncClient(timeout=httpx.Timeout(5.0)) as api:
+        while True:
+            now = time.time()
+            if now >= next_prio:
+                pr = await fetch_priorities(api)
+                if pr is not None:
+                    sched.set_tiers(pr[0], pr[1], now)
+                    print(f"[PRIO] hot={len(pr[0])} warm={len(pr[1])}")
+                next_prio = now + PRIORITY_REFRESH_S
+
+            due = sched.pop_due(now)
+            if due:
+                for l in due:
+                    polled_by_tier[TIER_NAMES[sched.tier[l]]] += 1
+                try:
+                    if bulk_cost is None or len(due) >= bulk_cost:
+                        rows, stats = await collect_traffic_bulk(unique_links, bucket=bucket)
+                        bulk_cost = max(1, sum(v for k, v in stats.items() if k != "retry"))
+                        polled = unique_links
+                    else:
+                        rows, stats = await collect_traffic(due, bucket=bucket)
+                        polled = due
+                    for r in rows:
+                        sched.observe(r["link_id"], _float(r["speed"]))
+                    sched.polled(polled, now)
+                    if rows:
+                        for r in rows:
+                            latest[r["link_id"]] = r
+                        feed_baseline(rows, int(now), force_save=False)
+                        write_traffic_tsv(OUT_TRAFFIC, [latest[k] for k in sorted(latest)])
+                        append_timeseries(rows, int(now))
+                        apply_retention(int(now))
+                    print(f"[ADAPTIVE] due={len(due)} fetched={len(rows)} bulk_cost={bulk_cost} "
+                          f"polled_by_tier={dict(polled_by_tier)}")
+                except Exception as e:
+                    print(f"[ERR] poll failed: {type(e).__name__}: {e}")
+                    sched.polled(due, now)
+
+            nd = sched.next_due()
+            wait = min(tick_s, next_prio - time.time(), (nd - time.time()) if nd is not None else tick_s)
+            await asyncio.sleep(max(0.2, wait))
 
-    OUT_TRAFFIC.parent.mkdir(parents=True, exist_ok=True)
-    with open(OUT_TRAFFIC, "w", encoding="utf-8", newline="") as f:
-        w = csv.DictWriter(
-            f,
-            fieldnames=["link_id", "speed", "travel_time"],
-            delimiter="\t"
-        )
-        w.writeheader()
-        w.writerows(out_rows)
 
-    print(f"[OK] saved: {OUT_TRAFFIC} rows={len(out_rows)}")
+def main():
+    print("SEOUL_API_KEY =", repr(SEOUL_API_KEY))
+    if not SEOUL_API_KEY:
+        raise SystemExit("SEOUL_API_KEY 환경변수(.env) 설정 필요")
+
+    unique_links = load_link_ids()
+    if len(sys.argv) > 1 and sys.argv[1] == "adaptive":
+        print(f"[ADAPTIVE] intervals={TIER_INTERVAL_S} backend={BACKEND_URL}")
+        try:
+            asyncio.run(run_adaptive(unique_links))
+        except KeyboardInterrupt:
+            print("[ADAPTIVE] stopped")
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == "daemon":
+        print(f"[DAEMON] interval={INTERVAL_S}s retention={RETENTION_DAYS}d max={MAX_TS_MB}MB")
+        try:
+            asyncio.run(run_daemon(unique_links))
+        except KeyboardInterrupt:
+            print("[DAEMON] stopped")
+        return
+    asyncio.run(sweep_once(unique_links, keep_history=False))
 
 
 if __name__ == "__main__":
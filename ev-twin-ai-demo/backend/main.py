@@ -1,25 +1,56 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+from contextlib import asynccontextmanager
 import random
 import math
 import asyncio
 import json
 import uuid
 
-from services.sim_procurement import ProcurementSimRequest, run_procurement_sim
-from services.agent import AgentRunRequest, run_agent
-from services.procurement_agent import ProcurementAgentRequest, recommend_provider
+from services.sim_procurement import (
+    ProcurementSimRequest,
+    run_procurement_sim,
+    ProcurementReplicationRequest,
+    run_procurement_replications,
+)
+from services.agent import AgentRunRequest, run_agent_async, AgentBatchRunRequest, run_agent_batch_async
+from services.sim_crew_queue import CrewQueueSimRequest, run_crew_queue_sim
+from services.procurement_agent import ProcurementAgentRequest, recommend_provider, recommend_provider_stream
 from services.fleet_agent import (
     FleetPrioritizeRequest,
     prioritize_fleet,
     FleetRouteRequest,
     plan_route,
+    prioritize_fleet_stream,
+    plan_route_stream,
 )
+from services.sim_sweep import ProcurementSweepRequest, run_procurement_sweep
+from services.depot_location import DepotPlacementRequest, place_depots
+from services.dispatch_planner import DispatchPlanRequest, plan_dispatch
 from services.autopilot_agent import AutopilotRequest, run_autopilot
-from services.autopilot_explain import AutopilotExplainRequest, explain_autopilot
+from services.autopilot_explain import AutopilotExplainRequest, explain_autopilot_async, explain_autopilot_stream
+from services.road_graph import RoadEtaRequest, road_eta
+from services.distance_matrix import cache_stats as distance_cache_stats
+from services.result_cache import RESULT_CACHE
+from services.llm_cache import LLM_CACHE
+from services.llm_client import warm_up as llm_warm_up
+from services.llm_telemetry import LLM_TELEMETRY
+from services.traffic_priority import link_priorities, note_autopilot_top
+from services.traffic_baseline import baseline_version, freeflow_kmh
+from services.speed_profile import load_speed_profile, profile_version
+from services.llm_budget import MAX_INPUT_TOKENS, LATENCY_BUDGET_MS
+from services.sim_jobs import (
+    ProcurementSimJobRequest,
+    ProcurementRecommendJobRequest,
+    submit_procurement_sim_job,
+    submit_recommend_job,
+    get_job,
+    cancel_job,
+    job_events,
+)
 
 
 from pathlib import Path
@@ -28,7 +59,14 @@ from dotenv import load_dotenv
 ENV_PATH = Path(__file__).resolve().parents[2] / ".env"
 load_dotenv(ENV_PATH)
 
-app = FastAPI(title="EV Twin + AI Demo")
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    # 서버 시작 시: LLM 클라이언트 미리 생성 + 시간대 속도 프로파일 mmap (없으면 profile 모드는 고정 속도)
+    llm_warm_up()
+    load_speed_profile()
+    yield
+
+app = FastAPI(title="EV Twin + AI Demo", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -94,7 +132,7 @@ STATION_PATH = DATA_DIR / "station.tsv"
 
 LINK_MAP_PATH = DATA_DIR / "link_map.tsv"
 LINK_TRAFFIC_PATH = DATA_DIR / "link_traffic.tsv"
-BASELINE_SPEED = 30.0  # 기준속도(임시). 필요하면 조정
+BASELINE_SPEED = 30.0  # 링크 기준선(services/traffic_baseline)이 아직 없을 때 쓰는 전역 기준속도
 
 
 # ✅ statusCode 4,5만
@@ -288,6 +326,7 @@ def _build_twins():
     # ✅ 한 번만 로드
     link_map = _load_link_map()
     link_tr = _load_link_traffic()
+    hour = datetime.now(timezone(timedelta(hours=9))).hour  # 기준선 시간대(KST)
 
     twins = []
     for (stat_id, chger_id), s in latest_status.items():
@@ -339,14 +378,17 @@ def _build_twins():
             spd = tr.get("speed")
             ttime = tr.get("travel_time")
 
+            # 혼잡도 = 1 - 현재 속도 / 그 링크·시간대의 자유주행 속도
+            freeflow = freeflow_kmh(lid, hour) or BASELINE_SPEED
             congestion = None
             if isinstance(spd, (int, float)):
-                congestion = max(0.0, min(1.0, 1.0 - (float(spd) / BASELINE_SPEED)))
+                congestion = max(0.0, min(1.0, 1.0 - (float(spd) / freeflow)))
 
             twin["signals"]["linkId"] = lid
             twin["signals"]["linkDistM"] = lm.get("dist_m")
             twin["signals"]["trafficSpeed"] = float(spd) if isinstance(spd, (int, float)) else 0.0
             twin["signals"]["trafficTravelTime"] = float(ttime) if isinstance(ttime, (int, float)) else 0.0
+            twin["signals"]["trafficFreeFlowSpeed"] = float(round(freeflow, 1))
             twin["signals"]["trafficCongestion"] = float(round(congestion, 3)) if congestion is not None else 0.0
         else:
             twin["signals"]["trafficCongestion"] = 0.0
@@ -356,17 +398,32 @@ def _build_twins():
 
     return twins
 
+def _traffic_version():
+    # collect_link_traffic 데몬이 tmp → rename 으로 교체하면 mtime_ns/size 가 바뀐다 (반쯤 쓴 파일은 안 보임)
+    # 링크 기준선(link_baseline.npz)이 바뀌어도 혼잡도가 달라지므로 같이 본다
+    # 속도 프로파일이 재생성되면 profile 모드 ETA 가 달라지므로 결과 캐시 키에도 들어가게 같이 본다
+    try:
+        st = LINK_TRAFFIC_PATH.stat()
+    except FileNotFoundError:
+        return None
+    return f"{st.st_mtime_ns}:{st.st_size}:{baseline_version()}:{profile_version()}"
+
 def refresh_twins():
     if not STATUS_PATH.exists():
         _CACHE["twins"] = []
         return _CACHE["twins"]
 
-    mtime = STATUS_PATH.stat().st_mtime
+    # 상태 스냅샷 또는 교통 스냅샷 중 하나라도 바뀌면 다시 빌드
+    mtime = (STATUS_PATH.stat().st_mtime, _traffic_version())
     if _CACHE["mtime"] != mtime:
         _CACHE["twins"] = _build_twins()
         _CACHE["mtime"] = mtime
     return _CACHE["twins"]
 
+def twins_version():
+    # 결과 캐시 키용 스냅샷 버전 (refresh_twins 이후 호출)
+    return _CACHE["mtime"]
+
 # -----------------------------
 # API
 # -----------------------------
@@ -386,33 +443,160 @@ async def stream_twins():
 
     return StreamingResponse(event_gen(), media_type="text/event-stream")
 
+@app.get("/metrics/cache")
+def metrics_cache():
+    return {
+        "distanceMatrix": distance_cache_stats(),
+        "results": RESULT_CACHE.stats(),
+        "llm": LLM_CACHE.stats(),
+    }
+
+@app.get("/metrics/llm")
+def metrics_llm():
+    return {
+        "budget": {"maxInputTokens": MAX_INPUT_TOKENS, "latencyBudgetMs": LATENCY_BUDGET_MS or None},
+        **LLM_TELEMETRY.snapshot(),
+    }
+
+@app.get("/traffic/priority")
+def traffic_priority():
+    # collect_link_traffic.py adaptive 모드가 링크별 수집 주기를 정할 때 사용
+    return link_priorities(refresh_twins())
+
+@app.post("/road/eta")
+def road_eta_matrix(req: RoadEtaRequest):
+    return road_eta(req)
+
 @app.post("/sim/procurement/run")
 def sim_procurement(req: ProcurementSimRequest):
     items = refresh_twins()
     return run_procurement_sim(items, req)
 
+@app.post("/sim/procurement/replicate")
+def sim_procurement_replicate(req: ProcurementReplicationRequest):
+    items = refresh_twins()
+    return run_procurement_replications(items, req)
+
+@app.post("/sim/procurement/crews")
+def sim_procurement_crews(req: CrewQueueSimRequest):
+    items = refresh_twins()
+    return run_crew_queue_sim(items, req)
+
+@app.post("/sim/procurement/sweep")
+def sim_procurement_sweep(req: ProcurementSweepRequest):
+    items = refresh_twins()
+    return run_procurement_sweep(items, req)
+
+@app.post("/sim/procurement/depots")
+def sim_procurement_depots(req: DepotPlacementRequest):
+    items = refresh_twins()
+    if req.seed is None:
+        return place_depots(items, req)
+    return RESULT_CACHE.get_or_compute(
+        "procurement/depots", twins_version(), req.model_dump(),
+        lambda: place_depots(items, req),
+    )
+
 @app.post("/agent/procurement/recommend")
 def agent_procurement_recommend(req: ProcurementAgentRequest):
     items = refresh_twins()
-    return recommend_provider(items, req)
+    if req.seed is None:
+        # 시드 없으면 매번 다른 결과가 기대값이라 캐시하지 않음
+        return recommend_provider(items, req)
+    return RESULT_CACHE.get_or_compute(
+        "procurement/recommend", twins_version(), req.model_dump(),
+        lambda: recommend_provider(items, req),
+    )
+
+@app.post("/agent/procurement/recommend/stream")
+async def agent_procurement_recommend_stream(req: ProcurementAgentRequest):
+    items = refresh_twins()
+    return StreamingResponse(recommend_provider_stream(items, req), media_type="text/event-stream")
+
+@app.post("/jobs/sim/procurement")
+def jobs_sim_procurement(req: ProcurementSimJobRequest):
+    items = refresh_twins()
+    return submit_procurement_sim_job(items, req)
+
+@app.post("/jobs/agent/procurement/recommend")
+def jobs_agent_procurement_recommend(req: ProcurementRecommendJobRequest):
+    items = refresh_twins()
+    return submit_recommend_job(items, req)
+
+@app.get("/jobs/{job_id}")
+def jobs_get(job_id: str):
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job not found")
+    return job
+
+@app.get("/jobs/{job_id}/stream")
+async def jobs_stream(job_id: str):
+    return StreamingResponse(job_events(job_id), media_type="text/event-stream")
+
+@app.delete("/jobs/{job_id}")
+def jobs_cancel(job_id: str):
+    job = cancel_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job not found")
+    return job
+
 @app.post("/agent/run")
-def agent_run(req: AgentRunRequest):
-    return run_agent(req)
+async def agent_run(req: AgentRunRequest):
+    return await run_agent_async(req)
+
+@app.post("/agent/run/batch")
+async def agent_run_batch(req: AgentBatchRunRequest):
+    items = refresh_twins() if req.twinIds else []
+    return await run_agent_batch_async(items, req)
+def _minute_now() -> datetime:
+    # 결과 캐시용 기준 시각: 분 단위로 잘라서 키에 넣고 계산에도 같은 값을 쓴다 (같은 분 안에서만 재사용)
+    return datetime.now(timezone(timedelta(hours=9))).replace(second=0, microsecond=0)
+
 @app.post("/agent/fleet/prioritize")
 def agent_fleet_prioritize(req: FleetPrioritizeRequest):
     items = refresh_twins()
-    return prioritize_fleet(items, req)
+    if req.nowTs is None:
+        req = req.model_copy(update={"nowTs": _minute_now().strftime("%Y%m%d%H%M%S")})
+    return RESULT_CACHE.get_or_compute(
+        "fleet/prioritize", twins_version(), req.model_dump(),
+        lambda: prioritize_fleet(items, req),
+    )
+
+@app.post("/agent/fleet/prioritize/stream")
+async def agent_fleet_prioritize_stream(req: FleetPrioritizeRequest):
+    items = refresh_twins()
+    return StreamingResponse(prioritize_fleet_stream(items, req), media_type="text/event-stream")
 
 @app.post("/agent/fleet/route")
 def agent_fleet_route(req: FleetRouteRequest):
     return plan_route(req)
 
+@app.post("/agent/fleet/route/stream")
+async def agent_fleet_route_stream(req: FleetRouteRequest):
+    return StreamingResponse(plan_route_stream(req), media_type="text/event-stream")
+
+@app.post("/agent/fleet/dispatch")
+def agent_fleet_dispatch(req: DispatchPlanRequest):
+    return plan_dispatch(req)
+
 @app.post("/agent/fleet/autopilot")
 def agent_fleet_autopilot(req: AutopilotRequest):
     items = refresh_twins()
-    return run_autopilot(items, req)
+    now = _minute_now()
+    resp = RESULT_CACHE.get_or_compute(
+        "fleet/autopilot", twins_version(), {**req.model_dump(), "now": now.isoformat()},
+        lambda: run_autopilot(items, req, now),
+    )
+    note_autopilot_top(c.stationId for c in resp.cases)  # 교통 수집 우선순위(hot)에 반영
+    return resp
 
 
 @app.post("/agent/fleet/autopilot/explain")
-def agent_fleet_autopilot_explain(req: AutopilotExplainRequest):
-    return explain_autopilot(req)
\ No newline at end of file
+async def agent_fleet_autopilot_explain(req: AutopilotExplainRequest):
+    return await explain_autopilot_async(req)
+
+
+@app.post("/agent/fleet/autopilot/explain/stream")
+async def agent_fleet_autopilot_explain_stream(req: AutopilotExplainRequest):
+    return StreamingResponse(explain_autopilot_stream(req), media_type="text/event-stream")
@@ -1,34 +1,58 @@
 # services/agent.py
-from typing import Dict, Any, Literal, Optional
+from datetime import datetime
+from typing import Dict, Any, List, Literal, Optional
+
+import numpy as np
 from pydantic import BaseModel, Field
 
-from .traffic import estimate_eta_min, TrafficMode
+from .speed_profile import KST, bucket_of, trip_kmh
+from .traffic import estimate_eta_min, eta_min_from_km, haversine_matrix_km, TrafficMode
 
 class AgentRunRequest(BaseModel):
     mode: Literal["ops", "procurement"] = "ops"
     twin: Dict[str, Any]                         # 현재 선택된 트윈
     trafficMode: TrafficMode = "normal"
+    departTs: Optional[str] = None               # profile 모드 출발 시각(YYYYMMDDHHMMSS, KST). 없으면 지금
     slaMinutes: int = 60
     baseLat: float = 37.5665                     # 기본 출동 베이스(임시). 나중에 업체/권역별로 교체
     baseLon: float = 126.9780
     remoteRecoveryRate: float = Field(default=0.35, ge=0.0, le=1.0)
     useLLM: bool = False
 
-from .agent_llm import run_llm_agent
+class AgentBatchRunRequest(BaseModel):
+    mode: Literal["ops", "procurement"] = "ops"
+    twins: List[Dict[str, Any]] = []             # 트윈 객체 직접 전달
+    twinIds: List[str] = []                      # "stationId/chargerId" 또는 "stationId"(충전소 전체) → 트윈 스토어에서 조회
+    trafficMode: TrafficMode = "normal"
+    departTs: Optional[str] = None
+    slaMinutes: int = 60
+    baseLat: float = 37.5665
+    baseLon: float = 126.9780
+    remoteRecoveryRate: float = Field(default=0.35, ge=0.0, le=1.0)
+    useLLM: bool = False
+    llmBatchSize: int = Field(25, ge=1, le=100)  # 프롬프트 1개에 넣을 트윈 수
+    llmConcurrency: int = Field(4, ge=1, le=16)
+
+from .agent_llm import run_llm_agent, run_llm_agent_async, run_llm_agent_batch_async, _compact_twin
 
 def run_agent(req: AgentRunRequest):
     if req.useLLM:
-        return run_llm_agent(req.model_dump())
-    t = req.twin
-    lat = float(t.get("lat"))
-    lon = float(t.get("lon"))
-
-    # MVP 위험도 (트윈에 risk 있으면 활용, 없으면 랜덤/0)
-    derived = t.get("derived") or {}
-    risk = derived.get("risk") or t.get("risk") or "OK"
+        out = run_llm_agent(req.model_dump())
+        if out is not None:
+            return out
+        return {**_rule_plan(req), "llm": {"note": "llm_timeout_or_error", "fallback": "rule"}}
+    return _rule_plan(req)
 
-    eta = estimate_eta_min(req.baseLat, req.baseLon, lat, lon, req.trafficMode)
+async def run_agent_async(req: AgentRunRequest):
+    # LLM 모드는 이벤트 루프를 막지 않고 기다린다 (규칙 기반은 계산이 가벼워 그대로)
+    if req.useLLM:
+        out = await run_llm_agent_async(req.model_dump())
+        if out is not None:
+            return out
+        return {**_rule_plan(req), "llm": {"note": "llm_timeout_or_error", "fallback": "rule"}}
+    return _rule_plan(req)
 
+def _plan_for(risk: str, eta: float, sla_minutes: int, remote_rate: float):
     plan = []
     reasons = []
 
@@ -38,15 +62,34 @@ def run_agent(req: AgentRunRequest):
     else:
         # 원격조치 먼저
         plan.append({"action": "REMOTE_RESET"})
-        reasons.append(f"원격조치 우선 시도(remoteRecoveryRate={req.remoteRecoveryRate})")
+        reasons.append(f"원격조치 우선 시도(remoteRecoveryRate={remote_rate})")
 
         # 출동 여부 판단
-        if eta <= req.slaMinutes:
+        if eta <= sla_minutes:
             plan.append({"action": "DISPATCH", "eta_min": round(eta, 1)})
-            reasons.append(f"SLA({req.slaMinutes}분) 내 도착 가능 → 출동 병행 권장")
+            reasons.append(f"SLA({sla_minutes}분) 내 도착 가능 → 출동 병행 권장")
         else:
             plan.append({"action": "ESCALATE", "eta_min": round(eta, 1)})
-            reasons.append(f"SLA({req.slaMinutes}분) 초과 예상 → 권역 재배치/대체조치 필요")
+            reasons.append(f"SLA({sla_minutes}분) 초과 예상 → 권역 재배치/대체조치 필요")
+    return plan, reasons
+
+def _depart(ts: Optional[str]) -> Optional[datetime]:
+    try:
+        return datetime.strptime(ts, "%Y%m%d%H%M%S").replace(tzinfo=KST) if ts else None
+    except ValueError:
+        return None
+
+def _rule_plan(req: AgentRunRequest):
+    t = req.twin
+    lat = float(t.get("lat"))
+    lon = float(t.get("lon"))
+
+    # MVP 위험도 (트윈에 risk 있으면 활용, 없으면 랜덤/0)
+    derived = t.get("derived") or {}
+    risk = derived.get("risk") or t.get("risk") or "OK"
+
+    eta = estimate_eta_min(req.baseLat, req.baseLon, lat, lon, req.trafficMode, _depart(req.departTs))
+    plan, reasons = _plan_for(risk, eta, req.slaMinutes, req.remoteRecoveryRate)
 
     return {
         "risk": risk,
@@ -54,3 +97,88 @@ def run_agent(req: AgentRunRequest):
         "plan": plan,
         "reasons": reasons,
     }
+
+
+# ========= batch =========
+def _twin_id(t: Dict[str, Any]) -> str:
+    return f'{t.get("stationId")}/{t.get("chargerId")}'
+
+def _resolve_twins(store: List[Dict[str, Any]], req: AgentBatchRunRequest):
+    """req.twins + req.twinIds(스토어 조회) → (트윈 목록, 못 찾은 id)"""
+    twins = list(req.twins)
+    unresolved = []
+    if req.twinIds:
+        by_id: Dict[str, Dict[str, Any]] = {}
+        by_station: Dict[str, List[Dict[str, Any]]] = {}
+        for t in store:
+            by_id[_twin_id(t)] = t
+            by_station.setdefault(str(t.get("stationId")), []).append(t)
+        for tid in req.twinIds:
+            if tid in by_id:
+                twins.append(by_id[tid])
+            elif tid in by_station:
+                twins.extend(by_station[tid])
+            else:
+                unresolved.append(tid)
+    return twins, unresolved
+
+def _coord(x) -> float:
+    try:
+        return float(x)
+    except (TypeError, ValueError):
+        return float("nan")
+
+def _batch_rule_plans(twins: List[Dict[str, Any]], req: AgentBatchRunRequest):
+    """ETA는 한 번에 벡터 계산, plan 규칙은 단건(_plan_for)과 동일"""
+    lats = np.array([_coord(t.get("lat")) for t in twins], dtype=np.float64)
+    lons = np.array([_coord(t.get("lon")) for t in twins], dtype=np.float64)
+    kmh = None
+    if req.trafficMode == "profile":
+        kmh = trip_kmh(req.baseLat, req.baseLon, lats, lons, bucket_of(_depart(req.departTs)))
+    etas = eta_min_from_km(haversine_matrix_km([req.baseLat], [req.baseLon], lats, lons)[0], req.trafficMode, kmh)
+
+    out, skipped = [], []
+    for t, eta in zip(twins, etas.tolist()):
+        if eta != eta:  # 좌표 없음(NaN)
+            skipped.append(_twin_id(t))
+            continue
+        derived = t.get("derived") or {}
+        risk = derived.get("risk") or t.get("risk") or "OK"
+        plan, reasons = _plan_for(risk, eta, req.slaMinutes, req.remoteRecoveryRate)
+        out.append({
+            "id": _twin_id(t),
+            "stationId": t.get("stationId"),
+            "chargerId": t.get("chargerId"),
+            "risk": risk,
+            "eta_min": round(eta, 1),
+            "plan": plan,
+            "reasons": reasons,
+        })
+    return out, skipped
+
+async def run_agent_batch_async(store: List[Dict[str, Any]], req: AgentBatchRunRequest) -> Dict[str, Any]:
+    twins, unresolved = _resolve_twins(store, req)
+    items, skipped = _batch_rule_plans(twins, req)
+
+    llm_info = None
+    if req.useLLM and items:
+        by_id = {_twin_id(t): t for t in twins}
+        compact = [{**_compact_twin(by_id[x["id"]]), "id": x["id"], "eta_min": x["eta_min"]} for x in items]
+        got, statuses = await run_llm_agent_batch_async(req.model_dump(), compact, req.llmBatchSize, req.llmConcurrency)
+        n_llm = 0
+        for i, x in enumerate(items):
+            r = got.get(x["id"])
+            if r is not None:
+                items[i] = {**x, **{k: r[k] for k in ("risk", "eta_min", "plan", "reasons") if k in r}, "source": "llm"}
+                n_llm += 1
+            else:
+                x["source"] = "rule"  # LLM 응답에 빠졌거나 batch 실패 → 규칙 기반 유지
+        llm_info = {"batches": len(statuses), "statuses": statuses, "llmItems": n_llm, "ruleItems": len(items) - n_llm}
+
+    return {
+        "count": len(items),
+        "items": items,
+        "unresolved": unresolved,
+        "skipped": skipped,
+        "llm": llm_info,
+    }
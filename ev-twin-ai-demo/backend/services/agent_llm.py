@@ -1,15 +1,11 @@
 # services/agent_llm.py
-import os
+import asyncio
 import json
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 
-from openai import OpenAI
-
-def _get_client() -> OpenAI:
-    key = os.getenv("OPENAI_API_KEY")
-    if not key:
-        raise RuntimeError("OPENAI_API_KEY not set")
-    return OpenAI(api_key=key)
+from .llm_budget import payload_tokens, token_budget
+from .llm_client import DEFAULT_MODEL, llm_text, llm_text_async
+from .llm_telemetry import LLM_TELEMETRY, estimate_tokens
 
 SYSTEM_PROMPT = """
 너는 전기차 충전소 관제 에이전트다.
@@ -30,58 +26,129 @@ SYSTEM_PROMPT = """
 - reasons는 사람이 읽을 수 있게 짧고 명확하게.
 """.strip()
 
-def run_llm_agent(payload: Dict[str, Any]) -> Dict[str, Any]:
-    """
-    payload는 AgentRunRequest(model_dump()) 같은 dict를 받는다고 가정.
-    """
-    try:
-        client = _get_client()
-    except RuntimeError as e:
-        return {
-            "error": str(e),
-            "hint": "D:\\DigitalTwin\\.env에 OPENAI_API_KEY=... 넣고, main.py에서 load_dotenv 했는지 확인 후 FastAPI 재시작"
-        }
+BATCH_SYSTEM_PROMPT = """
+너는 전기차 충전소 관제 에이전트다.
+입력의 common(공통 조건)과 twins(여러 충전기, eta_min은 계산된 값)를 보고 충전기마다 plan과 reasons를 만든다.
 
-    # LLM이 참고할 핵심만 추려서 전달(길이/잡음 줄이기)
-    twin = payload.get("twin", {})
-    compact = {
+반드시 아래 JSON 스키마로만 출력 (twins의 모든 id에 대해 1개씩):
+{
+  "results": [
+    {
+      "id": string,
+      "risk": "OK|ALERT|CRITICAL|UNKNOWN",
+      "eta_min": number,
+      "plan": [{"action": "NO_ACTION|REMOTE_RESET|DISPATCH|ESCALATE", "eta_min"?: number}],
+      "reasons": [string]
+    }
+  ]
+}
+
+규칙:
+- risk가 OK면 plan은 NO_ACTION만.
+- ALERT/CRITICAL이면 REMOTE_RESET을 우선 포함.
+- eta_min이 slaMinutes 이하면 DISPATCH 포함, 초과면 ESCALATE 포함.
+- reasons는 사람이 읽을 수 있게 짧고 명확하게.
+""".strip()
+
+def _compact_twin(twin: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "stationId": twin.get("stationId"),
+        "chargerId": twin.get("chargerId"),
+        "name": twin.get("name"),
+        "lat": twin.get("lat"),
+        "lon": twin.get("lon"),
+        "health": (twin.get("derived") or {}).get("health") if isinstance(twin.get("derived"), dict) else twin.get("health"),
+        "risk": (twin.get("derived") or {}).get("risk") if isinstance(twin.get("derived"), dict) else twin.get("risk"),
+        "downProb6h": (twin.get("derived") or {}).get("downProb6h") if isinstance(twin.get("derived"), dict) else twin.get("downProb6h"),
+    }
+
+def _compact_common(payload: Dict[str, Any]) -> Dict[str, Any]:
+    return {
         "mode": payload.get("mode", "ops"),
         "trafficMode": payload.get("trafficMode", "normal"),
         "slaMinutes": payload.get("slaMinutes", 60),
         "base": {"lat": payload.get("baseLat"), "lon": payload.get("baseLon")},
         "remoteRecoveryRate": payload.get("remoteRecoveryRate", 0.35),
-        "twin": {
-            "stationId": twin.get("stationId"),
-            "chargerId": twin.get("chargerId"),
-            "name": twin.get("name"),
-            "lat": twin.get("lat"),
-            "lon": twin.get("lon"),
-            "health": (twin.get("derived") or {}).get("health") if isinstance(twin.get("derived"), dict) else twin.get("health"),
-            "risk": (twin.get("derived") or {}).get("risk") if isinstance(twin.get("derived"), dict) else twin.get("risk"),
-            "downProb6h": (twin.get("derived") or {}).get("downProb6h") if isinstance(twin.get("derived"), dict) else twin.get("downProb6h"),
-        },
     }
 
-    # OpenAI Responses API로 JSON만 받기
-    resp = client.responses.create(
-        model="gpt-4o-mini",
-        input=[
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": json.dumps(compact, ensure_ascii=False)}
-        ],
-    )
-
-    text = getattr(resp, "output_text", None)
+def _compact(payload: Dict[str, Any]) -> Dict[str, Any]:
+    # LLM이 참고할 핵심만 추려서 전달(길이/잡음 줄이기)
+    return {**_compact_common(payload), "twin": _compact_twin(payload.get("twin", {}))}
 
-    if not text:
-        # SDK 버전에 따라 구조가 달라서 fallback
-        try:
-            text = resp.output[0].content[0].text
-        except Exception:
-            return {"error": "cannot_extract_text_from_response", "raw": str(resp)}
+def _result(text: Optional[str], status: str) -> Optional[Dict[str, Any]]:
+    if status == "no_key":
+        LLM_TELEMETRY.record_fallback("agent")
+        return {
+            "error": "OPENAI_API_KEY not set",
+            "hint": "D:\\DigitalTwin\\.env에 OPENAI_API_KEY=... 넣고, main.py에서 load_dotenv 했는지 확인 후 FastAPI 재시작"
+        }
+    if text is None:
+        LLM_TELEMETRY.record_fallback("agent")
+        return None  # 시간 초과/오류 → 호출 측(agent.run_agent)이 규칙 기반 plan으로 대체
 
     try:
         return json.loads(text)
     except Exception:
+        LLM_TELEMETRY.record_parse_failure("agent")
+        LLM_TELEMETRY.record_fallback("agent")
         return {"error": "LLM did not return valid JSON", "raw": text}
 
+def run_llm_agent(payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    payload는 AgentRunRequest(model_dump()) 같은 dict를 받는다고 가정.
+    LLM 시간 초과/오류면 None
+    """
+    return _result(*llm_text(SYSTEM_PROMPT, _compact(payload), tag="agent"))
+
+async def run_llm_agent_async(payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    return _result(*await llm_text_async(SYSTEM_PROMPT, _compact(payload), tag="agent"))
+
+async def run_llm_agent_batch_async(
+    payload: Dict[str, Any], twins: List[Dict[str, Any]], batch_size: int, concurrency: int
+) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+    """
+    여러 트윈을 최대 batch_size개씩 묶어 프롬프트 1개로 보낸다 (동시 concurrency개).
+    묶음 1개의 추정 입력 토큰이 예산(llm_budget.token_budget)을 넘으면 더 잘게 나눈다.
+    twins 원소 = _compact_twin + {"id", "eta_min"}
+    return (id → LLM 결과, batch별 상태). 빠진 id는 호출 측이 규칙 기반으로 채운다
+    """
+    common = _compact_common(payload)
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(chunk: List[Dict[str, Any]]):
+        async with sem:
+            text, status = await llm_text_async(BATCH_SYSTEM_PROMPT, {"common": common, "twins": chunk}, tag="agent_batch")
+        if text is None:
+            LLM_TELEMETRY.record_fallback("agent_batch")  # 이 묶음은 규칙 기반으로 채움
+            return {}, status
+        try:
+            s = text[text.find("{") : text.rfind("}") + 1]
+            rows = json.loads(s).get("results") or []
+            return {str(r["id"]): r for r in rows if isinstance(r, dict) and "id" in r}, status
+        except Exception:
+            LLM_TELEMETRY.record_parse_failure("agent_batch")
+            LLM_TELEMETRY.record_fallback("agent_batch")
+            return {}, "llm_not_json"
+
+    budget = token_budget(DEFAULT_MODEL)
+    base = payload_tokens(BATCH_SYSTEM_PROMPT, {"common": common, "twins": []})
+    chunks: List[List[Dict[str, Any]]] = []
+    cur: List[Dict[str, Any]] = []
+    used = base
+    for t in twins:
+        n = estimate_tokens(json.dumps(t, ensure_ascii=False)) + 1
+        if cur and (len(cur) >= batch_size or used + n > budget):
+            chunks.append(cur)
+            cur, used = [], base
+        cur.append(t)
+        used += n
+    if cur:
+        chunks.append(cur)
+    extra = len(chunks) - -(-len(twins) // batch_size)
+    if extra > 0:
+        LLM_TELEMETRY.record_trim("agent_batch", extra_chunks=extra)  # 예산 때문에 묶음이 더 잘게 나뉨
+    outs = await asyncio.gather(*(one(c) for c in chunks))
+    merged: Dict[str, Dict[str, Any]] = {}
+    for d, _ in outs:
+        merged.update(d)
+    return merged, [st for _, st in outs]
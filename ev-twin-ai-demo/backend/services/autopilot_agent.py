@@ -4,6 +4,8 @@ from typing import List, Dict, Any, Optional, Literal
 from datetime import datetime, timezone, timedelta
 import math
 
+from .distance_matrix import twin_coords, depot_row_km, valid_coords
+
 KST = timezone(timedelta(hours=9))
 
 def _safe_float(x, default=0.0) -> float:
@@ -152,7 +154,9 @@ def _make_plan(item: Dict[str, Any], req: AutopilotRequest) -> List[AutopilotPla
     lat = _safe_float(t.get("lat"), 0.0)
     lon = _safe_float(t.get("lon"), 0.0)
 
-    dist_km = _haversine_km(req.baseLat, req.baseLon, lat, lon)
+    dist_km = item.get("distKm")
+    if dist_km is None:
+        dist_km = _haversine_km(req.baseLat, req.baseLon, lat, lon)
     # ETA 근사(테스트): 30km/h 기준 + 혼잡도 가중
     cong = float(item.get("trafficCongestion", 0.0))
     eta_min = int((dist_km / 30.0) * 60.0 * (1.0 + 0.6 * cong))
@@ -182,13 +186,19 @@ def _make_plan(item: Dict[str, Any], req: AutopilotRequest) -> List[AutopilotPla
     # safe 레벨이면 DISPATCH/ESCALATE는 '제안'으로만 남기고 실행은 안 한다는 의미(여기선 실행 로직 자체가 없음)
     return plan
 
-def run_autopilot(twins: List[Dict[str, Any]], req: AutopilotRequest) -> AutopilotResponse:
-    now = datetime.now(KST)
+def run_autopilot(twins: List[Dict[str, Any]], req: AutopilotRequest, now: Optional[datetime] = None) -> AutopilotResponse:
+    # now: 결과 캐시 키와 같은 기준 시각(분 단위)을 넘겨받는다. 없으면 지금
+    now = now or datetime.now(KST)
+    lats, lons, station_ver = twin_coords(twins)
+    ok = valid_coords(lats, lons)
 
     scored = []
-    for t in twins:
+    for i, t in enumerate(twins):
+        if not ok[i]:  # 좌표가 없으면 거리/ETA 를 못 냄 → 후보 제외
+            continue
         it = _priority_score(t, req, now)
         if it:
+            it["idx"] = i
             scored.append(it)
 
     scored.sort(key=lambda x: x["score"], reverse=True)
@@ -196,8 +206,14 @@ def run_autopilot(twins: List[Dict[str, Any]], req: AutopilotRequest) -> Autopil
     picked = scored[: max(0, min(req.autoTopK, len(scored)))]
     cases: List[AutopilotCase] = []
 
+    # 거점→충전소 거리 행(캐시)
+    row_km = None
+    if picked:
+        row_km = depot_row_km(req.baseLat, req.baseLon, lats, lons, station_ver)
+
     for it in picked:
         t = it["t"]
+        it["distKm"] = float(row_km[it["idx"]])
         plan = _make_plan(it, req)
 
         cases.append(
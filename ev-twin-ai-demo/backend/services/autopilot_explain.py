@@ -1,70 +1,110 @@
 # 1) backend/services/autopilot_explain.py  (새 파일)
 from pydantic import BaseModel, Field
 from typing import List, Dict, Any, Optional
-import os, json
+import json
+
+from .llm_budget import fit_items
+from .llm_client import DEFAULT_MODEL, llm_text, llm_text_async
+from .llm_stream import stream_json_explain
+from .llm_telemetry import LLM_TELEMETRY
 
 class AutopilotExplainRequest(BaseModel):
     cases: List[Dict[str, Any]] = Field(default_factory=list)
-    topK: int = 15
+    topK: int = 15  # 상한. 토큰 예산을 넘으면 llm_budget 이 더 줄인다
 
 class AutopilotExplainResponse(BaseModel):
     summary: str
     top_reasons: List[str]
     risks: List[str]
     suggested_groups: List[Dict[str, Any]]
+    source: Optional[str] = None  # llm | cache | fallback
 
-def explain_autopilot(req: AutopilotExplainRequest) -> AutopilotExplainResponse:
-    key = os.getenv("OPENAI_API_KEY", "").strip()
-    if not key:
-        return AutopilotExplainResponse(
-            summary="OPENAI_API_KEY 없음",
-            top_reasons=[],
-            risks=[],
-            suggested_groups=[],
-        )
+SYSTEM = (
+    "너는 EV 충전소 관제 책임자다. 입력된 autopilot 케이스 리스트를 보고 오늘 처리 전략을 요약한다. "
+    "반드시 JSON만 출력:\n"
+    "{"
+    "\"summary\": string,"
+    "\"top_reasons\": [string],"
+    "\"risks\": [string],"
+    "\"suggested_groups\": ["
+    " {\"name\": string, \"hint\": string, \"items\": [string]} "
+    "]"
+    "}"
+)
 
-    from openai import OpenAI
-    client = OpenAI(api_key=key)
+def _case(c: Dict[str, Any], level: int) -> Dict[str, Any]:
+    # level 0: reasons + plan[:4] 전체 / 1: reasons 빼고 plan 은 action, eta_min 만 / 2: 이름도 뺌
+    plan = [p for p in (c.get("plan") or [])[:4] if isinstance(p, dict)]
+    row = {
+        "id": f'{c.get("stationId")}/{c.get("chargerId")}',
+        "name": c.get("name"),
+        "score": c.get("score"),
+        "downMinutes": c.get("downMinutes"),
+        "downProb6h": c.get("downProb6h"),
+        "trafficCongestion": c.get("trafficCongestion"),
+        "reasons": (c.get("reasons") or [])[:3],
+        "plan": plan,
+    }
+    if level >= 1:
+        del row["reasons"]
+        row["plan"] = [{k: p.get(k) for k in ("action", "eta_min") if p.get(k) is not None} for p in plan]
+    if level >= 2:
+        del row["name"]
+    return row
 
+def _payload(req: AutopilotExplainRequest) -> Dict[str, Any]:
     top = req.cases[: max(1, min(req.topK, len(req.cases)))]
+    payload, _ = fit_items(
+        "autopilot_explain", DEFAULT_MODEL, SYSTEM,
+        lambda k, level: {"cases": [_case(c, level) for c in top[:k]]},
+        len(top), 3,
+    )
+    return payload
 
-    payload = {
-        "cases": [
-            {
-                "id": f'{c.get("stationId")}/{c.get("chargerId")}',
-                "name": c.get("name"),
-                "score": c.get("score"),
-                "downMinutes": c.get("downMinutes"),
-                "downProb6h": c.get("downProb6h"),
-                "trafficCongestion": c.get("trafficCongestion"),
-                "plan": c.get("plan", [])[:4],
-            }
-            for c in top
-        ]
-    }
+def _fallback(payload: Dict[str, Any], status: str) -> AutopilotExplainResponse:
+    """LLM 시간 초과/오류 시 규칙 기반 요약 (같은 입력이면 항상 같은 결과)"""
+    LLM_TELEMETRY.record_fallback("autopilot_explain")
+    cases = payload["cases"]
+    groups: Dict[str, List[str]] = {}
+    for c in cases:
+        acts = [p.get("action") for p in (c.get("plan") or []) if isinstance(p, dict)]
+        last = next((a for a in reversed(acts) if a in ("DISPATCH", "ESCALATE", "MONITOR")), "REMOTE")
+        groups.setdefault(last, []).append(c["id"])
 
-    system = (
-        "너는 EV 충전소 관제 책임자다. 입력된 autopilot 케이스 리스트를 보고 오늘 처리 전략을 요약한다. "
-        "반드시 JSON만 출력:\n"
-        "{"
-        "\"summary\": string,"
-        "\"top_reasons\": [string],"
-        "\"risks\": [string],"
-        "\"suggested_groups\": ["
-        " {\"name\": string, \"hint\": string, \"items\": [string]} "
-        "]"
-        "}"
-    )
+    long_down = [c for c in cases if (c.get("downMinutes") or 0) >= 180]
+    high_prob = [c for c in cases if (c.get("downProb6h") or 0) >= 0.7]
+    congested = [c for c in cases if (c.get("trafficCongestion") or 0) >= 0.6]
+
+    reasons = []
+    if cases:
+        reasons.append(f"최상위 케이스 {cases[0]['id']} (score {cases[0].get('score')})")
+    if long_down:
+        reasons.append(f"3시간 이상 장기 다운 {len(long_down)}건")
+    if high_prob:
+        reasons.append(f"6시간 내 다운 확률 0.7 이상 {len(high_prob)}건")
+
+    risks = []
+    if groups.get("ESCALATE"):
+        risks.append(f"SLA 초과 예상(에스컬레이션) {len(groups['ESCALATE'])}건")
+    if congested:
+        risks.append(f"교통 혼잡 구간 {len(congested)}건 → 도착 지연 가능")
 
-    r = client.responses.create(
-        model="gpt-4o-mini",
-        input=[
-            {"role": "system", "content": system},
-            {"role": "user", "content": json.dumps(payload, ensure_ascii=False)},
-        ],
+    hints = {
+        "DISPATCH": "SLA 내 출동 가능 - 동선 묶어서 출동",
+        "ESCALATE": "SLA 초과 예상 - 상위 담당/대체 업체 검토",
+        "MONITOR": "모니터링 강화",
+        "REMOTE": "원격 진단/리셋 결과 확인",
+    }
+    return AutopilotExplainResponse(
+        summary=f"규칙 기반 요약(LLM {status}): 상위 {len(cases)}건 중 출동 {len(groups.get('DISPATCH', []))}건, "
+        f"에스컬레이션 {len(groups.get('ESCALATE', []))}건",
+        top_reasons=reasons,
+        risks=risks,
+        suggested_groups=[{"name": k, "hint": hints[k], "items": v} for k, v in groups.items()],
+        source="fallback",
     )
 
-    text = getattr(r, "output_text", "") or ""
+def _parse(text: str) -> Optional[Dict[str, Any]]:
     text = text.strip()
     # 코드펜스 제거
     if text.startswith("```"):
@@ -77,8 +117,26 @@ def explain_autopilot(req: AutopilotExplainRequest) -> AutopilotExplainResponse:
     # JSON 구간만
     s = text[text.find("{") : text.rfind("}") + 1] if ("{" in text and "}" in text) else text
     try:
-        j = json.loads(s)
+        return json.loads(s)
     except:
+        return None
+
+def _respond(payload: Dict[str, Any], text: Optional[str], status: str) -> AutopilotExplainResponse:
+    if status == "no_key":
+        LLM_TELEMETRY.record_fallback("autopilot_explain")
+        return AutopilotExplainResponse(
+            summary="OPENAI_API_KEY 없음",
+            top_reasons=[],
+            risks=[],
+            suggested_groups=[],
+        )
+    if text is None:
+        return _fallback(payload, status)
+
+    j = _parse(text)
+    if j is None:
+        LLM_TELEMETRY.record_parse_failure("autopilot_explain")
+        LLM_TELEMETRY.record_fallback("autopilot_explain")
         return AutopilotExplainResponse(
             summary="LLM JSON 파싱 실패",
             top_reasons=[],
@@ -91,4 +149,23 @@ def explain_autopilot(req: AutopilotExplainRequest) -> AutopilotExplainResponse:
         top_reasons=j.get("top_reasons", []) or [],
         risks=j.get("risks", []) or [],
         suggested_groups=j.get("suggested_groups", []) or [],
+        source="cache" if status == "cache" else "llm",
     )
+
+def explain_autopilot(req: AutopilotExplainRequest) -> AutopilotExplainResponse:
+    payload = _payload(req)
+    text, status = llm_text(SYSTEM, payload, tag="autopilot_explain")
+    return _respond(payload, text, status)
+
+async def explain_autopilot_async(req: AutopilotExplainRequest) -> AutopilotExplainResponse:
+    payload = _payload(req)
+    text, status = await llm_text_async(SYSTEM, payload, tag="autopilot_explain")
+    return _respond(payload, text, status)
+
+async def explain_autopilot_stream(req: AutopilotExplainRequest):
+    """SSE: delta / partial 을 흘려보내고 마지막 final 에 검증된 AutopilotExplainResponse"""
+    payload = _payload(req)
+    async for chunk in stream_json_explain(
+        SYSTEM, payload, lambda text, status: _respond(payload, text, status).model_dump(), tag="autopilot_explain"
+    ):
+        yield chunk
@@ -0,0 +1,256 @@
+# services/depot_location.py
+# 크루 거점 최적 배치 (facility location)
+# - 수요점 = 충전소 좌표 (트윈을 좌표별로 묶고 downProb6h / DOWN 여부로 가중, sim_crew_queue와 같은 가중)
+# - 후보지 = 수요점 중 가중치 상위 + 무작위 표본 (maxCandidates개)
+# - 이동시간: 직선거리 + trafficMode 평균속도(profile 이면 startHour 버킷의 후보지·수요점 구간 속도),
+#   또는 도로 그래프(services/road_graph.py)
+# - objective
+#     eta      : 가중 평균 ETA 최소 (p-median)
+#     coverage : SLA 안에 도달 가능한 가중치 최대, 동률이면 ETA 최소 (miss 벌점 + ETA)
+# - 해법: 그리디 초기해 → 교환(swap) 로컬서치(PAM). 후보 전체에 대한 교환 비용을 numpy로 한 번에 계산
+#   재시작(restart)마다 다른 초기해로 프로세스 풀에서 병렬 실행 → 최선 채택
+from typing import List, Literal, Optional, Dict, Any, Tuple
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+from .distance_matrix import twin_coords
+from .sim_procurement import ProviderProfile
+from .sim_crew_queue import twin_weights
+from .speed_profile import bucket_of_minutes, pair_kmh
+from .traffic import TrafficMode, eta_min_from_km, haversine_matrix_km
+from .workers import get_process_pool, effective_workers
+
+MISS_PENALTY = 1e4  # SLA miss 1건(가중치 1) > 어떤 ETA 차이보다 크게
+MAX_SWAP_ITERS = 200
+
+
+# ========= Models =========
+class DepotPlacementRequest(BaseModel):
+    nDepots: int = Field(3, ge=1, le=50)
+    objective: Literal["eta", "coverage"] = "eta"
+    slaMinutes: int = 60
+    trafficMode: TrafficMode = "normal"
+    startHour: float = Field(0.0, ge=0.0, lt=24.0)  # profile 모드: 출동 시각(KST)
+    travelModel: Literal["straight", "road"] = "straight"
+    weightBy: Literal["downProb", "uniform"] = "downProb"
+
+    maxCandidates: int = Field(400, ge=10, le=5000)
+    restarts: int = Field(8, ge=1, le=64)
+    workers: int = Field(4, ge=1, le=32)
+    seed: Optional[int] = None
+
+    # 결과를 ProviderProfile로 돌려줄 때 쓰는 값
+    namePrefix: str = "Depot"
+    crewsPerDepot: int = 1
+    remoteRecoveryRate: float = Field(0.35, ge=0.0, le=1.0)
+
+    # 현재 거점(선택) - 같은 기준으로 평가해서 비교용으로 같이 반환
+    current: List[ProviderProfile] = []
+
+
+# ========= demand / candidates =========
+def _demand_points(twins: List[Dict[str, Any]], weight_by: str):
+    """트윈 → 좌표별 수요점 (lat, lon, weight, 대표 stationId)"""
+    w = twin_weights(twins, weight_by)
+    t_lats, t_lons, _ = twin_coords(twins)
+    agg: Dict[Tuple[float, float], List[Any]] = {}
+    for i, t in enumerate(twins):
+        if not (w[i] > 0):  # 좌표 없는 트윈
+            continue
+        key = (round(float(t_lats[i]), 6), round(float(t_lons[i]), 6))
+        if key in agg:
+            agg[key][0] += w[i]
+        else:
+            agg[key] = [w[i], t.get("stationId")]
+
+    lats = np.array([k[0] for k in agg], dtype=np.float64)
+    lons = np.array([k[1] for k in agg], dtype=np.float64)
+    wts = np.array([v[0] for v in agg.values()], dtype=np.float64)
+    sids = [v[1] for v in agg.values()]
+    if len(wts):
+        wts = wts / wts.sum()
+    return lats, lons, wts, sids
+
+
+def _pick_candidates(wts: np.ndarray, max_cand: int, rng: np.random.Generator) -> np.ndarray:
+    n = len(wts)
+    if n <= max_cand:
+        return np.arange(n)
+    # 절반은 가중치 상위, 나머지는 균등 무작위 (외곽 후보도 남기기 위해)
+    top = np.argsort(-wts, kind="stable")[: max_cand // 2]
+    rest = np.setdiff1d(np.arange(n), top)
+    extra = rng.choice(rest, size=max_cand - len(top), replace=False)
+    return np.sort(np.concatenate([top, extra]))
+
+
+def _travel_min(o_lats, o_lons, d_lats, d_lons, req: DepotPlacementRequest) -> Tuple[np.ndarray, str]:
+    if req.travelModel == "road":
+        from .road_graph import get_road_graph
+
+        g = get_road_graph()
+        if g is not None:
+            return g.eta_matrix_min(o_lats, o_lons, d_lats, d_lons), "road_graph"
+    km = haversine_matrix_km(o_lats, o_lons, d_lats, d_lons)
+    kmh = None
+    if req.trafficMode == "profile":
+        kmh = pair_kmh(o_lats, o_lons, d_lats, d_lons, int(bucket_of_minutes(req.startHour * 60.0)))
+    return eta_min_from_km(km, req.trafficMode, kmh), "straight_line"
+
+
+# ========= solver =========
+def _objective_cost(eta: np.ndarray, objective: str, sla: float) -> np.ndarray:
+    # min 연산과 교환 가능하도록 ETA에 대해 단조 증가인 비용으로 변환
+    if objective == "coverage":
+        return np.where(eta > sla, MISS_PENALTY, 0.0) + eta
+    return eta
+
+
+def _greedy(F: np.ndarray, w: np.ndarray, k: int, first: Optional[int]) -> List[int]:
+    """한 곳씩 추가하며 가중 비용을 가장 많이 줄이는 후보 선택 (first가 주어지면 그걸로 시작)"""
+    chosen: List[int] = []
+    best = np.full(F.shape[1], np.inf)
+    if first is not None:
+        chosen.append(first)
+        best = F[first].copy()
+    while len(chosen) < k:
+        totals = (np.minimum(F, best[None, :]) * w[None, :]).sum(axis=1)
+        totals[chosen] = np.inf
+        c = int(np.argmin(totals))
+        chosen.append(c)
+        best = np.minimum(best, F[c])
+    return chosen
+
+
+def _swap_search(F: np.ndarray, w: np.ndarray, chosen: List[int]) -> Tuple[List[int], float, int]:
+    """
+    PAM식 교환: 매 반복마다 (거점 m 제거, 후보 i 추가) 전 조합의 비용을 계산해 가장 좋은 개선 1개 적용.
+    수요점별 1순위/2순위 거점 비용만 있으면 m 제거 후 비용을 바로 알 수 있다.
+    """
+    chosen = list(chosen)
+    k = len(chosen)
+    iters = 0
+    while True:
+        S = F[chosen]                                  # (k x 수요)
+        order = np.argsort(S, axis=0)
+        d1 = S[order[0], np.arange(S.shape[1])]
+        d2 = S[order[1], np.arange(S.shape[1])] if k > 1 else np.full_like(d1, np.inf)
+        cur = float((d1 * w).sum())
+        if iters >= MAX_SWAP_ITERS:
+            return chosen, cur, iters
+        iters += 1
+
+        best_delta, best_swap = -1e-9, None
+        for m in range(k):
+            # m을 빼면 1순위가 m인 수요점은 2순위로 밀린다
+            base = np.where(order[0] == m, d2, d1)
+            totals = (np.minimum(F, base[None, :]) * w[None, :]).sum(axis=1) - cur
+            totals[chosen] = np.inf
+            i = int(np.argmin(totals))
+            if totals[i] < best_delta:
+                best_delta, best_swap = float(totals[i]), (m, i)
+        if best_swap is None:
+            return chosen, cur, iters
+        m, i = best_swap
+        chosen[m] = i
+
+
+def _solve_task(args):
+    # 프로세스 풀용(피클 가능한 top-level 함수)
+    F, w, k, first = args
+    chosen = _greedy(F, w, k, first)
+    return _swap_search(F, w, chosen)
+
+
+# ========= evaluation =========
+def _evaluate(eta: np.ndarray, w: np.ndarray, sla: float) -> Dict[str, Any]:
+    """eta: (거점 x 수요). 각 수요점은 가장 가까운 거점이 담당"""
+    if eta.shape[0] == 0 or eta.shape[1] == 0:
+        return {"assign": np.zeros(eta.shape[1], dtype=np.int64), "best": np.zeros(eta.shape[1]),
+                "expectedEtaMin": 0.0, "slaCoverage": 0.0, "etaP90Min": 0.0}
+    assign = np.argmin(eta, axis=0)
+    best = eta[assign, np.arange(eta.shape[1])]
+    order = np.argsort(best)
+    cum = np.cumsum(w[order])
+    p90 = float(best[order][min(int(np.searchsorted(cum, 0.9)), len(best) - 1)])
+    return {
+        "assign": assign,
+        "best": best,
+        "expectedEtaMin": round(float((best * w).sum()), 1),
+        "slaCoverage": round(float(w[best <= sla].sum()), 3),
+        "etaP90Min": round(p90, 1),
+    }
+
+
+# ========= Logic =========
+def place_depots(twins: List[Dict[str, Any]], req: DepotPlacementRequest) -> Dict[str, Any]:
+    lats, lons, w, sids = _demand_points(twins, req.weightBy)
+    if len(w) == 0:
+        return {"objective": req.objective, "engine": None, "depots": [], "providers": [], "summary": None}
+
+    rng = np.random.default_rng(req.seed)
+    cand = _pick_candidates(w, req.maxCandidates, rng)
+    eta, engine = _travel_min(lats[cand], lons[cand], lats, lons, req)
+    F = _objective_cost(eta, req.objective, req.slaMinutes)
+    k = min(req.nDepots, len(cand))
+
+    # restart 0 = 순수 그리디, 나머지는 가중치 비례로 뽑은 첫 거점에서 그리디 시작
+    p = w[cand] / w[cand].sum()
+    firsts: List[Optional[int]] = [None] + [int(x) for x in rng.choice(len(cand), size=req.restarts - 1, p=p)]
+    jobs = [(F, w, k, f) for f in firsts]
+
+    results = []
+    n_workers = effective_workers(req.workers)
+    if n_workers > 1 and len(jobs) > 1:
+        try:
+            results = list(get_process_pool().map(_solve_task, jobs))
+        except Exception:
+            results = []
+    if not results:
+        results = [_solve_task(j) for j in jobs]
+
+    chosen, _, _ = min(results, key=lambda r: r[1])
+    sites = cand[chosen]
+    ev = _evaluate(eta[chosen], w, req.slaMinutes)
+
+    depots = []
+    providers = []
+    for j, s in enumerate(sites.tolist()):
+        mine = ev["assign"] == j
+        name = f"{req.namePrefix}-{j + 1}"
+        depots.append({
+            "name": name,
+            "lat": round(float(lats[s]), 6),
+            "lon": round(float(lons[s]), 6),
+            "nearStationId": sids[s],
+            "demandShare": round(float(w[mine].sum()), 3),
+            "expectedEtaMin": round(float((ev["best"][mine] * w[mine]).sum() / max(w[mine].sum(), 1e-12)), 1),
+        })
+        providers.append(ProviderProfile(
+            name=name,
+            baseLat=round(float(lats[s]), 6),
+            baseLon=round(float(lons[s]), 6),
+            crews=req.crewsPerDepot,
+            remoteRecoveryRate=req.remoteRecoveryRate,
+            slaMinutes=req.slaMinutes,
+        ).model_dump())
+
+    out = {
+        "objective": req.objective,
+        "engine": engine,
+        "demandPoints": int(len(w)),
+        "candidates": int(len(cand)),
+        "restarts": len(jobs),
+        "depots": depots,
+        "providers": providers,
+        "summary": {k2: ev[k2] for k2 in ("expectedEtaMin", "slaCoverage", "etaP90Min")},
+    }
+
+    if req.current:
+        cur_eta, _ = _travel_min(
+            np.array([c.baseLat for c in req.current]), np.array([c.baseLon for c in req.current]),
+            lats, lons, req,
+        )
+        ev_cur = _evaluate(cur_eta, w, req.slaMinutes)
+        out["current"] = {k2: ev_cur[k2] for k2 in ("expectedEtaMin", "slaCoverage", "etaP90Min")}
+    return out
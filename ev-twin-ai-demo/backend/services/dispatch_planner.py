@@ -0,0 +1,361 @@
+# services/dispatch_planner.py
+# 다중 거점 / 다중 크루 출동 계획 (SLA 마감시간 포함)
+# - 거점(ProviderProfile)의 crews 수만큼 크루를 만들고, 크루별 방문 순서를 정한다
+# - 케이스 마감 = slaMinutes - downMinutes (이미 지난 케이스는 음수 → 무조건 miss)
+# - 목적: 1) SLA miss 수 최소  2) 총 이동거리(km) 최소
+# - 마감 빠른 순(EDD) 배정으로 초기해 → 여러 시드로 로컬서치를 프로세스 풀에서 병렬 실행 → 최선 채택
+# - routes 에는 SLA 안에 도착하는 방문만 남긴다. 나머지는 unassigned 에 이유와 함께 (에스컬레이션/추가 크루 대상)
+#     no_crews        : 크루가 없음
+#     sla_unreachable : 어느 거점에서 바로 가도 마감 전에 못 감 (이미 지난 케이스 포함) → 경로 탐색에서 제외
+#     crew_capacity   : 혼자라면 갈 수 있지만 크루가 모자라 최종 계획에서 마감을 넘김
+# - 거리 행렬은 distance_matrix 캐시(좌표 내용 해시 키)를 쓴다
+# - profile 모드: 지금 시각 버킷의 지점(거점·케이스) 쌍 구간 속도 행렬 (speed_profile.pair_kmh)
+import random
+import time
+from typing import List, Literal, Optional, Dict, Any, Tuple
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+from .fleet_agent import FleetPrioritizeItem
+from .distance_matrix import coords_version, station_matrix_km
+from .sim_procurement import ProviderProfile
+from .speed_profile import bucket_of, pair_kmh
+from .traffic import TrafficMode, avg_speed_kmh
+from .workers import get_process_pool, effective_workers
+
+MISS_PENALTY = 1e6  # miss 1건 > 어떤 거리 차이보다 크게 (사전식 목적)
+
+
+# ========= Models =========
+class DispatchCase(FleetPrioritizeItem):
+    serviceMinutes: Optional[float] = None  # 없으면 요청의 serviceMinutes 사용
+
+
+class DispatchPlanRequest(BaseModel):
+    items: List[DispatchCase]
+    depots: List[ProviderProfile]  # baseLat/baseLon/crews 사용
+
+    slaMinutes: int = 90
+    serviceMinutes: float = Field(30.0, ge=0.0)
+    trafficMode: TrafficMode = "normal"
+    congestionAlpha: float = 0.4
+
+    timeBudgetMs: int = Field(500, ge=0, le=10000)
+    workers: int = Field(4, ge=1, le=32)
+    seed: Optional[int] = None
+
+
+class DispatchStep(BaseModel):
+    idx: int
+    stationId: str
+    chargerId: str
+    name: str
+    lat: float
+    lon: float
+    legKm: float
+    arriveMin: float
+    finishMin: float
+    deadlineMin: float
+    slaHit: bool
+
+
+class DispatchUnassigned(BaseModel):
+    id: str                                  # stationId/chargerId
+    reason: Literal["no_crews", "sla_unreachable", "crew_capacity"]
+    deadlineMin: Optional[float] = None
+    bestArriveMin: Optional[float] = None    # 가장 가까운 거점에서 바로 갔을 때 도착(분)
+
+
+class DispatchCrewRoute(BaseModel):
+    depot: str
+    crew: int
+    totalKm: float
+    slaMisses: int
+    steps: List[DispatchStep]
+
+
+class DispatchPlanResponse(BaseModel):
+    totalCases: int
+    totalCrews: int
+    slaMisses: int
+    slaMissesInitial: int
+    totalKm: float
+    totalKmInitial: float
+    routes: List[DispatchCrewRoute]
+    unassigned: List[DispatchUnassigned] = []
+
+
+# ========= route evaluation =========
+def _route_eval(route: List[int], depot: int, ctx: Dict[str, Any]) -> Tuple[int, float]:
+    """return (miss 수, km). 크루는 0분에 거점 출발, 도착→작업→다음 지점"""
+    if not route:
+        return 0, 0.0
+    D = ctx["nDepots"]
+    cases = np.asarray(route, dtype=np.int64)
+    nodes = np.concatenate([[depot], cases + D])
+    legs = ctx["T"][nodes[:-1], nodes[1:]]
+    svc = ctx["svc"][cases]
+    arrive = np.cumsum(legs) + np.concatenate([[0.0], np.cumsum(svc[:-1])])
+    misses = int((arrive > ctx["deadline"][cases]).sum())
+    km = float(ctx["Dkm"][nodes[:-1], nodes[1:]].sum())
+    return misses, km
+
+
+def _cost(ev: Tuple[int, float]) -> float:
+    return ev[0] * MISS_PENALTY + ev[1]
+
+
+def _total(evals: List[Tuple[int, float]]) -> Tuple[int, float]:
+    return sum(e[0] for e in evals), sum(e[1] for e in evals)
+
+
+def _construct_edd(ctx: Dict[str, Any], crew_depot: List[int]) -> List[List[int]]:
+    """마감 빠른 순으로, SLA 안에 도착 가능한 크루 중 추가 이동거리가 가장 짧은 크루 끝에 붙인다"""
+    D = ctx["nDepots"]
+    T, Dkm, svc, deadline = ctx["T"], ctx["Dkm"], ctx["svc"], ctx["deadline"]
+
+    routes: List[List[int]] = [[] for _ in crew_depot]
+    last = np.asarray(crew_depot, dtype=np.int64)
+    clock = np.zeros(len(crew_depot), dtype=np.float64)
+
+    for c in np.argsort(deadline, kind="stable"):
+        node = int(c) + D
+        arrive = clock + T[last, node]
+        add_km = Dkm[last, node]
+        miss = arrive > deadline[c]
+        k = int(np.lexsort((add_km, miss))[0])
+
+        routes[k].append(int(c))
+        clock[k] = arrive[k] + svc[c]
+        last[k] = node
+    return routes
+
+
+def _local_search(ctx: Dict[str, Any], crew_depot: List[int], routes: List[List[int]], seed: int, budget_ms: float):
+    """
+    무작위 이웃(재배치 / 교환 / 구간 뒤집기) 언덕오르기.
+    변경된 크루 경로만 다시 평가하고, 비용이 같거나 좋아지면 채택(평탄 구간 이동 허용)
+    """
+    rng = random.Random(seed)
+    routes = [list(r) for r in routes]
+    evals = [_route_eval(r, crew_depot[k], ctx) for k, r in enumerate(routes)]
+    n_crews = len(routes)
+    deadline = time.perf_counter() + budget_ms / 1000.0
+    iters = 0
+
+    while time.perf_counter() < deadline:
+        iters += 1
+        nonempty = [k for k in range(n_crews) if routes[k]]
+        if not nonempty:
+            break
+        u = rng.random()
+        a = rng.choice(nonempty)
+
+        if u < 0.45:
+            # relocate: a의 한 케이스를 b의 임의 위치로
+            b = rng.randrange(n_crews)
+            i = rng.randrange(len(routes[a]))
+            ra = list(routes[a])
+            c = ra.pop(i)
+            rb = ra if a == b else list(routes[b])
+            rb.insert(rng.randrange(len(rb) + 1), c)
+            changed = {a: ra} if a == b else {a: ra, b: rb}
+        elif u < 0.75:
+            # swap: 두 케이스 자리 교환
+            b = rng.choice(nonempty)
+            ra = list(routes[a])
+            rb = ra if a == b else list(routes[b])
+            i = rng.randrange(len(ra))
+            j = rng.randrange(len(rb))
+            if a == b:
+                ra[i], ra[j] = ra[j], ra[i]
+                changed = {a: ra}
+            else:
+                ra[i], rb[j] = rb[j], ra[i]
+                changed = {a: ra, b: rb}
+        else:
+            # 2-opt: 한 경로 안에서 구간 뒤집기
+            if len(routes[a]) < 2:
+                continue
+            i, j = sorted(rng.sample(range(len(routes[a])), 2))
+            ra = list(routes[a])
+            ra[i : j + 1] = ra[i : j + 1][::-1]
+            changed = {a: ra}
+
+        new_evals = {k: _route_eval(r, crew_depot[k], ctx) for k, r in changed.items()}
+        delta = sum(_cost(e) for e in new_evals.values()) - sum(_cost(evals[k]) for k in changed)
+        if delta <= 1e-9:
+            for k, r in changed.items():
+                routes[k] = r
+                evals[k] = new_evals[k]
+
+    return routes, _total(evals), iters
+
+
+def _local_search_task(args):
+    # 프로세스 풀용(피클 가능한 top-level 함수)
+    return _local_search(*args)
+
+
+# ========= Logic =========
+def plan_dispatch(req: DispatchPlanRequest) -> DispatchPlanResponse:
+    items = req.items
+    crew_depot: List[int] = []
+    crew_label: List[Tuple[str, int]] = []
+    for d_idx, d in enumerate(req.depots):
+        for k in range(max(0, d.crews)):
+            crew_depot.append(d_idx)
+            crew_label.append((d.name, k + 1))
+
+    if not items or not crew_depot:
+        return DispatchPlanResponse(
+            totalCases=len(items),
+            totalCrews=len(crew_depot),
+            slaMisses=0,
+            slaMissesInitial=0,
+            totalKm=0.0,
+            totalKmInitial=0.0,
+            routes=[],
+            unassigned=[DispatchUnassigned(id=f"{x.stationId}/{x.chargerId}", reason="no_crews") for x in items],
+        )
+
+    n_dep = len(req.depots)
+    all_lats = np.array([d.baseLat for d in req.depots] + [x.lat for x in items], dtype=np.float64)
+    all_lons = np.array([d.baseLon for d in req.depots] + [x.lon for x in items], dtype=np.float64)
+    all_dkm = station_matrix_km(all_lats, all_lons, coords_version(all_lats, all_lons))
+    kmh = pair_kmh(all_lats, all_lons, all_lats, all_lons, bucket_of()) if req.trafficMode == "profile" else None
+    kmh = np.maximum(kmh, 5.0) if kmh is not None else max(avg_speed_kmh(req.trafficMode), 5.0)
+    all_cong = np.array([0.0] * n_dep + [x.trafficCongestion for x in items], dtype=np.float64)
+    all_T = all_dkm / kmh * 60.0 * (1.0 + req.congestionAlpha * all_cong)[None, :]
+
+    all_deadline = np.array([req.slaMinutes - (x.downMinutes or 0) for x in items], dtype=np.float64)
+    best_arrive = all_T[:n_dep, n_dep:].min(axis=0)
+
+    # 바로 가도 마감을 넘기는 케이스는 탐색에서 빼고 보고만 한다
+    unassigned: List[DispatchUnassigned] = []
+    reachable = best_arrive <= all_deadline
+    for c in np.flatnonzero(~reachable).tolist():
+        unassigned.append(_unassigned(items[c], "sla_unreachable", all_deadline[c], best_arrive[c]))
+    keep = np.flatnonzero(reachable)
+    idx_map = keep.tolist()  # 탐색용 케이스 번호 → items 인덱스
+    nodes = np.concatenate([np.arange(n_dep), keep + n_dep])
+    dkm = all_dkm[np.ix_(nodes, nodes)]
+    travel_min = all_T[np.ix_(nodes, nodes)]
+
+    ctx = {
+        "nDepots": n_dep,
+        "T": travel_min,
+        "Dkm": dkm,
+        "svc": np.array(
+            [x.serviceMinutes if x.serviceMinutes is not None else req.serviceMinutes for x in items],
+            dtype=np.float64,
+        )[keep],
+        "deadline": all_deadline[keep],
+    }
+    n_unreachable = len(items) - len(keep)
+
+    initial = _construct_edd(ctx, crew_depot) if len(keep) else [[] for _ in crew_depot]
+    init_total = _total([_route_eval(r, crew_depot[k], ctx) for k, r in enumerate(initial)])
+
+    best_routes, best_total = initial, init_total
+    if req.timeBudgetMs > 0 and len(keep):
+        n_workers = effective_workers(req.workers)
+        # 워커별 독립 시드 (요청 seed에서 파생, 전역 random 상태는 건드리지 않음)
+        seeds = np.random.SeedSequence(req.seed).generate_state(n_workers).tolist()
+        jobs = [(ctx, crew_depot, initial, seeds[w], req.timeBudgetMs) for w in range(n_workers)]
+
+        results = []
+        if n_workers > 1:
+            try:
+                pool = get_process_pool()
+                results = list(pool.map(_local_search_task, jobs))
+            except Exception:
+                results = []
+        if not results:
+            results = [_local_search_task(jobs[0])]
+
+        for routes, total, _ in results:
+            if _cost(total) < _cost(best_total):
+                best_routes, best_total = routes, total
+
+    out_routes: List[DispatchCrewRoute] = []
+    for k, route in enumerate(best_routes):
+        if not route:
+            continue
+        depot = crew_depot[k]
+        # 마감을 넘기는 방문은 빼고(crew_capacity) 남은 방문으로 다시 시각 계산. 빼면 뒤 방문은 빨라지기만 한다
+        while True:
+            clock, prev, late = 0.0, depot, None
+            for c in route:
+                clock += float(travel_min[prev, c + n_dep])
+                if clock > float(ctx["deadline"][c]):
+                    late = c
+                    break
+                clock += float(ctx["svc"][c])
+                prev = c + n_dep
+            if late is None:
+                break
+            route = [c for c in route if c != late]
+            x = items[idx_map[late]]
+            unassigned.append(_unassigned(x, "crew_capacity", ctx["deadline"][late], best_arrive[idx_map[late]]))
+        if not route:
+            continue
+
+        clock = 0.0
+        prev = depot
+        steps: List[DispatchStep] = []
+        misses = 0
+        km = 0.0
+        for s_idx, c in enumerate(route):
+            node = c + n_dep
+            leg = float(dkm[prev, node])
+            arrive = clock + float(travel_min[prev, node])
+            finish = arrive + float(ctx["svc"][c])
+            dl = float(ctx["deadline"][c])
+            hit = arrive <= dl
+            misses += 0 if hit else 1
+            km += leg
+            x = items[idx_map[c]]
+            steps.append(
+                DispatchStep(
+                    idx=s_idx + 1,
+                    stationId=x.stationId,
+                    chargerId=x.chargerId,
+                    name=x.name,
+                    lat=x.lat,
+                    lon=x.lon,
+                    legKm=round(leg, 3),
+                    arriveMin=round(arrive, 1),
+                    finishMin=round(finish, 1),
+                    deadlineMin=round(dl, 1),
+                    slaHit=hit,
+                )
+            )
+            clock = finish
+            prev = node
+
+        name, crew_no = crew_label[k]
+        out_routes.append(
+            DispatchCrewRoute(depot=name, crew=crew_no, totalKm=round(km, 3), slaMisses=misses, steps=steps)
+        )
+
+    return DispatchPlanResponse(
+        totalCases=len(items),
+        totalCrews=len(crew_depot),
+        slaMisses=int(best_total[0]) + n_unreachable,
+        slaMissesInitial=int(init_total[0]) + n_unreachable,
+        totalKm=round(sum(r.totalKm for r in out_routes), 3),
+        totalKmInitial=round(float(init_total[1]), 3),
+        routes=out_routes,
+        unassigned=unassigned,
+    )
+
+
+def _unassigned(x: DispatchCase, reason: str, deadline: float, best_arrive: float) -> DispatchUnassigned:
+    return DispatchUnassigned(
+        id=f"{x.stationId}/{x.chargerId}",
+        reason=reason,
+        deadlineMin=round(float(deadline), 1),
+        bestArriveMin=round(float(best_arrive), 1),
+    )
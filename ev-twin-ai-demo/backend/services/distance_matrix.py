@@ -0,0 +1,138 @@
+# services/distance_matrix.py
+# 거점→충전소 / 충전소↔충전소 거리 행렬 캐시
+# - numpy로 한 번에 계산(haversine_matrix_km), 결과는 메모리 상한이 있는 LRU에 보관
+# - 키 = (거점 좌표, 충전소 집합 버전). 버전은 좌표 배열 내용 해시라서 트윈 목록이 바뀌면 자동으로 새 키
+# - 호출 측은 행(row)을 받아 인덱스로 꺼내 쓰기만 하면 됨 (스칼라 haversine 반복 호출 제거)
+# - 좌표가 없거나 깨진 트윈은 NaN → 그 충전소의 거리도 NaN. 호출 측은 valid_coords 로 걸러서 쓴다
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from .traffic import haversine_matrix_km
+
+MAX_CACHE_BYTES = int(os.getenv("EV_TWIN_DISTCACHE_MB", "128")) * 1024 * 1024
+
+
+def coords_version(lats: np.ndarray, lons: np.ndarray) -> str:
+    h = hashlib.blake2b(digest_size=12)
+    h.update(np.ascontiguousarray(lats, dtype=np.float64).tobytes())
+    h.update(np.ascontiguousarray(lons, dtype=np.float64).tobytes())
+    return h.hexdigest()
+
+
+class _LRUBytes:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._d: "OrderedDict[Tuple, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            v = self._d.get(key)
+            if v is None:
+                self.misses += 1
+                return None
+            self._d.move_to_end(key)
+            self.hits += 1
+            return v
+
+    def put(self, key, arr: np.ndarray):
+        if arr.nbytes > self.max_bytes:
+            return  # 상한보다 크면 캐시하지 않고 그대로 사용
+        arr.setflags(write=False)
+        with self._lock:
+            old = self._d.pop(key, None)
+            if old is not None:
+                self.bytes -= old.nbytes
+            self._d[key] = arr
+            self.bytes += arr.nbytes
+            while self.bytes > self.max_bytes and self._d:
+                _, ev = self._d.popitem(last=False)
+                self.bytes -= ev.nbytes
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._d),
+                "bytes": self.bytes,
+                "maxBytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+_CACHE = _LRUBytes(MAX_CACHE_BYTES)
+
+# 마지막으로 본 트윈 목록 → 좌표 배열 (같은 list 객체면 다시 파싱하지 않음)
+_LAST_TWINS: Dict[str, Any] = {"twins": None, "coords": None}
+_LAST_LOCK = threading.Lock()
+
+
+def _safe_float(x, default=float("nan")) -> float:
+    try:
+        if x is None: return default
+        if isinstance(x, (int, float)): return float(x)
+        s = str(x).strip()
+        return float(s) if s else default
+    except (TypeError, ValueError):
+        return default
+
+
+def valid_coords(lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """좌표를 쓸 수 있는 충전소 bool 마스크"""
+    return np.isfinite(lats) & np.isfinite(lons)
+
+
+def twin_coords(twins: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray, str]:
+    """
+    트윈 목록 → (lat 배열, lon 배열, 충전소 집합 버전)
+    - 없음/숫자 아님/0(station.tsv 로딩 시 빈 좌표 자리표시) → 두 좌표 모두 NaN
+    """
+    with _LAST_LOCK:
+        if _LAST_TWINS["twins"] is twins:
+            return _LAST_TWINS["coords"]
+
+    lats = np.array([_safe_float(t.get("lat")) for t in twins], dtype=np.float64)
+    lons = np.array([_safe_float(t.get("lon")) for t in twins], dtype=np.float64)
+    bad = ~valid_coords(lats, lons) | (lats == 0.0) | (lons == 0.0)
+    lats[bad] = np.nan
+    lons[bad] = np.nan
+    lats.setflags(write=False)
+    lons.setflags(write=False)
+    coords = (lats, lons, coords_version(lats, lons))
+
+    with _LAST_LOCK:
+        _LAST_TWINS["twins"] = twins
+        _LAST_TWINS["coords"] = coords
+    return coords
+
+
+def depot_row_km(base_lat: float, base_lon: float, lats: np.ndarray, lons: np.ndarray, version: str) -> np.ndarray:
+    """거점 1곳 → 충전소 전체 거리(km) 행 (좌표 NaN 인 충전소는 NaN)"""
+    key = ("depot", round(float(base_lat), 6), round(float(base_lon), 6), version)
+    row = _CACHE.get(key)
+    if row is None:
+        row = haversine_matrix_km(base_lat, base_lon, lats, lons)[0]
+        _CACHE.put(key, row)
+    return row
+
+
+def station_matrix_km(lats: np.ndarray, lons: np.ndarray, version: str) -> np.ndarray:
+    """충전소↔충전소 거리(km) 행렬"""
+    key = ("stations", version)
+    m = _CACHE.get(key)
+    if m is None:
+        m = haversine_matrix_km(lats, lons, lats, lons)
+        _CACHE.put(key, m)
+    return m
+
+
+def cache_stats() -> Dict[str, Any]:
+    return _CACHE.stats()
@@ -2,10 +2,16 @@
 from typing import List, Optional, Dict, Any, Literal
 from pydantic import BaseModel, Field
 from datetime import datetime, timedelta, timezone
+import asyncio
 import math
-import os
 import json
 
+from .routing import solve_open_route
+from .llm_budget import fit_items
+from .llm_client import DEFAULT_MODEL, llm_text
+from .llm_stream import sse_event, stream_json_explain
+from .llm_telemetry import LLM_TELEMETRY
+
 # ========= time / utils =========
 KST = timezone(timedelta(hours=9))
 
@@ -59,50 +65,69 @@ def _extract_json_object(s: str) -> str:
         return s[start : end + 1]
     return s
 
-def _llm_explain_fleet(payload: Dict[str, Any]) -> Dict[str, Any]:
-    key = os.getenv("OPENAI_API_KEY")
-    if not key:
-        return {"note": "OPENAI_API_KEY missing"}
+FLEET_SYSTEM = (
+    "너는 전기차 충전소 관제 책임자다. "
+    "입력된 '장애 후보 Top 리스트'를 보고 오늘의 처리 우선순위 전략을 제안한다. "
+    "반드시 아래 JSON만 출력(코드블록/설명 금지): "
+    "{"
+    "\"summary\": string, "
+    "\"top_reasons\": [string], "
+    "\"risks\": [string], "
+    "\"suggested_groups\": ["
+    "  {\"name\": string, \"hint\": string, \"items\": [string]}"
+    "]"
+    "}"
+)
+
+def _fallback_fleet(payload: Dict[str, Any], status: str) -> Dict[str, Any]:
+    """LLM 시간 초과/오류 시 규칙 기반 요약 (prioritize: top / route: steps)"""
+    LLM_TELEMETRY.record_fallback(_fleet_tag(payload))
+    rows = payload.get("top") or payload.get("steps") or []
+    ids = [r.get("id") for r in rows]
+    long_down = [r["id"] for r in rows if (r.get("downMinutes") or 0) >= 180]
+    congested = [r["id"] for r in rows if (r.get("trafficCongestion") or 0) >= 0.6]
+
+    if "steps" in payload:
+        summary = f"규칙 기반 요약(LLM {status}): {len(rows)}곳 방문, 총 {payload.get('totalKm')}km"
+        reasons = [f"초기 경로 {payload.get('totalKmInitial')}km → 개선 {payload.get('totalKm')}km"]
+    else:
+        summary = f"규칙 기반 요약(LLM {status}): 후보 {payload.get('totalCandidates')}건 중 상위 {len(rows)}건"
+        reasons = [f"최상위 {ids[0]} (score {rows[0].get('score')})"] if rows else []
+        if long_down:
+            reasons.append(f"3시간 이상 장기 다운 {len(long_down)}건")
+
+    return {
+        "summary": summary,
+        "top_reasons": reasons,
+        "risks": [f"교통 혼잡 구간 {len(congested)}건 → 도착 지연 가능"] if congested else [],
+        "suggested_groups": [
+            g for g in (
+                {"name": "장기 다운 우선", "hint": "3시간 이상 다운", "items": long_down},
+                {"name": "혼잡 구간", "hint": "혼잡 시간 회피 출동", "items": congested},
+            ) if g["items"]
+        ],
+        "fallback": True,
+    }
 
-    try:
-        from openai import OpenAI
-        client = OpenAI(api_key=key)
-    except Exception as e:
-        return {"note": "openai_import_or_client_error", "error": str(e)}
-
-    system = (
-        "너는 전기차 충전소 관제 책임자다. "
-        "입력된 '장애 후보 Top 리스트'를 보고 오늘의 처리 우선순위 전략을 제안한다. "
-        "반드시 아래 JSON만 출력(코드블록/설명 금지): "
-        "{"
-        "\"summary\": string, "
-        "\"top_reasons\": [string], "
-        "\"risks\": [string], "
-        "\"suggested_groups\": ["
-        "  {\"name\": string, \"hint\": string, \"items\": [string]}"
-        "]"
-        "}"
-    )
+def _fleet_tag(payload: Dict[str, Any]) -> str:
+    return "fleet_route" if "steps" in payload else "fleet_prioritize"
 
-    resp = client.responses.create(
-        model="gpt-4o-mini",
-        input=[
-            {"role": "system", "content": system},
-            {"role": "user", "content": json.dumps(payload, ensure_ascii=False)},
-        ],
-    )
+def _llm_explain_fleet(payload: Dict[str, Any]) -> Dict[str, Any]:
+    return _fleet_llm_result(payload, *llm_text(FLEET_SYSTEM, payload, tag=_fleet_tag(payload)))
 
-    text = getattr(resp, "output_text", None)
-    if not text:
-        try:
-            text = resp.output[0].content[0].text
-        except Exception:
-            return {"note": "cannot_extract_llm_text", "raw": str(resp)}
+def _fleet_llm_result(payload: Dict[str, Any], text: Optional[str], status: str) -> Dict[str, Any]:
+    if status == "no_key":
+        LLM_TELEMETRY.record_fallback(_fleet_tag(payload))
+        return {"note": "OPENAI_API_KEY missing"}
+    if text is None:
+        return _fallback_fleet(payload, status)
 
     try:
         clean = _extract_json_object(text)
         return json.loads(clean)
     except Exception:
+        LLM_TELEMETRY.record_parse_failure(_fleet_tag(payload))
+        LLM_TELEMETRY.record_fallback(_fleet_tag(payload))
         return {"note": "llm_not_json", "raw": text}
 
 # ========= Models =========
@@ -150,6 +175,9 @@ class FleetRouteRequest(BaseModel):
     baseLon: float
     congestionAlpha: float = 0.4
 
+    # ✅ 동선 개선(2-opt/Or-opt) 시간 예산. 0이면 최근접 이웃 초기해 그대로
+    improveTimeMs: int = Field(200, ge=0, le=5000)
+
     # ✅ LLM
     useLLM: bool = False
 
@@ -166,12 +194,74 @@ class FleetRouteStep(BaseModel):
 
 class FleetRouteResponse(BaseModel):
     totalKm: float
+    totalKmInitial: Optional[float] = None  # 개선 전(최근접 이웃) 총 거리
     steps: List[FleetRouteStep]
     llm: Optional[Dict[str, Any]] = None
 
+# ========= LLM payload =========
+def _now(req: FleetPrioritizeRequest) -> datetime:
+    return _parse_yyyymmddhhmmss(req.nowTs) if req.nowTs else datetime.now(KST)
+
+def _prioritize_llm_payload(req: FleetPrioritizeRequest, resp: FleetPrioritizeResponse, now: datetime) -> Dict[str, Any]:
+    # llmTopK 는 상한. 토큰 예산(llm_budget)을 넘으면 이름/출력 필드를 빼고, 그래도 넘치면 K를 줄인다
+    topk = resp.items[: max(1, min(req.llmTopK, len(resp.items)))]
+
+    def build(k: int, level: int) -> Dict[str, Any]:
+        rows = []
+        for x in topk[:k]:
+            row = {
+                "id": f'{x.stationId}/{x.chargerId}',
+                "score": x.score,
+                "downMinutes": x.downMinutes,
+                "downProb6h": x.downProb6h,
+                "trafficCongestion": x.trafficCongestion,
+            }
+            if level == 0:
+                row.update({"name": x.name, "outputKw": x.outputKw, "zscode": None})  # zscode: 필요하면 t에서 꺼내 넣어도 됨
+            rows.append(row)
+        return {
+            # 분 단위로 자름: downMinutes 도 분 단위라 설명 내용은 같고, LLM 캐시 키가 요청마다 바뀌지 않게
+            "now": now.replace(second=0, microsecond=0).isoformat(timespec="minutes"),
+            "weights": {
+                "w_duration": req.w_duration,
+                "w_prob": req.w_prob,
+                "w_congestion": req.w_congestion,
+                "w_importance": req.w_importance,
+            },
+            "totalCandidates": resp.totalCandidates,
+            "top": rows,
+        }
+
+    payload, _ = fit_items("fleet_prioritize", DEFAULT_MODEL, FLEET_SYSTEM, build, len(topk), 2)
+    return payload
+
+def _route_llm_payload(req: FleetRouteRequest, resp: FleetRouteResponse) -> Dict[str, Any]:
+    steps = resp.steps[:30]
+
+    def build(k: int, level: int) -> Dict[str, Any]:
+        return {
+            "base": {"lat": req.baseLat, "lon": req.baseLon},
+            "congestionAlpha": req.congestionAlpha,
+            "totalKm": resp.totalKm,
+            "totalKmInitial": resp.totalKmInitial,
+            "steps": [
+                {
+                    "idx": s.idx,
+                    "id": f"{s.stationId}/{s.chargerId}",
+                    **({"name": s.name} if level == 0 else {}),
+                    "eta_like_km": s.eta_like_km,
+                    "trafficCongestion": s.trafficCongestion,
+                }
+                for s in steps[:k]
+            ],
+        }
+
+    payload, _ = fit_items("fleet_route", DEFAULT_MODEL, FLEET_SYSTEM, build, len(steps), 2)
+    return payload
+
 # ========= Logic =========
 def prioritize_fleet(twins: List[Dict[str, Any]], req: FleetPrioritizeRequest) -> FleetPrioritizeResponse:
-    now = _parse_yyyymmddhhmmss(req.nowTs) if req.nowTs else datetime.now(KST)
+    now = _now(req)
 
     candidates: List[FleetPrioritizeItem] = []
 
@@ -250,58 +340,34 @@ def prioritize_fleet(twins: List[Dict[str, Any]], req: FleetPrioritizeRequest) -
     )
 
     if req.useLLM and items:
-        topk = items[: max(1, min(req.llmTopK, len(items)))]
-        compact = {
-            "now": now.isoformat(),
-            "weights": {
-                "w_duration": req.w_duration,
-                "w_prob": req.w_prob,
-                "w_congestion": req.w_congestion,
-                "w_importance": req.w_importance,
-            },
-            "totalCandidates": len(candidates),
-            "top": [
-                {
-                    "id": f'{x.stationId}/{x.chargerId}',
-                    "name": x.name,
-                    "score": x.score,
-                    "downMinutes": x.downMinutes,
-                    "downProb6h": x.downProb6h,
-                    "trafficCongestion": x.trafficCongestion,
-                    "outputKw": x.outputKw,
-                    "zscode": None,  # 필요하면 t에서 꺼내 넣어도 됨
-                }
-                for x in topk
-            ],
-        }
-        resp.llm = _llm_explain_fleet(compact)
+        resp.llm = _llm_explain_fleet(_prioritize_llm_payload(req, resp, now))
 
     return resp
 
 def plan_route(req: FleetRouteRequest) -> FleetRouteResponse:
-    remaining = [i.model_dump() for i in req.items]
-    cur_lat, cur_lon = req.baseLat, req.baseLon
+    items = [i.model_dump() for i in req.items]
+
+    # 거리 행렬 + 최근접 이웃 초기해 → 2-opt/Or-opt 개선 (services/routing.py)
+    initial, path, dist = solve_open_route(
+        req.baseLat,
+        req.baseLon,
+        [float(it["lat"]) for it in items],
+        [float(it["lon"]) for it in items],
+        [float(it.get("trafficCongestion", 0.0)) for it in items],
+        req.congestionAlpha,
+        req.improveTimeMs,
+    )
+
+    total_km_initial = float(dist[initial[:-1], initial[1:]].sum()) if len(initial) > 1 else 0.0
+    legs = dist[path[:-1], path[1:]] if len(path) > 1 else []
 
     steps: List[FleetRouteStep] = []
     total_km = 0.0
 
-    for k in range(len(remaining)):
-        best_j = None
-        best_cost = None
-        best_dist = None
-
-        for j, it in enumerate(remaining):
-            d = _haversine_km(cur_lat, cur_lon, it["lat"], it["lon"])
-            cong = float(it.get("trafficCongestion", 0.0))
-            cost = d * (1.0 + req.congestionAlpha * cong)
-
-            if best_cost is None or cost < best_cost:
-                best_cost = cost
-                best_j = j
-                best_dist = d
-
-        pick = remaining.pop(best_j)
-        total_km += float(best_dist)
+    for k, node in enumerate(path[1:]):
+        pick = items[int(node) - 1]
+        leg_km = float(legs[k])
+        total_km += leg_km
 
         steps.append(
             FleetRouteStep(
@@ -312,31 +378,43 @@ def plan_route(req: FleetRouteRequest) -> FleetRouteResponse:
                 lat=float(pick["lat"]),
                 lon=float(pick["lon"]),
                 score=float(pick["score"]),
-                eta_like_km=round(float(best_dist), 3),
+                eta_like_km=round(leg_km, 3),
                 trafficCongestion=float(pick.get("trafficCongestion", 0.0)),
             )
         )
 
-        cur_lat, cur_lon = float(pick["lat"]), float(pick["lon"])
-
-    resp = FleetRouteResponse(totalKm=round(total_km, 3), steps=steps, llm=None)
+    resp = FleetRouteResponse(
+        totalKm=round(total_km, 3),
+        totalKmInitial=round(total_km_initial, 3),
+        steps=steps,
+        llm=None,
+    )
 
     if req.useLLM and steps:
-        compact = {
-            "base": {"lat": req.baseLat, "lon": req.baseLon},
-            "congestionAlpha": req.congestionAlpha,
-            "totalKm": resp.totalKm,
-            "steps": [
-                {
-                    "idx": s.idx,
-                    "id": f"{s.stationId}/{s.chargerId}",
-                    "name": s.name,
-                    "eta_like_km": s.eta_like_km,
-                    "trafficCongestion": s.trafficCongestion,
-                }
-                for s in steps[:30]
-            ],
-        }
-        resp.llm = _llm_explain_fleet(compact)
+        resp.llm = _llm_explain_fleet(_route_llm_payload(req, resp))
 
     return resp
+
+
+# ========= streaming (SSE) =========
+async def prioritize_fleet_stream(twins: List[Dict[str, Any]], req: FleetPrioritizeRequest):
+    """result(LLM 없이 계산한 본 결과) 먼저 → LLM 설명 delta / partial / final"""
+    now = _now(req).replace(microsecond=0)
+    resp = await asyncio.to_thread(prioritize_fleet, twins, req.model_copy(update={"useLLM": False, "nowTs": now.strftime("%Y%m%d%H%M%S")}))
+    yield sse_event("result", resp.model_dump())
+    if req.useLLM and resp.items:
+        payload = _prioritize_llm_payload(req, resp, now)
+        async for chunk in stream_json_explain(
+            FLEET_SYSTEM, payload, lambda t, st: _fleet_llm_result(payload, t, st), tag=_fleet_tag(payload)
+        ):
+            yield chunk
+
+async def plan_route_stream(req: FleetRouteRequest):
+    resp = await asyncio.to_thread(plan_route, req.model_copy(update={"useLLM": False}))
+    yield sse_event("result", resp.model_dump())
+    if req.useLLM and resp.steps:
+        payload = _route_llm_payload(req, resp)
+        async for chunk in stream_json_explain(
+            FLEET_SYSTEM, payload, lambda t, st: _fleet_llm_result(payload, t, st), tag=_fleet_tag(payload)
+        ):
+            yield chunk
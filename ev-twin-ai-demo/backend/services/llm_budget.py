@@ -0,0 +1,64 @@
+# services/llm_budget.py
+# LLM 프롬프트 크기 예산
+# - 토큰 예산 = min(EV_TWIN_LLM_MAX_INPUT_TOKENS, 지연 예산을 관측 회귀로 환산한 토큰)
+#   (EV_TWIN_LLM_LATENCY_BUDGET_MS 가 0이면 지연 예산은 쓰지 않음)
+# - fit_items: 세부 수준(detail)을 먼저 줄이고, 그래도 넘치면 목록 길이(top-K)를 이분 탐색으로 줄인다
+import json
+import os
+from typing import Any, Callable, Dict, Tuple
+
+from .llm_telemetry import LLM_TELEMETRY, estimate_tokens
+
+MAX_INPUT_TOKENS = int(os.getenv("EV_TWIN_LLM_MAX_INPUT_TOKENS", "3000"))
+LATENCY_BUDGET_MS = float(os.getenv("EV_TWIN_LLM_LATENCY_BUDGET_MS", "0"))
+MIN_TOKENS = 200
+
+
+def payload_tokens(system: str, payload: Any) -> int:
+    return estimate_tokens(system) + estimate_tokens(json.dumps(payload, ensure_ascii=False))
+
+
+def token_budget(model: str) -> int:
+    budget = MAX_INPUT_TOKENS
+    if LATENCY_BUDGET_MS > 0:
+        ab = LLM_TELEMETRY.latency_model(model)
+        if ab is not None:
+            a, b = ab
+            budget = min(budget, max(MIN_TOKENS, int((LATENCY_BUDGET_MS - a) / b)))
+    return budget
+
+
+def fit_items(
+    tag: str,
+    model: str,
+    system: str,
+    build: Callable[[int, int], Any],
+    n_items: int,
+    n_levels: int,
+) -> Tuple[Any, Dict[str, Any]]:
+    """
+    build(k, level) → 앞에서 k개 항목을 세부 수준 level(0=가장 자세히)로 담은 payload.
+    예산 안에 들어오는 가장 큰 (자세한) payload와 축소 정보를 돌려준다
+    """
+    budget = token_budget(model)
+    level = 0
+    payload = build(n_items, 0)
+    while payload_tokens(system, payload) > budget and level + 1 < n_levels:
+        level += 1
+        payload = build(n_items, level)
+
+    k = n_items
+    if payload_tokens(system, payload) > budget and n_items > 1:
+        lo, hi = 1, n_items - 1  # 최소 1개는 보낸다
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if payload_tokens(system, build(mid, level)) <= budget:
+                lo = mid
+            else:
+                hi = mid - 1
+        k = lo
+        payload = build(k, level)
+
+    if k < n_items or level > 0:
+        LLM_TELEMETRY.record_trim(tag, n_items - k)
+    return payload, {"items": k, "of": n_items, "level": level, "estTokens": payload_tokens(system, payload), "budget": budget}
@@ -0,0 +1,134 @@
+# services/llm_cache.py
+# LLM 응답 디스크 캐시 (SQLite)
+# - 키 = (model, system prompt, 정규화된 payload JSON) 해시 → 같은 입력이면 LLM 호출 없이 바로 반환
+# - TTL + 최대 건수 초과 시 오래 안 쓴 것부터 삭제
+# - JSON으로 파싱되는 응답만 저장 (파싱 실패 응답이 캐시에 남아 계속 실패하는 것 방지)
+# - 서버 재시작 후에도 유지. 디스크를 못 쓰는 환경이면 메모리 DB로 동작
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+CACHE_PATH = Path(os.getenv("EV_TWIN_LLM_CACHE_PATH", str(Path(__file__).resolve().parents[1] / ".cache" / "llm_cache.sqlite3")))
+TTL_S = float(os.getenv("EV_TWIN_LLM_CACHE_TTL_S", str(7 * 24 * 3600)))
+MAX_ENTRIES = int(os.getenv("EV_TWIN_LLM_CACHE_MAX", "5000"))
+
+
+def llm_cache_key(model: str, system: str, payload: Any) -> str:
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    h = hashlib.blake2b(digest_size=20)
+    for part in (model, system, raw):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _parses_as_json(text: str) -> bool:
+    s = text.strip()
+    start, end = s.find("{"), s.rfind("}")
+    if start == -1 or end <= start:
+        return False
+    try:
+        json.loads(s[start : end + 1])
+        return True
+    except Exception:
+        return False
+
+
+class LLMCache:
+    def __init__(self, path: Path, ttl_s: float, max_entries: int):
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._path = path
+        self.backend: Optional[str] = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            try:
+                self._path.parent.mkdir(parents=True, exist_ok=True)
+                conn = sqlite3.connect(str(self._path), check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+                self.backend = str(self._path)
+            except (OSError, sqlite3.Error):
+                conn = sqlite3.connect(":memory:", check_same_thread=False)
+                self.backend = ":memory:"
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                " key TEXT PRIMARY KEY, model TEXT, text TEXT,"
+                " created REAL, expires REAL, last_used REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_last_used ON llm_cache(last_used)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            row = db.execute("SELECT text, expires FROM llm_cache WHERE key=?", (key,)).fetchone()
+            if row is None or row[1] < now:
+                if row is not None:
+                    db.execute("DELETE FROM llm_cache WHERE key=?", (key,))
+                    db.commit()
+                self.misses += 1
+                return None
+            db.execute("UPDATE llm_cache SET last_used=? WHERE key=?", (now, key))
+            db.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, model: str, text: str):
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "INSERT OR REPLACE INTO llm_cache(key, model, text, created, expires, last_used) VALUES (?,?,?,?,?,?)",
+                (key, model, text, now, now + self.ttl_s, now),
+            )
+            self.stores += 1
+            cur = db.execute("DELETE FROM llm_cache WHERE expires < ?", (now,))
+            self.evictions += cur.rowcount
+            n = db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            if n > self.max_entries:
+                cur = db.execute(
+                    "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY last_used LIMIT ?)",
+                    (n - self.max_entries,),
+                )
+                self.evictions += cur.rowcount
+            db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._db().execute("DELETE FROM llm_cache")
+            self._db().commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            db = self._db()
+            n, size = db.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(text)), 0) FROM llm_cache").fetchone()
+            return {
+                "backend": self.backend,
+                "entries": n,
+                "textBytes": size,
+                "maxEntries": self.max_entries,
+                "ttlS": self.ttl_s,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "evictions": self.evictions,
+            }
+
+
+LLM_CACHE = LLMCache(CACHE_PATH, TTL_S, MAX_ENTRIES)
+
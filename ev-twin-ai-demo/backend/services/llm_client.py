@@ -0,0 +1,282 @@
+# services/llm_client.py
+# 공용 비동기 LLM 클라이언트
+# - AsyncOpenAI 1개를 전용 이벤트 루프 스레드에서 lazily 생성 → HTTP 연결 재사용
+#   (sync 엔드포인트 스레드 / async 엔드포인트 양쪽에서 같은 클라이언트를 쓰기 위해 루프를 따로 둔다)
+# - 전역 세마포어로 동시 호출 수 제한, 호출별 deadline (초과하면 None → 호출 측 규칙 기반 fallback)
+# - llm_cache(SQLite) 먼저 확인, JSON 응답만 저장
+# - OPENAI_BASE_URL 로 로컬 stub 서버(Responses API 흉내, tests/llm_stub.py)에 붙여 테스트
+# - 모든 호출을 tag(호출 위치)별로 llm_telemetry 에 기록 (payload 크기/토큰/지연/상태)
+import asyncio
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Optional, Tuple
+
+from .llm_cache import LLM_CACHE, llm_cache_key, _parses_as_json
+from .llm_telemetry import LLM_TELEMETRY, estimate_tokens
+
+DEFAULT_MODEL = os.getenv("EV_TWIN_LLM_MODEL", "gpt-4o-mini")
+CONCURRENCY = int(os.getenv("EV_TWIN_LLM_CONCURRENCY", "8"))
+TIMEOUT_S = float(os.getenv("EV_TWIN_LLM_TIMEOUT_S", "20"))
+
+_LOOP: Optional[asyncio.AbstractEventLoop] = None
+_LOOP_LOCK = threading.Lock()
+_STATE: dict = {"client": None, "sem": None, "key": None}
+
+
+def llm_available() -> bool:
+    return bool(os.getenv("OPENAI_API_KEY", "").strip())
+
+
+def _llm_loop() -> asyncio.AbstractEventLoop:
+    global _LOOP
+    with _LOOP_LOCK:
+        if _LOOP is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="llm-loop", daemon=True).start()
+            _LOOP = loop
+        return _LOOP
+
+
+async def _client():
+    # llm 루프 안에서만 호출. 키/base URL 이 바뀌면(.env 재로드 등) 새로 만들고 이전 연결 풀은 닫는다
+    key = os.getenv("OPENAI_API_KEY", "").strip()
+    base_url = os.getenv("OPENAI_BASE_URL") or None
+    if _STATE["client"] is None or _STATE["key"] != (key, base_url):
+        import httpx
+        from openai import AsyncOpenAI
+
+        old = _STATE["client"]
+        _STATE["client"] = AsyncOpenAI(
+            api_key=key,
+            base_url=base_url,
+            max_retries=0,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=CONCURRENCY, max_keepalive_connections=CONCURRENCY),
+                timeout=httpx.Timeout(TIMEOUT_S, connect=5.0),
+            ),
+        )
+        _STATE["key"] = (key, base_url)
+        if old is not None:
+            try:
+                await old.close()  # http_client(httpx.AsyncClient)까지 닫힌다
+            except Exception:
+                pass
+    if _STATE["sem"] is None:
+        _STATE["sem"] = asyncio.Semaphore(CONCURRENCY)
+    return _STATE["client"]
+
+
+def warm_up():
+    """서버 시작 시 openai import / 클라이언트 생성을 미리 (첫 설명 요청 지연 제거). 블로킹하지 않음"""
+    if llm_available():
+        async def _init():
+            await _client()
+        asyncio.run_coroutine_threadsafe(_init(), _llm_loop())
+
+
+class _Call:
+    """호출 1건 계측: 생성 시 payload 크기/추정 토큰, done() 에서 상태/지연/usage 기록"""
+
+    def __init__(self, tag: str, model: str, system: str, payload: Any):
+        body = json.dumps(payload, ensure_ascii=False)
+        self.tag, self.model = tag, model
+        self.bytes = len(body.encode("utf-8"))
+        self.est = estimate_tokens(system) + estimate_tokens(body)
+        self.t0 = time.perf_counter()
+        self.usage: Optional[dict] = None
+
+    def done(self, status: str):
+        LLM_TELEMETRY.record_call(
+            self.tag, self.model, status, self.bytes, self.est, (time.perf_counter() - self.t0) * 1000.0, self.usage
+        )
+
+
+def _usage(resp) -> Optional[dict]:
+    u = getattr(resp, "usage", None)
+    if u is None:
+        return None
+    return {"input_tokens": getattr(u, "input_tokens", None), "output_tokens": getattr(u, "output_tokens", None)}
+
+
+def _extract_text(resp) -> Optional[str]:
+    text = getattr(resp, "output_text", None)
+    if not text:
+        # SDK 버전에 따라 구조가 달라서 fallback
+        try:
+            text = resp.output[0].content[0].text
+        except Exception:
+            return None
+    return text
+
+
+async def _request(model: str, system: str, payload: Any, timeout_s: float, call: _Call) -> Optional[str]:
+    client = await _client()
+    async with _STATE["sem"]:
+        resp = await asyncio.wait_for(
+            client.responses.create(
+                model=model,
+                input=[
+                    {"role": "system", "content": system},
+                    {"role": "user", "content": json.dumps(payload, ensure_ascii=False)},
+                ],
+            ),
+            timeout=timeout_s,
+        )
+    call.usage = _usage(resp)
+    return _extract_text(resp)
+
+
+def _submit(model: str, system: str, payload: Any, timeout_s: float, call: _Call) -> Future:
+    return asyncio.run_coroutine_threadsafe(_request(model, system, payload, timeout_s, call), _llm_loop())
+
+
+def _finish(key: str, model: str, fut: Future) -> Tuple[Optional[str], str]:
+    try:
+        text = fut.result(timeout=0)
+    except (asyncio.TimeoutError, TimeoutError):
+        return None, "timeout"
+    except Exception:
+        return None, "error"
+    if not text:
+        return None, "error"
+    if _parses_as_json(text):
+        LLM_CACHE.put(key, model, text)
+    return text, "ok"
+
+
+def _recorded(call: _Call, result: Tuple[Optional[str], str]) -> Tuple[Optional[str], str]:
+    call.done(result[1])
+    return result
+
+
+def _cached(tag: str, model: str, system: str, payload: Any) -> Tuple[str, Optional[str], _Call]:
+    # SQLite 조회라 async 경로에서는 asyncio.to_thread 로 부른다
+    call = _Call(tag, model, system, payload)
+    key = llm_cache_key(model, system, payload)
+    return key, LLM_CACHE.get(key), call
+
+
+def llm_text(
+    system: str, payload: Any, model: str = DEFAULT_MODEL, timeout_s: Optional[float] = None, tag: str = "default"
+) -> Tuple[Optional[str], str]:
+    """
+    (sync) system + JSON payload → (응답 텍스트, 상태)
+    상태: cache | ok | no_key | timeout | error   (텍스트가 None이면 호출 측 fallback)
+    """
+    if not llm_available():
+        return _recorded(_Call(tag, model, system, payload), (None, "no_key"))
+    key, hit, call = _cached(tag, model, system, payload)
+    if hit is not None:
+        return _recorded(call, (hit, "cache"))
+
+    timeout_s = TIMEOUT_S if timeout_s is None else timeout_s
+    fut = _submit(model, system, payload, timeout_s, call)
+    try:
+        fut.exception(timeout=timeout_s + 1.0)  # 세마포어 대기까지 포함한 상한
+    except Exception:
+        fut.cancel()
+        return _recorded(call, (None, "timeout"))
+    return _recorded(call, _finish(key, model, fut))
+
+
+async def llm_text_async(
+    system: str, payload: Any, model: str = DEFAULT_MODEL, timeout_s: Optional[float] = None, tag: str = "default"
+) -> Tuple[Optional[str], str]:
+    """llm_text 의 async 판 (호출한 이벤트 루프를 막지 않는다)"""
+    if not llm_available():
+        return _recorded(_Call(tag, model, system, payload), (None, "no_key"))
+    key, hit, call = await asyncio.to_thread(_cached, tag, model, system, payload)
+    if hit is not None:
+        return _recorded(call, (hit, "cache"))
+
+    timeout_s = TIMEOUT_S if timeout_s is None else timeout_s
+    fut = _submit(model, system, payload, timeout_s, call)
+    try:
+        await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(fut)), timeout=timeout_s + 1.0)
+    except asyncio.TimeoutError:
+        fut.cancel()
+        return _recorded(call, (None, "timeout"))
+    except Exception:
+        pass
+    return _recorded(call, await asyncio.to_thread(_finish, key, model, fut))
+
+
+async def llm_stream_async(
+    system: str, payload: Any, model: str = DEFAULT_MODEL, timeout_s: Optional[float] = None, tag: str = "default"
+):
+    """
+    스트리밍 호출. ("delta", 조각) 을 도착하는 대로 내보내고 마지막에 ("done", 전체 텍스트 | None, 상태).
+    캐시 hit이면 전체 텍스트를 delta 1개로 바로 보낸다
+    """
+    if not llm_available():
+        _Call(tag, model, system, payload).done("no_key")
+        yield ("done", None, "no_key")
+        return
+    key, hit, call = await asyncio.to_thread(_cached, tag, model, system, payload)
+    if hit is not None:
+        call.done("cache")
+        yield ("delta", hit)
+        yield ("done", hit, "cache")
+        return
+
+    timeout_s = TIMEOUT_S if timeout_s is None else timeout_s
+    caller = asyncio.get_running_loop()
+    q: asyncio.Queue = asyncio.Queue()
+
+    def put(item):
+        caller.call_soon_threadsafe(q.put_nowait, item)
+
+    async def produce():
+        # llm 루프에서 실행 → 조각을 호출한 루프의 큐로 넘긴다
+        parts = []
+
+        async def run():
+            stream = await client.responses.create(
+                model=model,
+                input=[
+                    {"role": "system", "content": system},
+                    {"role": "user", "content": json.dumps(payload, ensure_ascii=False)},
+                ],
+                stream=True,
+            )
+            async for ev in stream:
+                kind = getattr(ev, "type", "")
+                if kind == "response.output_text.delta":
+                    parts.append(ev.delta)
+                    put(("delta", ev.delta))
+                elif kind == "response.completed":
+                    call.usage = _usage(getattr(ev, "response", None))
+
+        async def guarded():
+            async with _STATE["sem"]:
+                await asyncio.wait_for(run(), timeout=timeout_s)
+
+        try:
+            client = await _client()
+            # 세마포어 대기까지 포함한 상한 (llm_text 와 같은 timeout_s + 1)
+            await asyncio.wait_for(guarded(), timeout=timeout_s + 1.0)
+            text = "".join(parts)
+            put(("done", text or None, "ok" if text else "error"))
+        except asyncio.TimeoutError:
+            put(("done", None, "timeout"))
+        except Exception:
+            put(("done", None, "error"))
+
+    fut = asyncio.run_coroutine_threadsafe(produce(), _llm_loop())
+    try:
+        while True:
+            item = await q.get()
+            if item[0] == "done":
+                call.done(item[2])
+                if item[1] and _parses_as_json(item[1]):
+                    await asyncio.to_thread(LLM_CACHE.put, key, model, item[1])
+            yield item
+            if item[0] == "done":
+                return
+    finally:
+        # 클라이언트가 스트림을 끊으면 LLM 호출도 취소
+        if not fut.done():
+            fut.cancel()
@@ -0,0 +1,98 @@
+# services/llm_stream.py
+# LLM 설명을 SSE로 흘려보내기
+# - event: delta    → 모델이 낸 텍스트 조각 그대로 {"text": ...}
+# - event: partial  → 지금까지 받은 텍스트를 JSON으로 "닫아서" 파싱한 중간 결과 (바뀔 때만)
+# - event: final    → 전체 응답 파싱/검증 결과 (시간 초과/오류면 규칙 기반 fallback)
+# - event: result   → (prioritize/route/procurement) LLM 없이 계산한 본 결과. LLM보다 먼저 보낸다
+import json
+from typing import Any, Callable, Dict, List, Optional
+
+from .llm_client import llm_stream_async
+
+
+def sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+def _close(s: str, stack: List[str], in_str: bool) -> Optional[Any]:
+    s = s.rstrip()
+    if in_str:
+        s += '"'
+    else:
+        # 값이 아직 안 온 키("key": / "key") 나 끝의 쉼표는 잘라낸다
+        while s and s[-1] in ",:":
+            s = s[:-1].rstrip()
+            if s.endswith('"') and stack and stack[-1] == "}":
+                k = s.rfind('"', 0, len(s) - 1)
+                s = s[:k].rstrip() if k != -1 else s
+    closing = "".join("}" if c == "{" else "]" for c in reversed(stack))
+    try:
+        return json.loads(s + closing)
+    except Exception:
+        return None
+
+
+def close_partial_json(buf: str) -> Optional[Any]:
+    """
+    아직 끝나지 않은 JSON 텍스트 → 열린 문자열/배열/객체를 닫아서 파싱한 값.
+    실패하면 마지막 쉼표(문자열 밖) 이전까지 잘라서 한 번 더 시도
+    """
+    start = buf.find("{")
+    if start == -1:
+        return None
+    s = buf[start:]
+    stack: List[str] = []
+    in_str = esc = False
+    last_comma = None  # (위치, 그 시점 stack)
+    for i, ch in enumerate(s):
+        if in_str:
+            if esc:
+                esc = False
+            elif ch == "\\":
+                esc = True
+            elif ch == '"':
+                in_str = False
+            continue
+        if ch == '"':
+            in_str = True
+        elif ch in "{[":
+            stack.append(ch)
+        elif ch in "}]":
+            if stack:
+                stack.pop()
+            if not stack:
+                s = s[: i + 1]
+                break
+        elif ch == ",":
+            last_comma = (i, list(stack))
+
+    if esc:
+        s = s[:-1]
+    out = _close(s, stack, in_str)
+    if out is None and last_comma is not None:
+        out = _close(s[: last_comma[0]], last_comma[1], False)
+    return out
+
+
+async def stream_json_explain(
+    system: str,
+    payload: Dict[str, Any],
+    finalize: Callable[[Optional[str], str], Any],
+    tag: str = "default",
+):
+    """LLM 스트림 → SSE 문자열 (delta / partial / final). finalize(text, status) 가 final 데이터"""
+    buf = ""
+    last_partial = None
+    async for item in llm_stream_async(system, payload, tag=tag):
+        if item[0] == "delta":
+            buf += item[1]
+            yield sse_event("delta", {"text": item[1]})
+            partial = close_partial_json(buf)
+            if isinstance(partial, dict):
+                key = json.dumps(partial, sort_keys=True, ensure_ascii=False)
+                if key != last_partial:
+                    last_partial = key
+                    yield sse_event("partial", partial)
+        else:
+            _, text, status = item
+            yield sse_event("final", finalize(text, status))
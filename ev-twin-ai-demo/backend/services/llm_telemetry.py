@@ -0,0 +1,122 @@
+# services/llm_telemetry.py
+# LLM 호출 계측 (호출 위치 tag별)
+# - 호출 수 / 캐시 hit / 시간 초과 / 오류 / 키 없음 / JSON 파싱 실패 / fallback 사용 / 프롬프트 축소(trim)
+#   (fallbacks = LLM 내용 없이 응답한 횟수: 규칙 기반 요약, 키 없음/파싱 실패 안내. 호출 측이 record_fallback)
+# - payload 바이트, 추정 입력 토큰, 실제 토큰(usage), 지연시간 p50/p95 (최근 LATENCY_WINDOW건)
+# - 모델별 "지연(ms) ≈ a + b·입력토큰" 온라인 회귀 → 지연 예산을 토큰 예산으로 바꿀 때 사용(llm_budget)
+import threading
+from collections import deque
+from typing import Any, Dict, Optional
+
+LATENCY_WINDOW = 512
+MIN_FIT_POINTS = 8
+
+
+def estimate_tokens(text: str) -> int:
+    """대략적 토큰 수: ASCII 4글자당 1, 한글 등 비ASCII는 글자당 1"""
+    ascii_n = sum(1 for ch in text if ord(ch) < 128)
+    return int(ascii_n / 4 + (len(text) - ascii_n)) + 1
+
+
+def _pct(xs, q: float) -> Optional[float]:
+    if not xs:
+        return None
+    s = sorted(xs)
+    return round(s[min(len(s) - 1, int(q * (len(s) - 1)))], 1)
+
+
+class LLMTelemetry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tags: Dict[str, Dict[str, Any]] = {}
+        self._fit: Dict[str, list] = {}  # model → [n, Σx, Σy, Σxy, Σxx]
+
+    def _tag(self, tag: str) -> Dict[str, Any]:
+        t = self._tags.get(tag)
+        if t is None:
+            t = self._tags[tag] = {
+                "calls": 0, "cache": 0, "ok": 0, "timeout": 0, "error": 0, "no_key": 0,
+                "parseFailures": 0, "fallbacks": 0, "trimmedCalls": 0, "itemsDropped": 0, "extraChunks": 0,
+                "payloadBytes": 0, "estInputTokens": 0, "inputTokens": 0, "outputTokens": 0,
+                "models": {}, "_lat": deque(maxlen=LATENCY_WINDOW),
+            }
+        return t
+
+    def record_call(
+        self,
+        tag: str,
+        model: str,
+        status: str,
+        payload_bytes: int,
+        est_tokens: int,
+        latency_ms: float,
+        usage: Optional[Dict[str, int]] = None,
+    ):
+        with self._lock:
+            t = self._tag(tag)
+            t["calls"] += 1
+            t[status] = t.get(status, 0) + 1
+            t["payloadBytes"] += payload_bytes
+            t["estInputTokens"] += est_tokens
+            t["models"][model] = t["models"].get(model, 0) + 1
+            if status == "ok":
+                t["_lat"].append(latency_ms)
+                if usage:
+                    t["inputTokens"] += int(usage.get("input_tokens") or 0)
+                    t["outputTokens"] += int(usage.get("output_tokens") or 0)
+                x = float((usage or {}).get("input_tokens") or est_tokens)
+                f = self._fit.setdefault(model, [0, 0.0, 0.0, 0.0, 0.0])
+                f[0] += 1; f[1] += x; f[2] += latency_ms; f[3] += x * latency_ms; f[4] += x * x
+
+    def record_parse_failure(self, tag: str):
+        with self._lock:
+            self._tag(tag)["parseFailures"] += 1
+
+    def record_fallback(self, tag: str):
+        with self._lock:
+            self._tag(tag)["fallbacks"] += 1
+
+    def record_trim(self, tag: str, dropped: int = 0, extra_chunks: int = 0):
+        """dropped: 예산 때문에 뺀 항목 수, extra_chunks: 예산 때문에 늘어난 묶음(호출) 수"""
+        with self._lock:
+            t = self._tag(tag)
+            t["trimmedCalls"] += 1
+            t["itemsDropped"] += dropped
+            t["extraChunks"] += extra_chunks
+
+    def latency_model(self, model: str):
+        """(a, b) : 지연(ms) ≈ a + b·입력토큰. 데이터 부족/기울기 ≤ 0 이면 None"""
+        with self._lock:
+            f = self._fit.get(model)
+            if not f or f[0] < MIN_FIT_POINTS:
+                return None
+            n, sx, sy, sxy, sxx = f
+        den = n * sxx - sx * sx
+        if den <= 0:
+            return None
+        b = (n * sxy - sx * sy) / den
+        if b <= 0:
+            return None
+        return (sy - b * sx) / n, b
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            out = {}
+            for tag, t in self._tags.items():
+                lat = list(t["_lat"])
+                row = {k: v for k, v in t.items() if not k.startswith("_")}
+                row["models"] = dict(t["models"])
+                row["latencyP50Ms"] = _pct(lat, 0.5)
+                row["latencyP95Ms"] = _pct(lat, 0.95)
+                out[tag] = row
+            fits = {m: f[0] for m, f in self._fit.items()}
+        return {
+            "byTag": out,
+            "latencyModel": {
+                m: (lambda ab: {"points": fits[m], "baseMs": round(ab[0], 1), "msPerToken": round(ab[1], 4)} if ab else {"points": fits[m]})(self.latency_model(m))
+                for m in fits
+            },
+        }
+
+
+LLM_TELEMETRY = LLMTelemetry()
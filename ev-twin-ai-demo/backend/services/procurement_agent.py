@@ -1,11 +1,24 @@
 # services/procurement_agent.py
 from typing import Dict, Any, List, Optional, Literal
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, TypeAdapter, model_validator
 
-from .sim_procurement import ProcurementSimRequest, ProviderProfile, run_procurement_sim
-import os, json
+from .sim_procurement import (
+    ProviderProfile,
+    run_scenarios,
+    run_replications,
+    summarize_replications,
+    _provider_rows_km,
+)
+import asyncio
+import json
+import numpy as np
 
+from .llm_client import llm_text
+from .llm_stream import sse_event, stream_json_explain
+from .llm_telemetry import LLM_TELEMETRY
 
+
+# profile(시간대 속도)은 사건 시각이 필요해서 시나리오 추천에는 받지 않는다 → /sim/procurement/run 에 startHour 와 함께
 TrafficMode = Literal["free", "normal", "congested"]
 
 
@@ -15,14 +28,24 @@ class ProcurementAgentRequest(BaseModel):
     nIncidents: int = 80
     seed: Optional[int] = 42
 
+    # ✅ 반복 실행: 1이면 기존처럼 시나리오당 1회, 2 이상이면 평균/신뢰구간/1위 확률
+    replications: int = Field(1, ge=1, le=2000)
+    workers: int = Field(4, ge=1, le=32)
+
     w_sla: float = 0.55
     w_p90: float = 0.25
     w_remote: float = 0.20
 
     useLLM: bool = False
 
+    @model_validator(mode="after")
+    def _check_scenarios(self):
+        # 실행 중에 ValidationError(500)가 나지 않게 요청 단계에서 거절 (FastAPI → 422)
+        resolve_scenarios(self)
+        return self
+
 
-def _score_one_row(row: Dict[str, Any], w_sla: float, w_p90: float, w_remote: float) -> float:
+def _score_one_row(row: Dict[str, Any], w_sla: float, w_p90: float, w_remote: float, n_incidents: int = 80) -> float:
     sla = float(row.get("sla_hit_rate", 0.0))
     p90 = float(row.get("eta_p90_min", 9999.0))
     remote = float(row.get("remote_recovery_count", 0))
@@ -30,8 +53,8 @@ def _score_one_row(row: Dict[str, Any], w_sla: float, w_p90: float, w_remote: fl
     # p90 -> 0~1 점수(낮을수록 좋음). 120분 이상이면 0점
     p90_score = max(0.0, min(1.0, 1.0 - (p90 / 120.0)))
 
-    # remote count -> 비율(대략 nIncidents=80 가정)
-    remote_rate = max(0.0, min(1.0, remote / 80.0))
+    # remote count -> 비율
+    remote_rate = max(0.0, min(1.0, remote / max(n_incidents, 1)))
 
     return (w_sla * sla) + (w_p90 * p90_score) + (w_remote * remote_rate)
 
@@ -57,75 +80,99 @@ def _extract_json_object(s: str) -> str:
     return s
 
 
+PROCUREMENT_SYSTEM = (
+    "너는 사업수행기관 선정 평가위원이다. "
+    "입력된 시뮬레이션 결과를 바탕으로 1순위 업체와 근거를 간단명료하게 작성하라. "
+    "반드시 아래 JSON만 출력하라(코드블록/설명 금지): "
+    "{"
+    "\"winner\": string, "
+    "\"reasons\": [string], "
+    "\"risks\": [string], "
+    "\"what_to_verify\": [string]"
+    "}"
+)
+
+
+def _fallback_explain(summary_payload: Dict[str, Any], status: str) -> Dict[str, Any]:
+    """LLM 시간 초과/오류 시 ranking 숫자로 만든 규칙 기반 근거"""
+    LLM_TELEMETRY.record_fallback("procurement")
+    top = summary_payload.get("ranking_top3") or []
+    reasons, risks = [], []
+    if top:
+        reasons.append(f"종합 점수 1위 ({top[0]['provider']}, total_score {top[0]['total_score']})")
+        for sc in top[0].get("by_scenario", []):
+            reasons.append(
+                f"{sc.get('scenario')}: SLA hit {sc.get('sla_hit_rate')}, p90 {sc.get('eta_p90_min')}분"
+            )
+    if len(top) > 1 and top[0]["total_score"] - top[1]["total_score"] < 0.02:
+        risks.append(f"2위 {top[1]['provider']}와 점수 차이가 작음 → 반복 수를 늘려 재확인")
+    return {
+        "winner": summary_payload.get("winner"),
+        "reasons": reasons,
+        "risks": risks,
+        "what_to_verify": ["업체 제출 거점 좌표/크루 수 실측 확인", f"LLM {status} → 규칙 기반 근거"],
+        "fallback": True,
+    }
+
+
 def _llm_explain(summary_payload: Dict[str, Any]) -> Dict[str, Any]:
-    key = os.getenv("OPENAI_API_KEY")
-    if not key:
-        return {"note": "OPENAI_API_KEY missing"}
+    return _procurement_llm_result(summary_payload, *llm_text(PROCUREMENT_SYSTEM, summary_payload, tag="procurement"))
 
-    try:
-        from openai import OpenAI
-        client = OpenAI(api_key=key)
-    except Exception as e:
-        return {"note": "openai_import_or_client_error", "error": str(e)}
-
-    system = (
-        "너는 사업수행기관 선정 평가위원이다. "
-        "입력된 시뮬레이션 결과를 바탕으로 1순위 업체와 근거를 간단명료하게 작성하라. "
-        "반드시 아래 JSON만 출력하라(코드블록/설명 금지): "
-        "{"
-        "\"winner\": string, "
-        "\"reasons\": [string], "
-        "\"risks\": [string], "
-        "\"what_to_verify\": [string]"
-        "}"
-    )
-
-    resp = client.responses.create(
-        model="gpt-4o-mini",
-        input=[
-            {"role": "system", "content": system},
-            {"role": "user", "content": json.dumps(summary_payload, ensure_ascii=False)},
-        ],
-    )
-
-    text = getattr(resp, "output_text", None)
-    if not text:
-        try:
-            text = resp.output[0].content[0].text
-        except Exception:
-            return {"note": "cannot_extract_llm_text", "raw": str(resp)}
+
+def _procurement_llm_result(summary_payload: Dict[str, Any], text: Optional[str], status: str) -> Dict[str, Any]:
+    if status == "no_key":
+        LLM_TELEMETRY.record_fallback("procurement")
+        return {"note": "OPENAI_API_KEY missing"}
+    if text is None:
+        return _fallback_explain(summary_payload, status)
 
     try:
         clean = _extract_json_object(text)
         return json.loads(clean)
     except Exception:
+        LLM_TELEMETRY.record_parse_failure("procurement")
+        LLM_TELEMETRY.record_fallback("procurement")
         return {"note": "llm_not_json", "raw": text}
 
 
-def recommend_provider(twins: List[Dict[str, Any]], req: ProcurementAgentRequest) -> Dict[str, Any]:
+def resolve_scenarios(req: ProcurementAgentRequest):
+    """return (scenarios 원본, [(시나리오 이름, 교통 모드)])"""
     scenarios = req.scenarios or [
         {"name": "free", "trafficMode": "free"},
         {"name": "normal", "trafficMode": "normal"},
         {"name": "congested", "trafficMode": "congested"},
     ]
-
-    agg: Dict[str, Dict[str, Any]] = {}
-
+    mode_adapter = TypeAdapter(TrafficMode)
+    resolved = []
     for sc in scenarios:
         traffic_mode = sc.get("trafficMode") or sc.get("traffic_mode") or sc.get("name") or "normal"
-        scenario_name = sc.get("name") or traffic_mode
-
-        sim_req = ProcurementSimRequest(
-            providers=req.providers,
-            nIncidents=req.nIncidents,
-            trafficMode=traffic_mode,
-            seed=req.seed,
+        resolved.append((sc.get("name") or traffic_mode, mode_adapter.validate_python(traffic_mode)))
+    return scenarios, resolved
+
+
+def rep_total_scores(reps: Dict[str, Dict[str, np.ndarray]], resolved, req: ProcurementAgentRequest) -> np.ndarray:
+    """반복별 업체 total_score (R x 업체) - _score_one_row 의 벡터판"""
+    total = None
+    for _, mode in resolved:
+        m = reps[mode]
+        s = (
+            req.w_sla * m["sla_hit_rate"]
+            + req.w_p90 * np.clip(1.0 - m["eta_p90_min"] / 120.0, 0.0, 1.0)
+            + req.w_remote * np.clip(m["remote_recovery_count"] / max(req.nIncidents, 1), 0.0, 1.0)
         )
-        out = run_procurement_sim(twins, sim_req)
+        total = s if total is None else total + s
+    return total
+
 
-        for row in out["scoreboard"]:
+def aggregate_ranking(
+    boards: Dict[str, List[Dict[str, Any]]], scenarios, resolved, req: ProcurementAgentRequest
+) -> Dict[str, Any]:
+    agg: Dict[str, Dict[str, Any]] = {}
+
+    for scenario_name, traffic_mode in resolved:
+        for row in boards[traffic_mode]:
             name = row["provider"]
-            s = _score_one_row(row, req.w_sla, req.w_p90, req.w_remote)
+            s = _score_one_row(row, req.w_sla, req.w_p90, req.w_remote, req.nIncidents)
             if name not in agg:
                 agg[name] = {"provider": name, "total_score": 0.0, "by_scenario": []}
 
@@ -137,6 +184,11 @@ def recommend_provider(twins: List[Dict[str, Any]], req: ProcurementAgentRequest
                     "sla_hit_rate": row["sla_hit_rate"],
                     "eta_p90_min": row["eta_p90_min"],
                     "remote_recovery_count": row["remote_recovery_count"],
+                    **({
+                        "sla_hit_rate_ci": row["sla_hit_rate_ci"],
+                        "eta_p90_min_ci": row["eta_p90_min_ci"],
+                        "p_rank_first": row["p_rank_first"],
+                    } if "p_rank_first" in row else {}),
                 }
             )
 
@@ -146,19 +198,58 @@ def recommend_provider(twins: List[Dict[str, Any]], req: ProcurementAgentRequest
 
     winner = ranking[0]["provider"] if ranking else None
 
-    result: Dict[str, Any] = {
+    return {
         "winner": winner,
         "ranking": ranking,
         "scenarios": scenarios,
         "weights": {"w_sla": req.w_sla, "w_p90": req.w_p90, "w_remote": req.w_remote},
+        "replications": req.replications,
+    }
+
+
+def _llm_summary_payload(result: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "winner": result["winner"],
+        "weights": result["weights"],
+        "ranking_top3": result["ranking"][:3],
     }
 
+
+def attach_llm(result: Dict[str, Any]) -> Dict[str, Any]:
+    result["llm"] = _llm_explain(_llm_summary_payload(result))
+    return result
+
+
+def recommend_provider(twins: List[Dict[str, Any]], req: ProcurementAgentRequest) -> Dict[str, Any]:
+    scenarios, resolved = resolve_scenarios(req)
+    modes = [m for _, m in resolved]
+
+    # 사건 표본/원격복구 난수는 모든 시나리오·업체 공통(CRN) → 시나리오별로는 ETA 스케일만 다름
+    if req.replications > 1:
+        rows_km = _provider_rows_km(twins, req.providers)
+        reps = run_replications(
+            rows_km, req.providers, req.nIncidents, modes,
+            req.replications, req.seed, req.workers,
+        )
+        boards = {m: summarize_replications(req.providers, reps[m], 0.95) for m in reps}
+    else:
+        boards = run_scenarios(twins, req.providers, modes, req.nIncidents, req.seed)
+
+    result = aggregate_ranking(boards, scenarios, resolved, req)
+
     if req.useLLM:
-        summary_payload = {
-            "winner": winner,
-            "weights": result["weights"],
-            "ranking_top3": ranking[:3],
-        }
-        result["llm"] = _llm_explain(summary_payload)
+        attach_llm(result)
 
     return result
+
+
+async def recommend_provider_stream(twins: List[Dict[str, Any]], req: ProcurementAgentRequest):
+    """SSE: result(시뮬레이션 랭킹) 먼저 → LLM 근거 delta / partial / final"""
+    result = await asyncio.to_thread(recommend_provider, twins, req.model_copy(update={"useLLM": False}))
+    yield sse_event("result", result)
+    if req.useLLM:
+        payload = _llm_summary_payload(result)
+        async for chunk in stream_json_explain(
+            PROCUREMENT_SYSTEM, payload, lambda t, st: _procurement_llm_result(payload, t, st), tag="procurement"
+        ):
+            yield chunk
@@ -0,0 +1,99 @@
+# services/result_cache.py
+# 엔드포인트 결과 캐시 (LRU + TTL) + single-flight
+# - 키 = (엔드포인트, 트윈 스냅샷 버전, 정규화된 요청 body)
+# - 같은 키로 계산 중인 요청이 있으면 새로 계산하지 않고 그 결과를 같이 기다린다
+#   (교대 시간에 여러 관제사가 같은 조건으로 prioritize/autopilot 을 누르는 경우)
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Tuple
+
+
+def canonical_key(namespace: str, version: Any, body: Dict[str, Any]) -> str:
+    raw = json.dumps(body, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    h = hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+    return f"{namespace}:{version}:{h}"
+
+
+class ResultCache:
+    def __init__(self, max_entries: int = 256, ttl_s: float = 15.0):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._d: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def get_or_compute(self, namespace: str, version: Any, body: Dict[str, Any], fn: Callable[[], Any]) -> Any:
+        key = canonical_key(namespace, version, body)
+        now = time.monotonic()
+
+        with self._lock:
+            hit = self._d.get(key)
+            if hit is not None and hit[0] > now:
+                self._d.move_to_end(key)
+                self.hits += 1
+                return hit[1]
+            if hit is not None:
+                del self._d[key]  # 만료
+
+            fut = self._inflight.get(key)
+            if fut is not None:
+                self.coalesced += 1
+                owner = False
+            else:
+                self.misses += 1
+                fut = Future()
+                self._inflight[key] = fut
+                owner = True
+
+        if not owner:
+            return fut.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            fut.set_exception(e)
+            raise
+
+        with self._lock:
+            self._d[key] = (time.monotonic() + self.ttl_s, result)
+            self._d.move_to_end(key)
+            while len(self._d) > self.max_entries:
+                self._d.popitem(last=False)
+                self.evictions += 1
+            self._inflight.pop(key, None)
+        fut.set_result(result)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._d.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._d),
+                "maxEntries": self.max_entries,
+                "ttlS": self.ttl_s,
+                "inflight": len(self._inflight),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+            }
+
+
+RESULT_CACHE = ResultCache(
+    max_entries=int(os.getenv("EV_TWIN_RESULT_CACHE_SIZE", "256")),
+    ttl_s=float(os.getenv("EV_TWIN_RESULT_TTL_S", "15")),
+)
@@ -0,0 +1,337 @@
+# services/road_graph.py
+# 도로망 기반 이동시간 엔진 (로컬 파일만 사용)
+# - 서울시 "서비스링크 보간점 정보(LINK_VERTEX)" → 링크별 폴리라인 → 방향 그래프
+#   (링크 시작/끝 보간점 = 노드, 가까운 끝점끼리는 SNAP_TOL_M 안에서 하나의 노드로 합침)
+# - 간선 가중치 = 링크 길이 / link_traffic.tsv 속도 (속도 없으면 DEFAULT_SPEED_KMH)
+# - 1:1 질의는 양방향 Dijkstra, N:M 질의는 출발 노드별 최단시간 트리(캐시) 재사용
+# - 캐시 키 = (출발 노드, 교통 버전). link_traffic.tsv가 바뀌면 가중치만 다시 계산
+import csv
+import heapq
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional, Dict, Tuple
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+from .traffic import haversine_km, haversine_matrix_km, avg_speed_kmh
+from .vertex_cache import load_vertex_cache
+
+DATA_DIR = Path(__file__).resolve().parents[2] / "data"
+LINK_VERTEX_PATH = DATA_DIR / "서비스링크 보간점 정보(LINK_VERTEX)_2025.xlsx"
+LINK_VERTEX_CACHE = LINK_VERTEX_PATH.with_suffix(".npz")  # make_tsv.py 가 만드는 열 캐시 (vertex_cache.py 형식)
+LINK_TRAFFIC_PATH = DATA_DIR / "link_traffic.tsv"
+
+TM_EPSG = 5181              # make_tsv.py와 동일 (GRS80TM_X/Y)
+SNAP_TOL_M = 30.0           # 링크 끝점 병합 거리
+DEFAULT_SPEED_KMH = avg_speed_kmh("normal")
+MIN_SPEED_KMH = 3.0
+ACCESS_SPEED_KMH = 15.0     # 좌표 → 가장 가까운 노드까지 접근 구간 속도
+TREE_CACHE_SIZE = 512
+
+
+# ========= loading =========
+def _load_vertex_arrays(path: Path) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """return (link_id(str), ver_seq, x, y) — 링크/순번 순으로 정렬. 열 캐시가 없으면 xlsx 직접 파싱(느림)"""
+    cols = load_vertex_cache(path, path.with_suffix(".npz"))
+    if cols is not None:
+        return cols["link_ids"][cols["codes"]], cols["ver_seq"], cols["x"], cols["y"]
+
+    import pandas as pd
+
+    df = pd.read_excel(path, sheet_name=0, engine="openpyxl")
+    df.columns = [str(c).strip() for c in df.columns]
+    df = df.dropna(subset=["LINK_ID", "GRS80TM_X", "GRS80TM_Y"])
+
+    lid = df["LINK_ID"].astype(str).str.strip().to_numpy()
+    seq = pd.to_numeric(df["VER_SEQ"], errors="coerce").fillna(0).to_numpy(dtype=np.int64)
+    x = df["GRS80TM_X"].to_numpy(dtype=np.float64)
+    y = df["GRS80TM_Y"].to_numpy(dtype=np.float64)
+
+    order = np.lexsort((seq, lid))
+    return lid[order], seq[order], x[order], y[order]
+
+
+def _load_link_speeds(path: Path) -> Dict[str, float]:
+    m: Dict[str, float] = {}
+    if not path.exists():
+        return m
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        for r in csv.DictReader(f, delimiter="\t"):
+            link_id = (r.get("link_id") or "").strip()
+            try:
+                spd = float(r.get("speed") or "")
+            except ValueError:
+                continue
+            if link_id and spd > 0:
+                m[link_id] = spd
+    return m
+
+
+def _traffic_version(path: Path) -> str:
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return "none"
+    return f"{st.st_mtime_ns}:{st.st_size}"
+
+
+def _snap_endpoints(xy: np.ndarray, tol: float) -> np.ndarray:
+    """격자 버킷 + union-find로 tol(m) 이내 끝점을 같은 노드로 묶는다. return 끝점별 노드 번호"""
+    n = len(xy)
+    parent = list(range(n))
+
+    def find(a: int) -> int:
+        while parent[a] != a:
+            parent[a] = parent[parent[a]]
+            a = parent[a]
+        return a
+
+    cells = np.floor(xy / tol).astype(np.int64)
+    buckets: Dict[Tuple[int, int], List[int]] = {}
+    for i, (cx, cy) in enumerate(cells.tolist()):
+        buckets.setdefault((cx, cy), []).append(i)
+
+    tol2 = tol * tol
+    for (cx, cy), members in buckets.items():
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                other = buckets.get((cx + dx, cy + dy))
+                if not other:
+                    continue
+                for i in members:
+                    for j in other:
+                        if j <= i:
+                            continue
+                        d = xy[i] - xy[j]
+                        if d[0] * d[0] + d[1] * d[1] <= tol2:
+                            ri, rj = find(i), find(j)
+                            if ri != rj:
+                                parent[rj] = ri
+
+    roots = np.array([find(i) for i in range(n)], dtype=np.int64)
+    _, node_of = np.unique(roots, return_inverse=True)
+    return node_of
+
+
+# ========= graph =========
+class RoadGraph:
+    def __init__(self, link_ids: List[str], src: np.ndarray, dst: np.ndarray, length_m: np.ndarray,
+                 node_lat: np.ndarray, node_lon: np.ndarray):
+        self.link_ids = link_ids
+        self.src = src
+        self.dst = dst
+        self.length_m = length_m
+        self.node_lat = node_lat
+        self.node_lon = node_lon
+        self.n_nodes = len(node_lat)
+
+        self.version: Optional[str] = None
+        self.weight_s = np.zeros(len(link_ids), dtype=np.float64)
+        self._out: List[List[Tuple[int, float]]] = []
+        self._in: List[List[Tuple[int, float]]] = []
+        self._trees: "OrderedDict[Tuple[int, str], np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_vertex_file(cls, path: Path, tol_m: float = SNAP_TOL_M) -> "RoadGraph":
+        lid, _, x, y = _load_vertex_arrays(path)
+        if len(lid) == 0:
+            raise ValueError(f"LINK_VERTEX 비어있음: {path}")
+
+        # 링크 경계(정렬되어 있으므로 값이 바뀌는 지점)
+        starts = np.flatnonzero(np.r_[True, lid[1:] != lid[:-1]])
+        ends = np.r_[starts[1:], len(lid)] - 1
+
+        seg = np.hypot(np.diff(x), np.diff(y))
+        same = lid[1:] == lid[:-1]
+        seg = np.where(same, seg, 0.0)
+        cum = np.r_[0.0, np.cumsum(seg)]
+        length_m = cum[ends] - cum[starts]
+
+        keep = ends > starts  # 점 1개짜리 링크 제외
+        starts, ends, length_m = starts[keep], ends[keep], length_m[keep]
+
+        ep = np.vstack([np.column_stack([x[starts], y[starts]]), np.column_stack([x[ends], y[ends]])])
+        node_of = _snap_endpoints(ep, tol_m)
+        n_links = len(starts)
+        src, dst = node_of[:n_links], node_of[n_links:]
+
+        n_nodes = int(node_of.max()) + 1
+        cnt = np.bincount(node_of, minlength=n_nodes)
+        nx = np.bincount(node_of, weights=ep[:, 0], minlength=n_nodes) / cnt
+        ny = np.bincount(node_of, weights=ep[:, 1], minlength=n_nodes) / cnt
+
+        from pyproj import Transformer
+        tm_to_wgs = Transformer.from_crs(f"EPSG:{TM_EPSG}", "EPSG:4326", always_xy=True)
+        lon, lat = tm_to_wgs.transform(nx, ny)
+
+        return cls([str(v) for v in lid[starts]], src, dst, np.maximum(length_m, 1.0),
+                   np.asarray(lat, dtype=np.float64), np.asarray(lon, dtype=np.float64))
+
+    # ----- traffic weights -----
+    def apply_speeds(self, speeds_kmh: Dict[str, float], version: str):
+        spd = np.array([speeds_kmh.get(l, DEFAULT_SPEED_KMH) for l in self.link_ids], dtype=np.float64)
+        spd = np.maximum(spd, MIN_SPEED_KMH)
+        w = self.length_m / (spd / 3.6)
+
+        out: List[List[Tuple[int, float]]] = [[] for _ in range(self.n_nodes)]
+        inn: List[List[Tuple[int, float]]] = [[] for _ in range(self.n_nodes)]
+        for u, v, ws in zip(self.src.tolist(), self.dst.tolist(), w.tolist()):
+            out[u].append((v, ws))
+            inn[v].append((u, ws))
+
+        with self._lock:
+            self.weight_s = w
+            self._out, self._in = out, inn
+            self.version = version
+            self._trees.clear()
+
+    # ----- snapping -----
+    def nearest_nodes(self, lats, lons) -> Tuple[np.ndarray, np.ndarray]:
+        """return (노드 번호, 거리 km)"""
+        d = haversine_matrix_km(lats, lons, self.node_lat, self.node_lon)
+        idx = np.argmin(d, axis=1)
+        return idx, d[np.arange(len(idx)), idx]
+
+    # ----- queries -----
+    def shortest_time_s(self, s: int, t: int) -> float:
+        """양방향 Dijkstra. 도달 불가면 inf"""
+        if s == t:
+            return 0.0
+        out, inn = self._out, self._in
+        dist = ({s: 0.0}, {t: 0.0})
+        done = (set(), set())
+        heaps = ([(0.0, s)], [(0.0, t)])
+        adj = (out, inn)
+        best = float("inf")
+
+        while heaps[0] and heaps[1]:
+            if heaps[0][0][0] + heaps[1][0][0] >= best:
+                break
+            side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1
+            d, u = heapq.heappop(heaps[side])
+            if u in done[side]:
+                continue
+            done[side].add(u)
+            my, other = dist[side], dist[1 - side]
+            for v, w in adj[side][u]:
+                nd = d + w
+                if nd < my.get(v, float("inf")):
+                    my[v] = nd
+                    heapq.heappush(heaps[side], (nd, v))
+                if v in other:
+                    best = min(best, nd + other[v])
+        return best
+
+    def tree_from(self, s: int) -> np.ndarray:
+        """출발 노드 s의 전체 최단시간(초) 배열. (s, version) 키로 LRU 캐시"""
+        key = (s, self.version or "")
+        with self._lock:
+            hit = self._trees.get(key)
+            if hit is not None:
+                self._trees.move_to_end(key)
+                return hit
+
+        out = self._out
+        dist = np.full(self.n_nodes, np.inf)
+        dist[s] = 0.0
+        heap = [(0.0, s)]
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            for v, w in out[u]:
+                nd = d + w
+                if nd < dist[v]:
+                    dist[v] = nd
+                    heapq.heappush(heap, (nd, v))
+
+        with self._lock:
+            self._trees[key] = dist
+            while len(self._trees) > TREE_CACHE_SIZE:
+                self._trees.popitem(last=False)
+        return dist
+
+    def eta_matrix_min(self, o_lats, o_lons, d_lats, d_lons) -> np.ndarray:
+        """N:M 이동시간(분). 도로로 못 가는 쌍은 직선거리 / DEFAULT_SPEED_KMH 로 대체"""
+        o_node, o_acc = self.nearest_nodes(o_lats, o_lons)
+        d_node, d_acc = self.nearest_nodes(d_lats, d_lons)
+
+        out = np.empty((len(o_node), len(d_node)), dtype=np.float64)
+        for i, s in enumerate(o_node.tolist()):
+            out[i] = self.tree_from(s)[d_node] / 60.0
+
+        access = (o_acc[:, None] + d_acc[None, :]) / ACCESS_SPEED_KMH * 60.0
+        out += access
+
+        bad = ~np.isfinite(out)
+        if bad.any():
+            straight = haversine_matrix_km(o_lats, o_lons, d_lats, d_lons) / DEFAULT_SPEED_KMH * 60.0
+            out[bad] = straight[bad]
+        return out
+
+    def eta_min(self, o_lat: float, o_lon: float, d_lat: float, d_lon: float) -> float:
+        o_node, o_acc = self.nearest_nodes([o_lat], [o_lon])
+        d_node, d_acc = self.nearest_nodes([d_lat], [d_lon])
+        with self._lock:
+            cached = self._trees.get((int(o_node[0]), self.version or ""))
+        sec = cached[int(d_node[0])] if cached is not None else self.shortest_time_s(int(o_node[0]), int(d_node[0]))
+        if not np.isfinite(sec):
+            return haversine_km(o_lat, o_lon, d_lat, d_lon) / DEFAULT_SPEED_KMH * 60.0
+        return float(sec) / 60.0 + float(o_acc[0] + d_acc[0]) / ACCESS_SPEED_KMH * 60.0
+
+
+# ========= singleton =========
+_GRAPH: Dict[str, Optional[RoadGraph]] = {"graph": None}
+_BUILD_LOCK = threading.Lock()
+
+
+def get_road_graph() -> Optional[RoadGraph]:
+    """
+    최초 호출 시 그래프를 한 번 빌드. 이후에는 link_traffic.tsv 버전만 확인해서 가중치 갱신.
+    보간점 파일이 없거나 pandas/pyproj가 없으면 None (호출 측은 직선거리로 fallback)
+    """
+    with _BUILD_LOCK:
+        g = _GRAPH["graph"]
+        if g is None:
+            if not LINK_VERTEX_PATH.exists():
+                return None
+            try:
+                g = RoadGraph.from_vertex_file(LINK_VERTEX_PATH)
+            except Exception as e:
+                print(f"[road_graph] build failed: {e}")
+                return None
+            _GRAPH["graph"] = g
+
+        ver = _traffic_version(LINK_TRAFFIC_PATH)
+        if g.version != ver:
+            g.apply_speeds(_load_link_speeds(LINK_TRAFFIC_PATH), ver)
+        return g
+
+
+# ========= API models =========
+class LatLon(BaseModel):
+    lat: float
+    lon: float
+
+
+class RoadEtaRequest(BaseModel):
+    origins: List[LatLon] = Field(..., min_length=1, max_length=500)
+    destinations: List[LatLon] = Field(..., min_length=1, max_length=5000)
+
+
+def road_eta(req: RoadEtaRequest) -> Dict:
+    g = get_road_graph()
+    o_lat = [p.lat for p in req.origins]
+    o_lon = [p.lon for p in req.origins]
+    d_lat = [p.lat for p in req.destinations]
+    d_lon = [p.lon for p in req.destinations]
+
+    if g is None:
+        m = haversine_matrix_km(o_lat, o_lon, d_lat, d_lon) / DEFAULT_SPEED_KMH * 60.0
+        return {"engine": "straight_line", "version": None, "etaMin": np.round(m, 1).tolist()}
+
+    m = g.eta_matrix_min(o_lat, o_lon, d_lat, d_lon)
+    return {"engine": "road_graph", "version": g.version, "etaMin": np.round(m, 1).tolist()}
@@ -0,0 +1,157 @@
+# services/routing.py
+# 출동 동선 엔진
+# - 거점(0번 노드) + 방문 지점(1..n) 거리 행렬을 numpy로 한 번에 계산
+# - 최근접 이웃으로 초기 동선 구성 → 2-opt / Or-opt 로 시간 예산 내 개선
+# - 비용 = 거리 * (1 + alpha * 도착지 혼잡도)  (기존 plan_route 그리디와 동일한 비용)
+# - 동선은 거점에서 출발해 마지막 지점에서 끝나는 open path (복귀 없음)
+import time
+from typing import List, Tuple
+
+import numpy as np
+
+from .distance_matrix import coords_version, depot_row_km, station_matrix_km
+
+_EPS = 1e-9
+
+
+def build_distance_matrix(base_lat: float, base_lon: float, lats, lons) -> np.ndarray:
+    """0번 = 거점, 1..n = 방문 지점. shape (n+1, n+1) km 행렬 (지점 간/거점 행은 캐시 사용)"""
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    ver = coords_version(lats, lons)
+    row = depot_row_km(base_lat, base_lon, lats, lons, ver)
+
+    n = len(lats)
+    m = np.zeros((n + 1, n + 1), dtype=np.float64)
+    m[0, 1:] = row
+    m[1:, 0] = row
+    m[1:, 1:] = station_matrix_km(lats, lons, ver)
+    return m
+
+
+def build_cost_matrix(dist_km: np.ndarray, congestion, alpha: float) -> np.ndarray:
+    """C[a, b] = D[a, b] * (1 + alpha * cong[b]), 거점 혼잡도는 0"""
+    cong = np.concatenate([[0.0], np.asarray(congestion, dtype=np.float64)])
+    return dist_km * (1.0 + alpha * cong)[None, :]
+
+
+def path_cost(cost: np.ndarray, path: np.ndarray) -> float:
+    if len(path) < 2:
+        return 0.0
+    return float(cost[path[:-1], path[1:]].sum())
+
+
+def nearest_neighbor_path(cost: np.ndarray) -> np.ndarray:
+    """거점(0)에서 시작해 매번 비용이 가장 작은 미방문 지점으로 이동"""
+    n = cost.shape[0]
+    visited = np.zeros(n, dtype=bool)
+    visited[0] = True
+    path = np.empty(n, dtype=np.int64)
+    path[0] = 0
+    cur = 0
+    for k in range(1, n):
+        row = np.where(visited, np.inf, cost[cur])
+        nxt = int(np.argmin(row))
+        path[k] = nxt
+        visited[nxt] = True
+        cur = nxt
+    return path
+
+
+def _two_opt_pass(cost: np.ndarray, path: np.ndarray, deadline: float) -> bool:
+    """
+    구간 path[i..j] 뒤집기. 비용이 비대칭이므로(도착지 혼잡도)
+    정방향/역방향 누적합으로 구간 내부 비용 변화를 O(1)에 계산하고, j는 벡터로 한 번에 평가
+    """
+    n = len(path) - 1
+    improved = False
+    for i in range(1, n):
+        if time.perf_counter() > deadline:
+            break
+        fwd = np.concatenate([[0.0], np.cumsum(cost[path[:-1], path[1:]])])
+        rev = np.concatenate([[0.0], np.cumsum(cost[path[1:], path[:-1]])])
+
+        js = np.arange(i + 1, n + 1)
+        nxt = path[np.minimum(js + 1, n)]
+        has_next = js < n
+
+        old = cost[path[i - 1], path[i]] + (fwd[js] - fwd[i]) + np.where(has_next, cost[path[js], nxt], 0.0)
+        new = cost[path[i - 1], path[js]] + (rev[js] - rev[i]) + np.where(has_next, cost[path[i], nxt], 0.0)
+        gain = old - new
+
+        k = int(np.argmax(gain))
+        if gain[k] > _EPS:
+            j = int(js[k])
+            path[i : j + 1] = path[i : j + 1][::-1].copy()
+            improved = True
+    return improved
+
+
+def _or_opt_pass(cost: np.ndarray, path: np.ndarray, deadline: float, max_seg: int = 3) -> Tuple[np.ndarray, bool]:
+    """연속 1~max_seg개 지점을 떼어 다른 위치(정방향 그대로)에 끼워넣기"""
+    improved = False
+    for seg_len in range(1, max_seg + 1):
+        i = 1
+        while i + seg_len - 1 <= len(path) - 1:
+            if time.perf_counter() > deadline:
+                return path, improved
+            n = len(path) - 1
+            s0 = path[i]
+            s1 = path[i + seg_len - 1]
+            prev = path[i - 1]
+            has_next = i + seg_len <= n
+
+            removed = cost[prev, s0]
+            if has_next:
+                nx = path[i + seg_len]
+                removed += cost[s1, nx] - cost[prev, nx]
+
+            rest = np.concatenate([path[:i], path[i + seg_len :]])
+            a = rest
+            b = np.concatenate([rest[1:], [-1]])
+            tail = b >= 0
+            b_idx = np.where(tail, b, 0)
+            added = cost[a, s0] + np.where(tail, cost[s1, b_idx] - cost[a, b_idx], 0.0)
+            gain = removed - added
+            gain[i - 1] = -np.inf  # 원래 자리
+
+            k = int(np.argmax(gain))
+            if gain[k] > _EPS:
+                path = np.concatenate([rest[: k + 1], path[i : i + seg_len], rest[k + 1 :]])
+                improved = True
+            i += 1
+    return path, improved
+
+
+def improve_path(cost: np.ndarray, path: np.ndarray, time_budget_ms: float) -> np.ndarray:
+    """2-opt / Or-opt 를 번갈아 돌리다가 개선이 없거나 시간 예산을 넘기면 종료"""
+    path = path.copy()
+    if len(path) < 3 or time_budget_ms <= 0:
+        return path
+    deadline = time.perf_counter() + time_budget_ms / 1000.0
+    while time.perf_counter() < deadline:
+        a = _two_opt_pass(cost, path, deadline)
+        path, b = _or_opt_pass(cost, path, deadline)
+        if not (a or b):
+            break
+    return path
+
+
+def solve_open_route(
+    base_lat: float,
+    base_lon: float,
+    lats: List[float],
+    lons: List[float],
+    congestion: List[float],
+    alpha: float,
+    time_budget_ms: float,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    return: (초기 동선, 개선 동선, 거리 행렬)
+    동선은 노드 인덱스 배열(0=거점, i = 입력 i-1번째 지점)
+    """
+    dist = build_distance_matrix(base_lat, base_lon, lats, lons)
+    cost = build_cost_matrix(dist, congestion, alpha)
+    initial = nearest_neighbor_path(cost)
+    improved = improve_path(cost, initial, time_budget_ms)
+    return initial, improved, dist
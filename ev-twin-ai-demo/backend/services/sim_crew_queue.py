@@ -0,0 +1,181 @@
+# services/sim_crew_queue.py
+# 업체 크루 수(ProviderProfile.crews)를 반영한 이산사건(discrete-event) 시뮬레이션
+# - 시뮬레이션 기간 동안 사건이 포아송 과정으로 도착 (트윈은 downProb6h / DOWN 여부로 가중 샘플링)
+# - 원격 복구 성공이면 크루 없이 종료, 아니면 가장 먼저 비는 크루에 FIFO 배정
+# - 크루: 거점 출발 → 이동 → 작업 → 거점 복귀 (returnToBase=False면 복귀 시간 제외)
+# - 크루 가용 시각을 heap으로 관리 → 사건 1건당 O(log crews)
+# - 모든 업체가 같은 사건 흐름/난수를 공유(공통 난수)해서 업체 간 비교 잡음이 적다
+import heapq
+import time
+from typing import List, Dict, Any, Optional, Literal
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+from .distance_matrix import twin_coords, valid_coords
+from .sim_procurement import ProviderProfile, SEV_DOWN, _provider_rows_km, _quantile_lower, SEVERITIES
+from .speed_profile import bucket_of_minutes, trip_kmh
+from .traffic import TrafficMode, eta_min_from_km
+
+
+class CrewQueueSimRequest(BaseModel):
+    providers: List[ProviderProfile]
+    days: float = Field(1.0, gt=0.0, le=62.0)
+    incidentsPerDay: float = Field(200.0, gt=0.0, le=1_000_000.0)
+    serviceMinutes: float = Field(30.0, ge=0.0)
+    trafficMode: TrafficMode = "normal"
+    startHour: float = Field(0.0, ge=0.0, lt=24.0)  # profile 모드: 시뮬레이션 0분 = 이 시각(KST)
+    returnToBase: bool = True
+    weightBy: Literal["downProb", "uniform"] = "downProb"
+    seed: Optional[int] = None
+
+
+def twin_weights(twins: List[Dict[str, Any]], weight_by: str) -> np.ndarray:
+    """트윈별 사건 확률 (depot_location 수요 가중도 이 값). 좌표 없는 트윈은 0, 쓸 수 있는 트윈이 없으면 전부 0"""
+    lats, lons, _ = twin_coords(twins)
+    ok = valid_coords(lats, lons)
+    if not ok.any():
+        return np.zeros(len(twins))
+    if weight_by == "uniform":
+        return ok / ok.sum()
+    w = np.empty(len(twins), dtype=np.float64)
+    for i, t in enumerate(twins):
+        der = t.get("derived") or {}
+        try:
+            prob = float(der.get("downProb6h") or 0.0)
+        except (TypeError, ValueError):
+            prob = 0.0
+        # DOWN 상태 트윈은 재발 가능성이 더 높다고 본다
+        w[i] = prob + (0.5 if der.get("health") == "DOWN" else 0.0) + 1e-3
+    w[~ok] = 0.0
+    return w / w.sum()
+
+
+def _sample_stream(rng: np.random.Generator, twins: List[Dict[str, Any]], days: float, per_day: float, weight_by: str):
+    """사건 흐름 1회 샘플 → (도착 시각(분, 오름차순), 트윈 인덱스, severity, 원격복구 판정 난수(업체 공통))"""
+    p = twin_weights(twins, weight_by)
+    n = int(rng.poisson(per_day * days)) if p.any() else 0
+    arrive = np.sort(rng.random(n) * days * 24 * 60.0)
+    idx = rng.choice(len(twins), size=n, p=p) if n else np.zeros(0, dtype=np.int64)
+    sev = rng.integers(0, len(SEVERITIES), size=n, dtype=np.int8)
+    u = rng.random(n)
+    return arrive, idx, sev, u
+
+
+def _simulate_provider(
+    arrive: np.ndarray,      # (사건,) 도착 시각(분), 오름차순
+    travel: np.ndarray,      # (사건,) 거점→현장 이동(분)
+    remote: np.ndarray,      # (사건,) 원격 복구 성공 여부
+    crews: int,
+    service_min: float,
+    return_to_base: bool,
+) -> Dict[str, Any]:
+    n = len(arrive)
+    wait = np.zeros(n, dtype=np.float64)
+    response = np.zeros(n, dtype=np.float64)
+
+    free_at = [0.0] * max(crews, 1)   # 크루별 다음 가용 시각 (heap). crews<1은 1로 처리
+    pending: List[float] = []          # 배정됐지만 아직 출발 못한 사건의 출발 시각 (대기열)
+    busy_total = 0.0
+    max_queue = 0
+    events = 0
+
+    arrive_l = arrive.tolist()
+    travel_l = travel.tolist()
+    remote_l = remote.tolist()
+
+    for i in range(n):
+        t = arrive_l[i]
+        events += 1
+        if remote_l[i]:
+            continue
+        while pending and pending[0] <= t:
+            heapq.heappop(pending)
+
+        crew_free = heapq.heappop(free_at)
+        start = crew_free if crew_free > t else t
+        tr = travel_l[i]
+        busy = tr + service_min + (tr if return_to_base else 0.0)
+        heapq.heappush(free_at, start + busy)
+        events += 1  # 크루 완료 이벤트
+
+        if start > t:
+            heapq.heappush(pending, start)
+            if len(pending) > max_queue:
+                max_queue = len(pending)
+
+        wait[i] = start - t
+        response[i] = start - t + tr
+        busy_total += busy
+
+    return {
+        "wait": wait,
+        "response": response,
+        "busy_total": busy_total,
+        "max_queue": max_queue,
+        "events": events,
+    }
+
+
+def run_crew_queue_sim(twins: List[Dict[str, Any]], req: CrewQueueSimRequest) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    rng = np.random.default_rng(req.seed)
+    horizon = req.days * 24 * 60.0
+    arrive, idx, sev, u = _sample_stream(rng, twins, req.days, req.incidentsPerDay, req.weightBy)
+    n = len(arrive)
+
+    rows_km = _provider_rows_km(twins, req.providers)
+    total_events = 0
+    scoreboard = []
+
+    # profile 모드: 사건마다 (도착 시각 버킷, 거점 권역, 충전소 권역) 속도를 한 번에 gather
+    buckets = lats = lons = None
+    if req.trafficMode == "profile" and n:
+        buckets = bucket_of_minutes(req.startHour * 60.0 + arrive)  # 하루를 넘기면 조회 시 288 로 나머지
+        lats, lons, _ = twin_coords(twins)
+        lats, lons = lats[idx], lons[idx]
+
+    for k, p in enumerate(req.providers):
+        kmh = trip_kmh(p.baseLat, p.baseLon, lats, lons, buckets) if buckets is not None else None
+        travel = eta_min_from_km(rows_km[k, idx], req.trafficMode, kmh) if n else np.zeros(0)
+        remote_prob = p.remoteRecoveryRate * np.where(sev == SEV_DOWN, 0.5, 1.0)
+        remote = u < remote_prob
+
+        r = _simulate_provider(arrive, travel, remote, p.crews, req.serviceMinutes, req.returnToBase)
+        total_events += r["events"]
+
+        resp = r["response"]
+        disp = ~remote
+        hit = int((resp <= p.slaMinutes).sum())
+        q_resp = _quantile_lower(resp[None, :], [0.5, 0.9])[0]
+        w = r["wait"][disp]
+        q_wait = _quantile_lower(w[None, :], [0.5, 0.9])[0]
+        util = r["busy_total"] / (max(p.crews, 1) * horizon)
+
+        scoreboard.append({
+            "provider": p.name,
+            "crews": p.crews,
+            "sla_minutes": p.slaMinutes,
+            "incidents": n,
+            "remote_recovery_count": int(remote.sum()),
+            "dispatched": int(disp.sum()),
+            "sla_hit_rate": round(hit / max(n, 1), 3),
+            "response_p50_min": round(float(q_resp[0]), 1),
+            "response_p90_min": round(float(q_resp[1]), 1),
+            "queue_wait_mean_min": round(float(w.mean()), 1) if len(w) else 0.0,
+            "queue_wait_p90_min": round(float(q_wait[1]), 1),
+            "max_queue": r["max_queue"],
+            "crew_utilization": round(float(min(util, 1.0)), 3),
+        })
+
+    scoreboard.sort(key=lambda x: (-x["sla_hit_rate"], x["response_p90_min"]))
+    elapsed = time.perf_counter() - t0
+
+    return {
+        "trafficMode": req.trafficMode,
+        "days": req.days,
+        "incidents": n,
+        "events": total_events,
+        "elapsedMs": round(elapsed * 1000, 1),
+        "scoreboard": scoreboard,
+    }
@@ -0,0 +1,250 @@
+# services/sim_jobs.py
+# 대규모 조달 시뮬레이션용 비동기 작업(job) 큐
+# - submit → jobId 즉시 반환, 실제 계산은 작업 스레드(동시 MAX_CONCURRENT_JOBS개)가
+#   반복(replication)을 batch 단위로 공용 프로세스 풀(services/workers.py)에 넘겨 수행
+# - batch가 끝날 때마다 부분 scoreboard/ranking 갱신 → 상태 조회 / SSE 스트림으로 전달
+# - earlyStop: 최소 반복 수 이후 1위 업체의 "1위 확률"이 settleProb 이상이면 조기 종료
+# - 결과는 완료 후 JOB_TTL_S 동안 보관
+import asyncio
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from pydantic import Field
+
+from .sim_procurement import (
+    METRICS,
+    ProcurementReplicationRequest,
+    _provider_rows_km,
+    _provider_rows_kmh,
+    replicate_seqs,
+    summarize_replications,
+)
+from .llm_stream import sse_event
+from .procurement_agent import (
+    ProcurementAgentRequest,
+    resolve_scenarios,
+    aggregate_ranking,
+    rep_total_scores,
+    attach_llm,
+)
+
+MAX_CONCURRENT_JOBS = int(os.getenv("EV_TWIN_MAX_JOBS", "2"))
+JOB_TTL_S = float(os.getenv("EV_TWIN_JOB_TTL_S", "3600"))
+TERMINAL = {"done", "error", "cancelled"}
+
+
+# ========= Models =========
+class ProcurementSimJobRequest(ProcurementReplicationRequest):
+    replications: int = Field(200, ge=2, le=20000)
+    batchSize: int = Field(10, ge=1, le=1000)
+    earlyStop: bool = True
+    minReplications: int = Field(20, ge=2)
+    settleProb: float = Field(0.95, gt=0.5, le=1.0)
+
+
+class ProcurementRecommendJobRequest(ProcurementAgentRequest):
+    replications: int = Field(200, ge=2, le=20000)
+    batchSize: int = Field(10, ge=1, le=1000)
+    earlyStop: bool = True
+    minReplications: int = Field(20, ge=2)
+    settleProb: float = Field(0.95, gt=0.5, le=1.0)
+
+
+# ========= store =========
+_JOBS: Dict[str, Dict[str, Any]] = {}
+_LOCK = threading.Lock()
+_EXECUTOR = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_JOBS, thread_name_prefix="sim-job")
+
+
+def _purge_expired():
+    now = time.time()
+    with _LOCK:
+        for jid in [j for j, rec in _JOBS.items() if rec.get("expiresAt") and rec["expiresAt"] < now]:
+            del _JOBS[jid]
+
+
+def _update(job_id: str, **fields):
+    with _LOCK:
+        rec = _JOBS.get(job_id)
+        if rec is None:
+            return
+        rec.update(fields)
+        rec["updatedAt"] = time.time()
+        rec["version"] += 1
+        if rec["status"] in TERMINAL and rec.get("expiresAt") is None:
+            rec["expiresAt"] = time.time() + JOB_TTL_S
+
+
+def _public(rec: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in rec.items() if not k.startswith("_")}
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    _purge_expired()
+    with _LOCK:
+        rec = _JOBS.get(job_id)
+        return _public(dict(rec)) if rec else None
+
+
+def cancel_job(job_id: str) -> Optional[Dict[str, Any]]:
+    with _LOCK:
+        rec = _JOBS.get(job_id)
+        if rec is None:
+            return None
+        rec["_cancel"] = True
+    return get_job(job_id)
+
+
+def _submit(kind: str, runner, twins: List[Dict[str, Any]], req) -> Dict[str, Any]:
+    _purge_expired()
+    job_id = uuid.uuid4().hex
+    with _LOCK:
+        _JOBS[job_id] = {
+            "jobId": job_id,
+            "kind": kind,
+            "status": "queued",
+            "createdAt": time.time(),
+            "updatedAt": time.time(),
+            "expiresAt": None,
+            "version": 0,
+            "progress": {"done": 0, "total": req.replications},
+            "stoppedEarly": False,
+            "partial": None,
+            "result": None,
+            "error": None,
+            "_cancel": False,
+        }
+
+    def _run():
+        if _cancelled(job_id):  # 대기 중에 취소됨 → running 을 거치지 않고 바로 종료
+            _update(job_id, status="cancelled")
+            return
+        _update(job_id, status="running")
+        try:
+            runner(job_id, twins, req)
+        except Exception as e:
+            _update(job_id, status="error", error=str(e))
+
+    _EXECUTOR.submit(_run)
+    return {"jobId": job_id, "status": "queued"}
+
+
+def _cancelled(job_id: str) -> bool:
+    with _LOCK:
+        rec = _JOBS.get(job_id)
+        return rec is None or rec["_cancel"]
+
+
+def _concat(acc, part):
+    if acc is None:
+        return part
+    return {m: {k: np.concatenate([acc[m][k], part[m][k]], axis=0) for k in METRICS} for m in acc}
+
+
+def _run_batches(job_id: str, req, rows_km, modes, on_batch, kmh_rows=None) -> Optional[Dict[str, Dict[str, np.ndarray]]]:
+    """batch 단위 반복 실행. on_batch(acc) 가 True를 반환하면 조기 종료"""
+    seqs = np.random.SeedSequence(req.seed).spawn(req.replications)
+    acc = None
+    for b in range(0, req.replications, req.batchSize):
+        if _cancelled(job_id):
+            _update(job_id, status="cancelled")
+            return None
+        part = replicate_seqs(
+            rows_km, req.providers, req.nIncidents, modes, seqs[b : b + req.batchSize], req.workers, kmh_rows,
+        )
+        acc = _concat(acc, part)
+        if on_batch(acc):
+            _update(job_id, stoppedEarly=True)
+            break
+    return acc
+
+
+def _settled(p_first: np.ndarray, done: int, req) -> bool:
+    return bool(req.earlyStop and done >= req.minReplications and len(p_first) and p_first.max() >= req.settleProb)
+
+
+# ========= runners =========
+def _run_sim_job(job_id: str, twins: List[Dict[str, Any]], req: ProcurementSimJobRequest):
+    rows_km = _provider_rows_km(twins, req.providers)
+    mode = req.trafficMode
+    kmh_rows = _provider_rows_kmh(twins, req.providers, req.startHour) if mode == "profile" else None
+
+    def summary(acc):
+        return {
+            "trafficMode": mode,
+            "nIncidents": req.nIncidents,
+            "replications": int(acc[mode]["sla_hit_rate"].shape[0]),
+            "confidence": req.confidence,
+            "scoreboard": summarize_replications(req.providers, acc[mode], req.confidence),
+        }
+
+    def on_batch(acc):
+        out = summary(acc)
+        done = out["replications"]
+        _update(job_id, partial=out, progress={"done": done, "total": req.replications})
+        p_first = np.array([r["p_rank_first"] for r in out["scoreboard"]])
+        return _settled(p_first, done, req)
+
+    acc = _run_batches(job_id, req, rows_km, [mode], on_batch, kmh_rows)
+    if acc is not None:
+        _update(job_id, status="done", result=summary(acc))
+
+
+def _run_recommend_job(job_id: str, twins: List[Dict[str, Any]], req: ProcurementRecommendJobRequest):
+    rows_km = _provider_rows_km(twins, req.providers)
+    scenarios, resolved = resolve_scenarios(req)
+    modes = [m for _, m in resolved]
+
+    def summary(acc):
+        boards = {m: summarize_replications(req.providers, acc[m], 0.95) for m in acc}
+        done = int(next(iter(acc.values()))["sla_hit_rate"].shape[0])
+        out = aggregate_ranking(boards, scenarios, resolved, req.model_copy(update={"replications": done}))
+
+        # 반복별 total_score 기준 우승 확률
+        winners = np.argmax(rep_total_scores(acc, resolved, req), axis=1)
+        p_win = np.bincount(winners, minlength=len(req.providers)) / max(done, 1)
+        out["p_winner"] = {p.name: round(float(p_win[k]), 3) for k, p in enumerate(req.providers)}
+        return out, p_win, done
+
+    def on_batch(acc):
+        out, p_win, done = summary(acc)
+        _update(job_id, partial=out, progress={"done": done, "total": req.replications})
+        return _settled(p_win, done, req)
+
+    acc = _run_batches(job_id, req, rows_km, modes, on_batch)
+    if acc is not None:
+        out, _, _ = summary(acc)
+        if req.useLLM:
+            attach_llm(out)
+        _update(job_id, status="done", result=out)
+
+
+def submit_procurement_sim_job(twins: List[Dict[str, Any]], req: ProcurementSimJobRequest) -> Dict[str, Any]:
+    return _submit("procurement_sim", _run_sim_job, twins, req)
+
+
+def submit_recommend_job(twins: List[Dict[str, Any]], req: ProcurementRecommendJobRequest) -> Dict[str, Any]:
+    return _submit("procurement_recommend", _run_recommend_job, twins, req)
+
+
+# ========= SSE =========
+async def job_events(job_id: str, poll_s: float = 0.5):
+    """상태가 바뀔 때마다 job 스냅샷을 partial 이벤트로, 종료 상태(또는 없는 job)는 final 이벤트로 보내고 끝낸다"""
+    last = -1
+    while True:
+        snap = get_job(job_id)
+        if snap is None:
+            yield sse_event("final", {"jobId": job_id, "status": "not_found"})
+            return
+        if snap["status"] in TERMINAL:
+            yield sse_event("final", snap)
+            return
+        if snap["version"] != last:
+            last = snap["version"]
+            yield sse_event("partial", snap)
+        await asyncio.sleep(poll_s)
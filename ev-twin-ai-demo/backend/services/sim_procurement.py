@@ -1,9 +1,25 @@
 # services/sim_procurement.py
-from typing import List, Literal, Dict, Any, Optional
+# 사업수행기관(업체) 조달 시뮬레이션 - numpy 벡터 엔진
+# - 사건 = 트윈 인덱스 배열 + severity 코드 배열
+# - 원격 복구 성공 여부 = 사건별 균등난수 < 복구확률  (numpy Generator)
+# - ETA = (업체 x 사건) 행렬, 분위수는 np.partition (정렬 없이)
+# - 공통 난수(CRN): 사건 표본과 원격복구 난수는 모든 업체/시나리오가 공유
+#   → 업체·시나리오 간 차이가 표본 잡음이 아니라 실제 조건 차이만 반영
+#   → (트윈 스냅샷 버전, seed, nIncidents) 키로 표본 캐시, 시나리오는 ETA 스케일만 다시 계산
+# - profile 모드: (업체 x 트윈) 구간 속도(거점·충전소 최근접 링크, startHour 버킷)를 거리 행렬처럼 한 번 만들어 gather
+from typing import List, Literal, Dict, Any, Optional, Tuple
+from collections import OrderedDict
 from pydantic import BaseModel, Field
-import random
+import math
+import threading
+import numpy as np
 
-from .traffic import estimate_eta_min, TrafficMode
+from .speed_profile import bucket_of_minutes, pair_kmh
+from .traffic import eta_min_from_km, TrafficMode
+from .distance_matrix import twin_coords, depot_row_km, valid_coords
+
+SEVERITIES = ["DOWN", "ALERT", "SUSPECT"]
+SEV_DOWN = 0
 
 class ProviderProfile(BaseModel):
     name: str
@@ -15,66 +31,311 @@ class ProviderProfile(BaseModel):
 
 class ProcurementSimRequest(BaseModel):
     providers: List[ProviderProfile]
-    nIncidents: int = 80
-    trafficMode: TrafficMode = "normal"  # congested | normal | free
+    nIncidents: int = Field(80, ge=0, le=5_000_000)
+    trafficMode: TrafficMode = "normal"  # congested | normal | free | profile
+    startHour: float = Field(0.0, ge=0.0, lt=24.0)  # profile 모드: 사건 시각(KST). 표본 전체가 이 시각 버킷
     seed: Optional[int] = None
 
-def run_procurement_sim(twins: List[Dict[str, Any]], req: ProcurementSimRequest) -> Dict[str, Any]:
-    if req.seed is not None:
-        random.seed(req.seed)
-
-    # 사건 샘플링 (지금 트윈 기반)
-    incidents = []
-    for _ in range(req.nIncidents):
-        t = random.choice(twins)
-        severity = random.choice(["DOWN", "ALERT", "SUSPECT"])
-        incidents.append({
-            "stationId": t.get("stationId"),
-            "chargerId": t.get("chargerId"),
-            "lat": float(t.get("lat")),
-            "lon": float(t.get("lon")),
-            "severity": severity,
-        })
+SAMPLE_CACHE_SIZE = 16
 
-    scoreboard = []
-    for p in req.providers:
-        etas = []
-        met = 0
-        remote_ok = 0
-
-        for inc in incidents:
-            # 원격 복구 (MVP: severity가 DOWN이면 원격 낮게 본다)
-            remote_prob = p.remoteRecoveryRate * (0.5 if inc["severity"] == "DOWN" else 1.0)
-
-            if random.random() < remote_prob:
-                eta = 0.0
-                remote_ok += 1
-            else:
-                eta = estimate_eta_min(p.baseLat, p.baseLon, inc["lat"], inc["lon"], req.trafficMode)
-
-            etas.append(eta)
-            if eta <= p.slaMinutes:
-                met += 1
-
-        etas_sorted = sorted(etas)
-        n = len(etas_sorted)
-        p50 = etas_sorted[int(0.50 * (n - 1))] if n else 0.0
-        p90 = etas_sorted[int(0.90 * (n - 1))] if n else 0.0
+def _sample_incidents(rng: np.random.Generator, valid: np.ndarray, n: int):
+    """
+    사건 샘플링 (지금 트윈 기반, valid = 좌표가 있는 트윈 인덱스)
+    return (트윈 인덱스, severity(0=DOWN, 1=ALERT, 2=SUSPECT), 원격복구 판정용 균등난수)
+    """
+    if len(valid) == 0 or n <= 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int8), np.zeros(0)
+    idx = valid[rng.integers(0, len(valid), size=n)]
+    sev = rng.integers(0, len(SEVERITIES), size=n, dtype=np.int8)
+    u = rng.random(n)
+    return idx, sev, u
+
+_SAMPLES: "OrderedDict[Tuple[str, int, int], Tuple[np.ndarray, np.ndarray, np.ndarray]]" = OrderedDict()
+_SAMPLES_LOCK = threading.Lock()
+
+def get_incident_sample(twins: List[Dict[str, Any]], n: int, seed: Optional[int]):
+    """(트윈 스냅샷 버전, seed, nIncidents) 키로 캐시된 사건 표본. seed 없으면 매번 새로 뽑음"""
+    lats, lons, station_ver = twin_coords(twins)
+    valid = np.flatnonzero(valid_coords(lats, lons))
+    if seed is None:
+        return _sample_incidents(np.random.default_rng(), valid, n)
+
+    key = (station_ver, int(seed), int(n))
+    with _SAMPLES_LOCK:
+        hit = _SAMPLES.get(key)
+        if hit is not None:
+            _SAMPLES.move_to_end(key)
+            return hit
+
+    sample = _sample_incidents(np.random.default_rng(seed), valid, n)
+    for a in sample:
+        a.setflags(write=False)
+    with _SAMPLES_LOCK:
+        _SAMPLES[key] = sample
+        while len(_SAMPLES) > SAMPLE_CACHE_SIZE:
+            _SAMPLES.popitem(last=False)
+    return sample
+
+def _provider_rows_km(twins: List[Dict[str, Any]], providers: List[ProviderProfile]) -> np.ndarray:
+    # (업체 x 트윈) 거리 행렬 - 거점 행은 distance_matrix 캐시에서
+    lats, lons, station_ver = twin_coords(twins)
+    if not providers:
+        return np.zeros((0, len(lats)))
+    return np.stack([depot_row_km(p.baseLat, p.baseLon, lats, lons, station_ver) for p in providers])
+
+def _provider_rows_kmh(
+    twins: List[Dict[str, Any]], providers: List[ProviderProfile], start_hour: float
+) -> Optional[np.ndarray]:
+    """profile 모드 (업체 x 트윈) 구간 속도. 프로파일이 없으면 None → eta_min_from_km 이 모드 평균 속도 사용"""
+    lats, lons, _ = twin_coords(twins)
+    if not providers:
+        return None
+    return pair_kmh(
+        [p.baseLat for p in providers], [p.baseLon for p in providers], lats, lons,
+        int(bucket_of_minutes(start_hour * 60.0)),
+    )
+
+def _quantile_lower(a: np.ndarray, qs: List[float]) -> np.ndarray:
+    """행별 분위수. 기존 sorted(x)[int(q*(n-1))] 와 같은 값(lower)을 partition으로 계산"""
+    n = a.shape[1]
+    if n == 0:
+        return np.zeros((a.shape[0], len(qs)))
+    ks = [int(q * (n - 1)) for q in qs]
+    part = np.partition(a, sorted(set(ks)), axis=1)
+    return part[:, ks]
+
+def _provider_metrics(
+    rates: np.ndarray,        # (업체,) 원격 복구율
+    sla: np.ndarray,          # (업체,) SLA 분
+    dist_km: np.ndarray,      # (업체 x 사건)
+    sev: np.ndarray,          # (사건,)
+    u: np.ndarray,            # (사건,) 원격복구 판정용 균등난수 (업체 공통)
+    traffic_mode: TrafficMode,
+    kmh: Optional[np.ndarray] = None,  # (업체 x 사건) profile 구간 속도
+) -> Dict[str, np.ndarray]:
+    """업체별 원시 지표 (반올림 전)"""
+    n = dist_km.shape[1]
 
+    # 원격 복구 (MVP: severity가 DOWN이면 원격 낮게 본다)
+    remote_prob = rates[:, None] * np.where(sev == SEV_DOWN, 0.5, 1.0)[None, :]
+    remote = u[None, :] < remote_prob
+
+    eta = np.where(remote, 0.0, eta_min_from_km(dist_km, traffic_mode, kmh))
+    met = (eta <= sla[:, None]).sum(axis=1)
+    q = _quantile_lower(eta, [0.50, 0.90])
+
+    return {
+        "sla_hit_rate": met / max(n, 1),
+        "eta_p50_min": q[:, 0],
+        "eta_p90_min": q[:, 1],
+        "remote_recovery_count": remote.sum(axis=1),
+    }
+
+def _provider_arrays(providers: List[ProviderProfile]):
+    rates = np.array([p.remoteRecoveryRate for p in providers], dtype=np.float64)
+    sla = np.array([p.slaMinutes for p in providers], dtype=np.float64)
+    return rates, sla
+
+def _score_providers(
+    providers: List[ProviderProfile],
+    dist_km: np.ndarray,
+    sev: np.ndarray,
+    u: np.ndarray,
+    traffic_mode: TrafficMode,
+    kmh: Optional[np.ndarray] = None,
+) -> List[Dict[str, Any]]:
+    rates, sla = _provider_arrays(providers)
+    m = _provider_metrics(rates, sla, dist_km, sev, u, traffic_mode, kmh)
+
+    scoreboard = []
+    for k, p in enumerate(providers):
         scoreboard.append({
             "provider": p.name,
             "sla_minutes": p.slaMinutes,
-            "sla_hit_rate": round(met / max(n, 1), 3),
-            "eta_p50_min": round(p50, 1),
-            "eta_p90_min": round(p90, 1),
-            "remote_recovery_count": remote_ok,
+            "sla_hit_rate": round(float(m["sla_hit_rate"][k]), 3),
+            "eta_p50_min": round(float(m["eta_p50_min"][k]), 1),
+            "eta_p90_min": round(float(m["eta_p90_min"][k]), 1),
+            "remote_recovery_count": int(m["remote_recovery_count"][k]),
         })
 
     # 정렬: SLA hit rate 높고, p90 낮은 순
     scoreboard.sort(key=lambda x: (-x["sla_hit_rate"], x["eta_p90_min"]))
+    return scoreboard
+
+def run_scenarios(
+    twins: List[Dict[str, Any]],
+    providers: List[ProviderProfile],
+    traffic_modes: List[TrafficMode],
+    n_incidents: int,
+    seed: Optional[int],
+    start_hour: float = 0.0,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """표본 1회 + 거리 행렬 1회 → 시나리오(교통 모드)별 scoreboard"""
+    idx, sev, u = get_incident_sample(twins, n_incidents, seed)
+    dist_km = _provider_rows_km(twins, providers)[:, idx]
+    kmh_rows = _provider_rows_kmh(twins, providers, start_hour) if "profile" in traffic_modes else None
+    kmh = kmh_rows[:, idx] if kmh_rows is not None else None
+    return {
+        m: _score_providers(providers, dist_km, sev, u, m, kmh if m == "profile" else None)
+        for m in dict.fromkeys(traffic_modes)
+    }
+
+def run_procurement_sim(twins: List[Dict[str, Any]], req: ProcurementSimRequest) -> Dict[str, Any]:
+    scoreboard = run_scenarios(
+        twins, req.providers, [req.trafficMode], req.nIncidents, req.seed, req.startHour,
+    )[req.trafficMode]
 
     return {
         "trafficMode": req.trafficMode,
         "nIncidents": req.nIncidents,
         "scoreboard": scoreboard,
     }
+
+# =============================
+# 반복(replication) 실행 + 신뢰구간
+# =============================
+class ProcurementReplicationRequest(ProcurementSimRequest):
+    replications: int = Field(20, ge=2, le=2000)
+    confidence: float = Field(0.95, gt=0.5, lt=1.0)
+    workers: int = Field(4, ge=1, le=32)
+
+METRICS = ["sla_hit_rate", "eta_p50_min", "eta_p90_min", "remote_recovery_count"]
+
+def _replicate_chunk(args) -> Dict[str, Dict[str, np.ndarray]]:
+    """
+    프로세스 풀 워커: 자식 SeedSequence 여러 개를 받아 각각 독립 시뮬레이션.
+    반복마다 표본은 1번만 뽑고 모든 교통 모드에 공유(공통 난수)
+    return 모드별 지표별 (반복 x 업체) 배열
+    """
+    rows_km, kmh_rows, rates, sla, n_incidents, traffic_modes, seqs = args
+    out = {m: {k: [] for k in METRICS} for m in traffic_modes}
+    valid = np.flatnonzero(np.isfinite(rows_km).all(axis=0))  # 좌표 없는 충전소(거리 NaN) 제외
+    for ss in seqs:
+        rng = np.random.default_rng(ss)
+        idx, sev, u = _sample_incidents(rng, valid, n_incidents)
+        dist_km = rows_km[:, idx]
+        kmh = kmh_rows[:, idx] if kmh_rows is not None else None
+        for mode in traffic_modes:
+            m = _provider_metrics(rates, sla, dist_km, sev, u, mode, kmh if mode == "profile" else None)
+            for k in METRICS:
+                out[mode][k].append(m[k])
+    return {
+        mode: {k: np.asarray(v, dtype=np.float64).reshape(len(seqs), -1) for k, v in d.items()}
+        for mode, d in out.items()
+    }
+
+def _t_quantile(p: float, df: int) -> float:
+    """student-t 분위수 (df 1, 2 는 닫힌 식, 그 이상은 정규 분위수 + Cornish-Fisher 보정, scipy 없이)"""
+    from statistics import NormalDist
+    if df == 1:
+        return math.tan(math.pi * (p - 0.5))
+    if df == 2:
+        return (2 * p - 1) / math.sqrt(2 * p * (1 - p))
+    z = NormalDist().inv_cdf(p)
+    if df <= 0:
+        return z
+    g1 = (z**3 + z) / 4
+    g2 = (5 * z**5 + 16 * z**3 + 3 * z) / 96
+    g3 = (3 * z**7 + 19 * z**5 + 17 * z**3 - 15 * z) / 384
+    return z + g1 / df + g2 / df**2 + g3 / df**3
+
+def replicate_seqs(
+    rows_km: np.ndarray,
+    providers: List[ProviderProfile],
+    n_incidents: int,
+    traffic_modes: List[TrafficMode],
+    seqs: List[np.random.SeedSequence],
+    workers: int = 1,
+    kmh_rows: Optional[np.ndarray] = None,
+) -> Dict[str, Dict[str, np.ndarray]]:
+    """
+    주어진 SeedSequence 목록을 워커 수만큼 나눠 실행 → 모드별 지표별 (len(seqs) x 업체) 배열 (seqs 순서 유지)
+    kmh_rows: profile 모드 (업체 x 트윈) 구간 속도 (_provider_rows_kmh)
+    """
+    from .workers import get_process_pool, effective_workers
+
+    rates, sla = _provider_arrays(providers)
+    modes = list(dict.fromkeys(traffic_modes))
+    R = len(seqs)
+    if R == 0:
+        return {m: {k: np.zeros((0, len(providers))) for k in METRICS} for m in modes}
+
+    n_chunks = min(effective_workers(workers), R)
+    chunks = [seqs[i::n_chunks] for i in range(n_chunks)]
+    jobs = [(rows_km, kmh_rows, rates, sla, n_incidents, modes, c) for c in chunks]
+
+    parts = None
+    if n_chunks > 1:
+        try:
+            parts = list(get_process_pool().map(_replicate_chunk, jobs))
+        except Exception:
+            parts = None
+    if parts is None:
+        parts = [_replicate_chunk(j) for j in jobs]
+
+    # chunk i 는 seqs[i::n] 이므로 원래 반복 순서로 되돌린다
+    order = np.concatenate([np.arange(R)[i::n_chunks] for i in range(n_chunks)])
+    merged: Dict[str, Dict[str, np.ndarray]] = {}
+    for mode in modes:
+        merged[mode] = {}
+        for k in METRICS:
+            arr = np.concatenate([p[mode][k] for p in parts], axis=0)
+            out = np.empty_like(arr)
+            out[order] = arr
+            merged[mode][k] = out
+    return merged
+
+def run_replications(
+    rows_km: np.ndarray,
+    providers: List[ProviderProfile],
+    n_incidents: int,
+    traffic_modes: List[TrafficMode],
+    replications: int,
+    seed: Optional[int],
+    workers: int = 1,
+    kmh_rows: Optional[np.ndarray] = None,
+) -> Dict[str, Dict[str, np.ndarray]]:
+    """R개 독립 반복(SeedSequence.spawn) → 모드별 지표별 (R x 업체) 배열. workers>1이면 프로세스 풀"""
+    seqs = np.random.SeedSequence(seed).spawn(replications)
+    return replicate_seqs(rows_km, providers, n_incidents, traffic_modes, seqs, workers, kmh_rows)
+
+def summarize_replications(
+    providers: List[ProviderProfile], reps: Dict[str, np.ndarray], confidence: float
+) -> List[Dict[str, Any]]:
+    """평균 / 신뢰구간 / 1위 확률 (1위 = SLA hit rate 최고, 동률이면 p90 최저)"""
+    R = reps["sla_hit_rate"].shape[0]
+    tq = _t_quantile(0.5 + confidence / 2, R - 1)
+
+    first = np.lexsort((reps["eta_p90_min"].T, -reps["sla_hit_rate"].T), axis=0)[0] if providers else []
+    p_first = np.bincount(first, minlength=len(providers)) / max(R, 1)
+
+    rows = []
+    for k, p in enumerate(providers):
+        row: Dict[str, Any] = {"provider": p.name, "sla_minutes": p.slaMinutes}
+        for metric, nd in (("sla_hit_rate", 3), ("eta_p50_min", 1), ("eta_p90_min", 1)):
+            x = reps[metric][:, k]
+            mean = float(x.mean())
+            half = float(tq * x.std(ddof=1) / np.sqrt(R)) if R > 1 else 0.0
+            row[metric] = round(mean, nd)
+            row[f"{metric}_ci"] = [round(mean - half, nd + 1), round(mean + half, nd + 1)]
+        row["remote_recovery_count"] = round(float(reps["remote_recovery_count"][:, k].mean()), 1)
+        row["p_rank_first"] = round(float(p_first[k]), 3)
+        rows.append(row)
+
+    rows.sort(key=lambda x: (-x["sla_hit_rate"], x["eta_p90_min"]))
+    return rows
+
+def run_procurement_replications(twins: List[Dict[str, Any]], req: ProcurementReplicationRequest) -> Dict[str, Any]:
+    rows_km = _provider_rows_km(twins, req.providers)
+    kmh_rows = _provider_rows_kmh(twins, req.providers, req.startHour) if req.trafficMode == "profile" else None
+    reps = run_replications(
+        rows_km, req.providers, req.nIncidents, [req.trafficMode],
+        req.replications, req.seed, req.workers, kmh_rows,
+    )[req.trafficMode]
+    return {
+        "trafficMode": req.trafficMode,
+        "nIncidents": req.nIncidents,
+        "replications": req.replications,
+        "confidence": req.confidence,
+        "scoreboard": summarize_replications(req.providers, reps, req.confidence),
+    }
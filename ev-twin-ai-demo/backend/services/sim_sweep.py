@@ -0,0 +1,207 @@
+# services/sim_sweep.py
+# 업체 1곳에 대한 파라미터 격자 민감도 분석 (crews x remoteRecoveryRate x slaMinutes x trafficMode)
+# - 사건 표본은 1번만 뽑아 격자 전체가 공유(공통 난수) → 격자점 간 차이는 파라미터 차이만 반영
+# - engine
+#     montecarlo : sim_procurement와 같은 모델 (크루 대기 없음 → crews는 결과에 영향 없음, crews 값 2개 이상이면 422)
+#     crew_queue : sim_crew_queue 이산사건 모델 (crews 반영). crews x rate x mode 마다 1회 실행
+#     auto       : crews 격자가 2개 이상이면 crew_queue, 아니면 montecarlo
+# - profile 모드: montecarlo 는 startHour 버킷의 (거점, 충전소) 구간 속도, crew_queue 는 사건 도착 시각 버킷별 속도
+# - slaMinutes 축은 재시뮬레이션 없이, 정렬된 ETA/응답시간에 searchsorted 한 번으로 계산
+# - 결과: 응답 곡면(surface) + 목표 SLA hit rate를 만족하는 최소 파라미터(파레토 최소점)
+import time
+from typing import List, Literal, Optional, Dict, Any
+
+import numpy as np
+from pydantic import BaseModel, Field, model_validator
+
+from .distance_matrix import twin_coords
+from .sim_procurement import ProviderProfile, SEV_DOWN, get_incident_sample, _provider_rows_km, _provider_rows_kmh
+from .sim_crew_queue import _sample_stream, _simulate_provider
+from .speed_profile import bucket_of_minutes, trip_kmh
+from .traffic import TrafficMode, eta_min_from_km
+
+MAX_GRID_POINTS = 20000
+BATCH_CELLS = 5_000_000  # (rate x 사건) 한 번에 만드는 배열 크기 상한
+
+
+class ProcurementSweepRequest(BaseModel):
+    provider: ProviderProfile
+    # 비어 있으면 provider의 현재 값 1개만 사용
+    crews: List[int] = []
+    remoteRecoveryRates: List[float] = []
+    slaMinutes: List[int] = []
+    trafficModes: List[TrafficMode] = []
+
+    targetSlaHitRate: float = Field(0.9, ge=0.0, le=1.0)
+    engine: Literal["auto", "montecarlo", "crew_queue"] = "auto"
+    startHour: float = Field(0.0, ge=0.0, lt=24.0)  # profile 모드: montecarlo 사건 시각 / crew_queue 0분 시각 (KST)
+
+    # montecarlo
+    nIncidents: int = Field(20000, ge=1, le=5_000_000)
+    # crew_queue
+    days: float = Field(7.0, gt=0.0, le=62.0)
+    incidentsPerDay: float = Field(200.0, gt=0.0, le=100_000.0)
+    serviceMinutes: float = Field(30.0, ge=0.0)
+    returnToBase: bool = True
+    weightBy: Literal["downProb", "uniform"] = "downProb"
+
+    seed: Optional[int] = None
+
+    def grid_points(self) -> int:
+        # 비어 있는 축은 provider 현재 값 1개
+        return (
+            (len(set(self.crews)) or 1) * (len(set(self.remoteRecoveryRates)) or 1)
+            * (len(set(self.slaMinutes)) or 1) * (len(set(self.trafficModes)) or 1)
+        )
+
+    @model_validator(mode="after")
+    def _check_grid_size(self):
+        # 너무 큰 격자는 요청 단계에서 거절 (FastAPI → 422)
+        n = self.grid_points()
+        if n > MAX_GRID_POINTS:
+            raise ValueError(f"grid too large ({n} > {MAX_GRID_POINTS})")
+        # montecarlo 는 크루 대기를 모델링하지 않는다 → crews 축은 같은 결과를 복사만 하면서 계산량만 늘림
+        if self.engine == "montecarlo" and len(set(self.crews)) > 1:
+            raise ValueError("engine=montecarlo ignores crews; use engine=crew_queue (or auto) for a crews axis")
+        return self
+
+
+def _sla_stats(sorted_eta: np.ndarray, slas: np.ndarray) -> Dict[str, np.ndarray]:
+    """행별 정렬된 ETA (rate x 사건) → SLA별 hit rate (rate x sla), p50/p90 (rate,)"""
+    R, n = sorted_eta.shape
+    if n == 0:
+        z = np.zeros(R)
+        return {"hit": np.zeros((R, len(slas))), "p50": z, "p90": z}
+    hit = np.stack([np.searchsorted(row, slas, side="right") for row in sorted_eta]) / n
+    # _quantile_lower 와 같은 lower 분위수
+    return {"hit": hit, "p50": sorted_eta[:, int(0.5 * (n - 1))], "p90": sorted_eta[:, int(0.9 * (n - 1))]}
+
+
+def _sweep_montecarlo(twins, req, rates, slas, modes) -> Dict[str, Dict[str, np.ndarray]]:
+    """return mode → {"hit": (rate x sla), "p50": (rate,), "p90": (rate,)}"""
+    idx, sev, u = get_incident_sample(twins, req.nIncidents, req.seed)
+    dist = _provider_rows_km(twins, [req.provider])[0, idx]
+    factor = np.where(sev == SEV_DOWN, 0.5, 1.0)
+    step = max(1, BATCH_CELLS // max(len(idx), 1))
+    kmh_rows = _provider_rows_kmh(twins, [req.provider], req.startHour) if "profile" in modes else None
+    kmh = kmh_rows[0, idx] if kmh_rows is not None else None
+
+    out = {}
+    for mode in modes:
+        eta0 = eta_min_from_km(dist, mode, kmh if mode == "profile" else None)
+        parts = []
+        for b in range(0, len(rates), step):
+            r = rates[b : b + step]
+            remote = u[None, :] < r[:, None] * factor[None, :]
+            parts.append(_sla_stats(np.sort(np.where(remote, 0.0, eta0[None, :]), axis=1), slas))
+        out[mode] = {k: np.concatenate([p[k] for p in parts], axis=0) for k in ("hit", "p50", "p90")}
+    return out
+
+
+def _sweep_crew_queue(twins, req, crews, rates, slas, modes) -> Dict[str, List[Dict[str, np.ndarray]]]:
+    """return mode → crews별 {"hit": (rate x sla), "p50", "p90"}"""
+    rng = np.random.default_rng(req.seed)
+    arrive, idx, sev, u = _sample_stream(rng, twins, req.days, req.incidentsPerDay, req.weightBy)
+    dist = _provider_rows_km(twins, [req.provider])[0, idx] if len(idx) else np.zeros(0)
+    factor = np.where(sev == SEV_DOWN, 0.5, 1.0)
+    kmh = None
+    if "profile" in modes and len(idx):
+        # sim_crew_queue 와 같게: 사건마다 도착 시각 버킷의 (거점, 충전소) 구간 속도
+        lats, lons, _ = twin_coords(twins)
+        p = req.provider
+        kmh = trip_kmh(p.baseLat, p.baseLon, lats[idx], lons[idx], bucket_of_minutes(req.startHour * 60.0 + arrive))
+
+    out = {}
+    for mode in modes:
+        travel = eta_min_from_km(dist, mode, kmh if mode == "profile" else None)
+        per_crew = []
+        for c in crews:
+            rows = []
+            for r in rates:
+                sim = _simulate_provider(arrive, travel, u < r * factor, int(c), req.serviceMinutes, req.returnToBase)
+                rows.append(np.sort(sim["response"]))
+            per_crew.append(_sla_stats(np.stack(rows) if rows else np.zeros((0, len(arrive))), slas))
+        out[mode] = per_crew
+    return out
+
+
+def _minimal_points(hit: np.ndarray, slas: np.ndarray, target: float) -> List[tuple]:
+    """
+    hit: (crews x rate x sla). 목표 달성 격자점 중 파레토 최소점의 인덱스 (ci, ri, si).
+    (c, r) 마다 달성 가능한 최소 sla만 남기고, crews/rate가 같거나 작은 다른 점이
+    같거나 더 작은 sla로 달성하면 제외 (2차원 누적 최소로 한 번에 계산)
+    """
+    ok = hit >= target
+    first = np.argmax(ok, axis=2)
+    S = np.where(ok.any(axis=2), slas[first], np.inf)       # (crews x rate) 최소 달성 sla
+
+    P = np.minimum.accumulate(np.minimum.accumulate(S, axis=0), axis=1)
+    inf_row = np.full((1, S.shape[1]), np.inf)
+    inf_col = np.full((S.shape[0], 1), np.inf)
+    better_before = np.minimum(np.vstack([inf_row, P[:-1]]), np.hstack([inf_col, P[:, :-1]]))
+    keep = np.isfinite(S) & (S < better_before)
+    return [(int(ci), int(ri), int(first[ci, ri])) for ci, ri in zip(*np.nonzero(keep))]
+
+
+def run_procurement_sweep(twins: List[Dict[str, Any]], req: ProcurementSweepRequest) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    p = req.provider
+    crews = sorted(set(req.crews)) or [p.crews]
+    rates = np.array(sorted(set(req.remoteRecoveryRates)) or [p.remoteRecoveryRate], dtype=np.float64)
+    slas = np.array(sorted(set(req.slaMinutes)) or [p.slaMinutes], dtype=np.float64)
+    modes = list(dict.fromkeys(req.trafficModes)) or ["normal"]
+
+    engine = req.engine
+    if engine == "auto":
+        engine = "crew_queue" if len(crews) > 1 else "montecarlo"
+
+    if engine == "montecarlo":
+        mc = _sweep_montecarlo(twins, req, rates, slas, modes)
+        stats = {m: [mc[m]] for m in modes}  # crews 는 1개 (validator)
+    else:
+        stats = _sweep_crew_queue(twins, req, crews, rates, slas, modes)
+
+    surface = []
+    for mode in modes:
+        for ci, c in enumerate(crews):
+            st = stats[mode][ci]
+            for ri, r in enumerate(rates.tolist()):
+                for si, s in enumerate(slas.tolist()):
+                    surface.append({
+                        "trafficMode": mode,
+                        "crews": int(c),
+                        "remoteRecoveryRate": round(r, 4),
+                        "slaMinutes": int(s),
+                        "sla_hit_rate": round(float(st["hit"][ri, si]), 3),
+                        "eta_p50_min": round(float(st["p50"][ri]), 1),
+                        "eta_p90_min": round(float(st["p90"][ri]), 1),
+                    })
+
+    minimal = {}
+    for mode in modes:
+        hit = np.stack([st["hit"] for st in stats[mode]])
+        minimal[mode] = [
+            {
+                "crews": int(crews[ci]),
+                "remoteRecoveryRate": round(float(rates[ri]), 4),
+                "slaMinutes": int(slas[si]),
+                "sla_hit_rate": round(float(hit[ci, ri, si]), 3),
+            }
+            for ci, ri, si in _minimal_points(hit, slas, req.targetSlaHitRate)
+        ]
+
+    return {
+        "provider": p.name,
+        "engine": engine,
+        "targetSlaHitRate": req.targetSlaHitRate,
+        "gridPoints": req.grid_points(),
+        "axes": {
+            "crews": [int(c) for c in crews],
+            "remoteRecoveryRate": [round(r, 4) for r in rates.tolist()],
+            "slaMinutes": [int(s) for s in slas.tolist()],
+            "trafficMode": modes,
+        },
+        "elapsedMs": round((time.perf_counter() - t0) * 1000, 1),
+        "minimal": minimal,
+        "surface": surface,
+    }
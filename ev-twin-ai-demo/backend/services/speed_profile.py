@@ -0,0 +1,125 @@
+# services/speed_profile.py
+# 시간대(5분 버킷) 속도 프로파일 조회 (build_speed_profile.py 가 만든 data/speed_profile/)
+# - areas.npy / grid.npy / links.npy / link_grid.npy 를 mmap 으로 열어 둔다 (서버 시작 시 load_speed_profile)
+# - 지점 속도 = 가장 가까운 링크(잘게 나눈 격자 칸 → 링크 행)의 그 버킷 평균 속도,
+#   근처에 링크가 없거나 그 버킷 표본이 없으면 권역(격자 칸 → 권역 행) 속도
+# - 조회는 모두 배열 인덱싱 O(1), numpy 배열이면 한 번에 gather
+# - meta.json 이 바뀌면(재생성) 다음 조회 때 다시 연다. 프로파일이 없으면 None → 호출 측 고정 속도
+import json
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+PROFILE_DIR = Path(__file__).resolve().parents[2] / "data" / "speed_profile"
+KST = timezone(timedelta(hours=9))
+MIN_KMH = 5.0
+
+_STATE: Dict[str, Any] = {"version": None, "areas": None, "grid": None, "links": None, "link_grid": None, "meta": None}
+
+
+def profile_version() -> Optional[str]:
+    try:
+        st = (PROFILE_DIR / "meta.json").stat()
+    except FileNotFoundError:
+        return None
+    return f"{st.st_mtime_ns}:{st.st_size}"
+
+
+def load_speed_profile() -> bool:
+    """(재)로드. 프로파일이 있으면 True"""
+    ver = profile_version()
+    if ver == _STATE["version"]:
+        return _STATE["areas"] is not None
+    _STATE.update(version=ver, areas=None, grid=None, links=None, link_grid=None, meta=None)
+    if ver is None:
+        return False
+    try:
+        meta = json.loads((PROFILE_DIR / "meta.json").read_text(encoding="utf-8"))
+        _STATE["areas"] = np.load(PROFILE_DIR / "areas.npy", mmap_mode="r")
+        _STATE["grid"] = np.load(PROFILE_DIR / "grid.npy", mmap_mode="r")
+        _STATE["links"] = np.load(PROFILE_DIR / "links.npy", mmap_mode="r")
+        _STATE["link_grid"] = np.load(PROFILE_DIR / "link_grid.npy", mmap_mode="r")
+        _STATE["meta"] = meta
+    except Exception:
+        _STATE["areas"] = None
+        return False
+    return True
+
+
+def bucket_of(when: Optional[datetime] = None):
+    """출발 시각 → 5분 버킷 번호 (KST). None 이면 지금"""
+    when = when or datetime.now(KST)
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=KST)
+    t = when.astimezone(KST)
+    return int(bucket_of_minutes(t.hour * 60 + t.minute))
+
+
+def bucket_of_minutes(minutes):
+    """자정(KST)부터 흐른 분(스칼라/배열, 하루 넘어가도 됨) → 버킷 번호. 시뮬레이션 시계용"""
+    bucket_min = _STATE["meta"]["bucketMin"] if _STATE["meta"] else 5
+    return (np.asarray(minutes, dtype=np.float64) // bucket_min).astype(np.int64)
+
+
+def _cell(lat, lon, lat0, lon0, deg, rows, cols):
+    r = np.floor((lat - lat0) / deg)
+    c = np.floor((lon - lon0) / deg)
+    inside = (r >= 0) & (r < rows) & (c >= 0) & (c < cols)
+    return inside, np.where(inside, r, 0).astype(np.int64), np.where(inside, c, 0).astype(np.int64)
+
+
+def area_kmh(lat, lon, bucket) -> Optional[np.ndarray]:
+    """좌표(스칼라/배열) + 버킷(스칼라/배열) → 그 권역·시간대 평균 속도(km/h). 격자 밖이면 전체 평균 행"""
+    if not load_speed_profile():
+        return None
+    m, areas, grid = _STATE["meta"], _STATE["areas"], _STATE["grid"]
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    inside, rr, cc = _cell(lat, lon, m["lat0"], m["lon0"], m["cellDeg"], m["rows"], m["cols"])
+    area = np.where(inside, grid[rr, cc], areas.shape[0] - 1)
+    b = np.asarray(bucket, dtype=np.int64) % areas.shape[1]
+    return np.maximum(areas[area, b].astype(np.float64), MIN_KMH)
+
+
+def point_kmh(lat, lon, bucket) -> Optional[np.ndarray]:
+    """지점 속도: 가장 가까운 링크의 그 버킷 속도, 없으면 권역 속도"""
+    v_area = area_kmh(lat, lon, bucket)
+    if v_area is None:
+        return None
+    m, links, lg = _STATE["meta"], _STATE["links"], _STATE["link_grid"]
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    inside, rr, cc = _cell(lat, lon, m["lat0"], m["lon0"], m["linkCellDeg"], m["linkRows"], m["linkCols"])
+    li = np.where(inside, lg[rr, cc], -1)
+    b = np.asarray(bucket, dtype=np.int64) % links.shape[1]
+    v_link = links[np.maximum(li, 0), b].astype(np.float64)
+    ok = (li >= 0) & np.isfinite(v_link) & (v_link > 0)
+    return np.where(ok, np.maximum(v_link, MIN_KMH), v_area)
+
+
+def trip_kmh(o_lat, o_lon, d_lat, d_lon, bucket) -> Optional[np.ndarray]:
+    """출발지·도착지 지점 속도의 조화평균 (구간 절반씩 그 속도로 달린다고 본 평균 속도)"""
+    vo = point_kmh(o_lat, o_lon, bucket)
+    if vo is None:
+        return None
+    vd = point_kmh(d_lat, d_lon, bucket)
+    return 2.0 / (1.0 / vo + 1.0 / vd)
+
+
+def pair_kmh(o_lats, o_lons, d_lats, d_lons, bucket) -> Optional[np.ndarray]:
+    """trip_kmh 의 행렬판: (출발지 x 도착지) 구간 속도. 지점 속도는 점마다 1번만 조회 (bucket 은 스칼라)"""
+    vo = point_kmh(np.atleast_1d(o_lats), np.atleast_1d(o_lons), bucket)
+    if vo is None:
+        return None
+    vd = point_kmh(np.atleast_1d(d_lats), np.atleast_1d(d_lons), bucket)
+    return 2.0 / (1.0 / vo[:, None] + 1.0 / vd[None, :])
+
+
+def network_kmh(bucket) -> Optional[np.ndarray]:
+    """전체 평균 행 (좌표를 모르는 시뮬레이션용)"""
+    if not load_speed_profile():
+        return None
+    areas = _STATE["areas"]
+    return np.maximum(areas[areas.shape[0] - 1, np.asarray(bucket, dtype=np.int64) % areas.shape[1]].astype(np.float64), MIN_KMH)
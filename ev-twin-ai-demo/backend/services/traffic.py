@@ -1,8 +1,14 @@
 # services/traffic.py
 import math
-from typing import Literal
+from datetime import datetime
+from typing import Literal, Optional
 
-TrafficMode = Literal["congested", "normal", "free"]
+import numpy as np
+
+from .speed_profile import bucket_of, network_kmh, trip_kmh
+
+# profile: 수집 이력으로 만든 시간대·권역 속도 프로파일(services/speed_profile). 프로파일이 없으면 normal 과 같음
+TrafficMode = Literal["congested", "normal", "free", "profile"]
 
 def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     R = 6371.0
@@ -12,15 +18,47 @@ def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     a = math.sin(d1/2)**2 + math.cos(p1)*math.cos(p2)*math.sin(d2/2)**2
     return 2 * R * math.asin(math.sqrt(a))
 
-def avg_speed_kmh(mode: TrafficMode) -> float:
-    # MVP: 교통 모드별 평균 속도(나중에 실데이터로 대체)
+def haversine_matrix_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """
+    haversine_km의 numpy 버전. (lat1, lon1) x (lat2, lon2) 거리 행렬(km)을 반환.
+    입력은 1차원 배열(스칼라도 가능) → 결과 shape = (len1, len2)
+    """
+    R = 6371.0
+    p1 = np.radians(np.atleast_1d(np.asarray(lat1, dtype=np.float64)))[:, None]
+    l1 = np.radians(np.atleast_1d(np.asarray(lon1, dtype=np.float64)))[:, None]
+    p2 = np.radians(np.atleast_1d(np.asarray(lat2, dtype=np.float64)))[None, :]
+    l2 = np.radians(np.atleast_1d(np.asarray(lon2, dtype=np.float64)))[None, :]
+    a = np.sin((p2 - p1) / 2) ** 2 + np.cos(p1) * np.cos(p2) * np.sin((l2 - l1) / 2) ** 2
+    return 2 * R * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+def avg_speed_kmh(mode: TrafficMode, when: Optional[datetime] = None) -> float:
+    # 교통 모드별 평균 속도. profile 은 좌표를 모를 때 쓰는 전체 평균(시간대만 반영)
+    # → 좌표가 있는 호출은 speed_profile.trip_kmh / pair_kmh 결과를 eta_min_from_km(kmh=) 로 넘긴다
+    if mode == "profile":
+        v = network_kmh(bucket_of(when))
+        return float(v) if v is not None else 32.0
     return {
         "congested": 18.0,
         "normal": 32.0,
         "free": 45.0,
     }.get(mode, 32.0)
 
-def estimate_eta_min(origin_lat: float, origin_lon: float, dest_lat: float, dest_lon: float, mode: TrafficMode) -> float:
+def eta_min_from_km(dist_km, mode: TrafficMode, kmh=None):
+    # 거리(km, 스칼라/배열) → ETA(분). kmh(스칼라/배열)를 주면 모드 대신 그 속도로 (profile 조회 결과)
+    if kmh is None:
+        kmh = max(avg_speed_kmh(mode), 5.0)
+    else:
+        kmh = np.maximum(kmh, 5.0)
+    return (dist_km / kmh) * 60.0
+
+def estimate_eta_min(
+    origin_lat: float, origin_lon: float, dest_lat: float, dest_lon: float, mode: TrafficMode,
+    depart: Optional[datetime] = None,
+) -> float:
     dist = haversine_km(origin_lat, origin_lon, dest_lat, dest_lon)
-    kmh = max(avg_speed_kmh(mode), 5.0)
-    return (dist / kmh) * 60.0
+    if mode == "profile":
+        # 출발 시각 버킷에서 출발지/도착지 권역 속도 (O(1) 조회)
+        v = trip_kmh(origin_lat, origin_lon, dest_lat, dest_lon, bucket_of(depart))
+        if v is not None:
+            return float(eta_min_from_km(dist, mode, kmh=float(v)))
+    return eta_min_from_km(dist, mode)
@@ -0,0 +1,52 @@
+# services/traffic_baseline.py
+# 링크별 · 시간대별 자유주행 속도 기준선 (collect_link_traffic.py 가 P² 스케치로 만든 link_baseline.npz)
+# - 그 시간대 표본이 MIN_SAMPLES 미만이면 하루 전체 기준선, 그것도 부족하면 None → 호출 측 전역 기준속도
+# - 파일 mtime 이 바뀔 때만 다시 읽는다
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+DATA_DIR = Path(__file__).resolve().parents[2] / "data"
+BASELINE_PATH = DATA_DIR / "link_baseline.npz"
+MIN_SAMPLES = 12
+
+_STATE: Dict[str, Any] = {"version": None, "index": {}, "baseline": None, "count": None}
+
+
+def baseline_version() -> Optional[str]:
+    try:
+        st = BASELINE_PATH.stat()
+    except FileNotFoundError:
+        return None
+    return f"{st.st_mtime_ns}:{st.st_size}"
+
+
+def _load():
+    ver = baseline_version()
+    if ver == _STATE["version"]:
+        return
+    _STATE.update(version=ver, index={}, baseline=None, count=None)
+    if ver is None:
+        return
+    try:
+        with np.load(BASELINE_PATH) as z:
+            _STATE["index"] = {l: i for i, l in enumerate(z["link_ids"].tolist())}
+            _STATE["baseline"] = z["baseline"].astype(np.float64)
+            _STATE["count"] = z["count"]
+    except Exception:
+        _STATE["index"] = {}
+
+
+def freeflow_kmh(link_id: str, hour: int) -> Optional[float]:
+    """hour = KST 시(0~23). 기준선이 없으면 None"""
+    _load()
+    i = _STATE["index"].get(link_id)
+    if i is None:
+        return None
+    base, cnt = _STATE["baseline"], _STATE["count"]
+    all_day = base.shape[1] - 1
+    for b in (hour % all_day, all_day):
+        if cnt[i, b] >= MIN_SAMPLES and np.isfinite(base[i, b]) and base[i, b] > 0:
+            return float(base[i, b])
+    return None
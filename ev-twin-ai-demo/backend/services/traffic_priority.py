@@ -0,0 +1,56 @@
+# services/traffic_priority.py
+# 교통 링크 수집 우선순위 (collect_link_traffic.py adaptive 모드가 주기적으로 GET /traffic/priority)
+# - hot : 링크에 붙은 충전기가 DOWN / risk CRITICAL·ALERT, 또는 최근 autopilot top-K에 든 충전소
+# - warm: DEGRADED / downProb6h >= WARM_DOWN_PROB / risk SUSPECT
+# - 나머지 링크는 cold (목록에 없으면 cold 로 본다)
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List
+
+RECENT_TOP_TTL_S = float(os.getenv("EV_TWIN_PRIORITY_TOP_TTL_S", "1800"))
+WARM_DOWN_PROB = 0.55
+
+_RECENT_TOP: Dict[str, float] = {}  # stationId → 마지막으로 autopilot top-K에 든 시각
+_LOCK = threading.Lock()
+
+
+def note_autopilot_top(station_ids: Iterable[str], now: float = None):
+    now = time.time() if now is None else now
+    with _LOCK:
+        for sid in station_ids:
+            if sid:
+                _RECENT_TOP[sid] = now
+        for sid in [s for s, t in _RECENT_TOP.items() if now - t > RECENT_TOP_TTL_S]:
+            del _RECENT_TOP[sid]
+
+
+def _tier(twin: Dict[str, Any], recent: Dict[str, float]) -> int:
+    """2 = hot, 1 = warm, 0 = cold"""
+    der = twin.get("derived") or {}
+    if der.get("health") == "DOWN" or der.get("risk") in ("CRITICAL", "ALERT") or twin.get("stationId") in recent:
+        return 2
+    if der.get("health") == "DEGRADED" or (der.get("downProb6h") or 0) >= WARM_DOWN_PROB or der.get("risk") == "SUSPECT":
+        return 1
+    return 0
+
+
+def link_priorities(twins: List[Dict[str, Any]], now: float = None) -> Dict[str, Any]:
+    """링크별로 붙은 충전기 중 가장 높은 tier. return {"hot": [link_id], "warm": [link_id], ...}"""
+    now = time.time() if now is None else now
+    with _LOCK:
+        recent = {s: t for s, t in _RECENT_TOP.items() if now - t <= RECENT_TOP_TTL_S}
+
+    best: Dict[str, int] = {}
+    for t in twins:
+        lid = (t.get("signals") or {}).get("linkId")
+        if lid:
+            best[lid] = max(best.get(lid, 0), _tier(t, recent))
+
+    return {
+        "generatedAt": int(now),
+        "hot": sorted(l for l, v in best.items() if v == 2),
+        "warm": sorted(l for l, v in best.items() if v == 1),
+        "linked": len(best),
+        "recentTopStations": len(recent),
+    }
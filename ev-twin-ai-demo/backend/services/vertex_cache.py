@@ -0,0 +1,61 @@
+# services/vertex_cache.py
+# LINK_VERTEX 보간점 열 캐시(.npz) 형식 + 읽기/쓰기 (make_tsv.py 와 road_graph.py 공용, numpy 만 사용)
+# - 열: link_ids(정렬된 고유 LINK_ID) / codes(int32) / ver_seq / x / y — (LINK_ID, VER_SEQ) 순 정렬
+# - 원본 mtime/size 가 같으면 해시 생략, 다르면 sha256 비교 (복사/touch 만 된 경우 재변환 안 함)
+# - 쓰기는 tmp 파일 → os.replace
+import hashlib
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+
+VERTEX_CACHE_FORMAT = 1  # 캐시 내용/정렬 규칙이 바뀌면 올릴 것
+VERTEX_COLUMNS = ("link_ids", "codes", "ver_seq", "x", "y")
+
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def load_vertex_cache(src: Path, cache: Path, refresh_stat: bool = False) -> Optional[Dict[str, np.ndarray]]:
+    """
+    캐시가 원본과 같으면 열 dict, 아니면(없음/형식 다름/내용 다름/깨짐) None
+    - refresh_stat: 해시로 같다고 확인된 경우 캐시의 mtime/size 를 갱신해서 다음 번엔 해시 생략
+    """
+    if not cache.exists():
+        return None
+    try:
+        st = src.stat()
+        with np.load(cache) as z:
+            if int(z["format"]) != VERTEX_CACHE_FORMAT:
+                return None
+            same_stat = int(z["src_mtime_ns"]) == st.st_mtime_ns and int(z["src_size"]) == st.st_size
+            sha = None if same_stat else file_sha256(src)
+            if not same_stat and str(z["src_sha256"]) != sha:
+                return None
+            cols = {k: z[k] for k in VERTEX_COLUMNS}
+    except Exception as e:
+        print(f"[vertex_cache] cache ignored: {e}")
+        return None
+
+    if sha is not None and refresh_stat:
+        save_vertex_cache(cache, cols, st, sha)
+    return cols
+
+
+def save_vertex_cache(cache: Path, cols: Dict[str, np.ndarray], st: os.stat_result, sha: str):
+    tmp = cache.with_name(cache.name + ".tmp.npz")
+    np.savez(
+        tmp,
+        format=np.int64(VERTEX_CACHE_FORMAT),
+        src_sha256=np.array(sha),
+        src_mtime_ns=np.int64(st.st_mtime_ns),
+        src_size=np.int64(st.st_size),
+        **cols,
+    )
+    os.replace(tmp, cache)
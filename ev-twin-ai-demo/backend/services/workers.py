@@ -0,0 +1,25 @@
+# services/workers.py
+# CPU 작업(로컬서치/시뮬레이션)용 공용 프로세스 풀
+# - 요청마다 풀을 새로 띄우면 수백 ms가 들어서 lazily 하나만 만들어 재사용
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+MAX_WORKERS = max(1, int(os.getenv("EV_TWIN_WORKERS", "0")) or (os.cpu_count() or 2))
+
+_POOL: Optional[ProcessPoolExecutor] = None
+_LOCK = threading.Lock()
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    global _POOL
+    with _LOCK:
+        # 워커가 죽어서 broken 상태면 새로 만든다
+        if _POOL is None or getattr(_POOL, "_broken", False):
+            _POOL = ProcessPoolExecutor(max_workers=MAX_WORKERS)
+        return _POOL
+
+
+def effective_workers(requested: int) -> int:
+    return max(1, min(int(requested), MAX_WORKERS))
@@ -0,0 +1,8 @@
+# tests/conftest.py
+# backend/ 를 import 경로에 추가 (services.* 를 main.py 와 같은 방식으로 import)
+# 저장소 루트(교통 수집 스크립트: collect_link_traffic / traffic_store / link_baseline ...)는 뒤에 붙인다
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.append(str(Path(__file__).resolve().parents[3]))
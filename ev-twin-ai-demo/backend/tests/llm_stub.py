@@ -0,0 +1,87 @@
+# tests/llm_stub.py
+# OpenAI Responses API 최소 흉내 (POST /v1/responses, stream 포함) — OPENAI_BASE_URL 로 붙여서 llm_client 테스트
+# - user 메시지에 "SLOW" 가 있으면 일부러 늦게 응답 (timeout 경로 확인용)
+# - srv.reply(body) -> str 를 넣으면 비스트림 응답 텍스트를 요청별로 만든다 (batch 테스트용)
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TEXT = json.dumps({"summary": "장기 다운 케이스 우선 처리", "top_reasons": ["S1 장기 다운"]}, ensure_ascii=False)
+USAGE = {
+    "input_tokens": 321, "output_tokens": 45, "total_tokens": 366,
+    "input_tokens_details": {"cached_tokens": 0}, "output_tokens_details": {"reasoning_tokens": 0},
+}
+
+
+def _response(model: str, text: str = TEXT, status: str = "completed") -> dict:
+    output = [{
+        "type": "message", "id": "msg_1", "status": "completed", "role": "assistant",
+        "content": [{"type": "output_text", "text": text, "annotations": []}],
+    }] if text else []
+    return {
+        "id": "resp_1", "object": "response", "created_at": 0, "model": model, "status": status,
+        "output": output, "parallel_tool_calls": True, "tool_choice": "auto", "tools": [], "usage": USAGE,
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append(body)
+        slow = "SLOW" in body["input"][-1]["content"]
+        try:
+            if body.get("stream"):
+                self._stream(body["model"], slow)
+            else:
+                time.sleep(self.server.slow_s if slow else 0.0)
+                reply = self.server.reply
+                self._json(_response(body["model"], reply(body) if reply else TEXT))
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _json(self, obj: dict):
+        b = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(b)))
+        self.end_headers()
+        self.wfile.write(b)
+
+    def _stream(self, model: str, slow: bool):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def send(obj):
+            d = f"event: {obj['type']}\ndata: {json.dumps(obj, ensure_ascii=False)}\n\n".encode("utf-8")
+            self.wfile.write(f"{len(d):x}\r\n".encode() + d + b"\r\n")
+            self.wfile.flush()
+
+        send({"type": "response.created", "sequence_number": 0, "response": _response(model, "", "in_progress")})
+        seq = 0
+        for i in range(0, len(TEXT), 8):
+            seq += 1
+            time.sleep(self.server.slow_s if slow else 0.0)
+            send({"type": "response.output_text.delta", "item_id": "msg_1", "output_index": 0,
+                  "content_index": 0, "delta": TEXT[i:i + 8], "sequence_number": seq, "logprobs": []})
+        send({"type": "response.completed", "sequence_number": seq + 1, "response": _response(model)})
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+def start_stub(slow_s: float = 3.0) -> ThreadingHTTPServer:
+    """빈 포트에 띄우고 서버 반환. base URL = f"http://127.0.0.1:{srv.server_port}/v1" """
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    srv.daemon_threads = True
+    srv.requests = []
+    srv.slow_s = slow_s
+    srv.reply = None
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
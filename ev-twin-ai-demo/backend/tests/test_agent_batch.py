@@ -0,0 +1,91 @@
+# tests/test_agent_batch.py
+# agent batch 를 로컬 Responses API stub(tests/llm_stub.py)에 붙여서 확인
+# - batch_size / 토큰 예산으로 묶음 분할, 응답 누락·JSON 아님·빈 응답 → 트윈별 규칙 기반 fallback, 결과 순서 유지
+import asyncio
+import json
+
+import pytest
+
+from llm_stub import start_stub
+from services import agent_llm, llm_client
+from services.agent import AgentBatchRunRequest, run_agent_batch_async
+from services.llm_cache import LLMCache
+
+
+def _reply(body):
+    """묶음의 id를 역순으로 돌려준다. DROP 은 빼고, BAD 가 있으면 JSON 아님, EMPTY 가 있으면 빈 응답"""
+    ids = [t["id"] for t in json.loads(body["input"][-1]["content"])["twins"]]
+    if any("BAD" in i for i in ids):
+        return "결과를 만들 수 없습니다"
+    if any("EMPTY" in i for i in ids):
+        return ""
+    rows = [{"id": i, "risk": "CRITICAL", "eta_min": 1.0, "plan": [{"action": "DISPATCH"}], "reasons": ["llm"]}
+            for i in reversed(ids) if "DROP" not in i]
+    return json.dumps({"results": rows})
+
+
+@pytest.fixture
+def stub(monkeypatch, tmp_path):
+    srv = start_stub(slow_s=3.0)
+    srv.reply = _reply
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setenv("OPENAI_BASE_URL", f"http://127.0.0.1:{srv.server_port}/v1")
+    monkeypatch.setattr(llm_client, "LLM_CACHE", LLMCache(tmp_path / "llm_cache.sqlite3", 3600, 100))
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def _twin(sid, risk="ALERT"):
+    return {"stationId": sid, "chargerId": "01", "lat": 37.55, "lon": 126.99, "derived": {"risk": risk}}
+
+
+def _run(twins, **kw):
+    req = AgentBatchRunRequest(twins=twins, useLLM=True, **kw)
+    return asyncio.run(run_agent_batch_async([], req))
+
+
+def _sent_ids(stub):
+    return [[t["id"] for t in json.loads(b["input"][-1]["content"])["twins"]] for b in stub.requests]
+
+
+def test_split_by_batch_size_keeps_order(stub):
+    twins = [_twin(f"S{i}") for i in range(7)]
+    out = _run(twins, llmBatchSize=3, llmConcurrency=2)
+
+    assert sorted(len(c) for c in _sent_ids(stub)) == [1, 3, 3]
+    assert out["llm"] == {"batches": 3, "statuses": ["ok"] * 3, "llmItems": 7, "ruleItems": 0}
+    assert [x["id"] for x in out["items"]] == [f"S{i}/01" for i in range(7)]
+    assert all(x["source"] == "llm" and x["plan"] == [{"action": "DISPATCH"}] for x in out["items"])
+
+
+def test_split_by_token_budget(stub, monkeypatch):
+    monkeypatch.setattr(agent_llm, "token_budget", lambda model: 1)  # 묶음마다 트윈 1개
+    twins = [_twin(f"S{i}") for i in range(4)]
+    out = _run(twins, llmBatchSize=25)
+
+    assert sorted(_sent_ids(stub)) == [[f"S{i}/01"] for i in range(4)]
+    assert out["llm"]["batches"] == 4 and out["llm"]["llmItems"] == 4
+
+
+def test_per_twin_fallback(stub):
+    # 묶음(batch_size=2): [A, DROP] ok / [BAD, C] JSON 아님 / [EMPTY, D] 빈 응답
+    twins = [_twin("A"), _twin("DROP"), _twin("BAD"), _twin("C", "OK"), _twin("EMPTY"), _twin("D")]
+    out = _run(twins, llmBatchSize=2, llmConcurrency=3)
+
+    assert out["llm"]["statuses"] == ["ok", "llm_not_json", "error"]
+    assert out["llm"]["llmItems"] == 1 and out["llm"]["ruleItems"] == 5
+    assert [x["id"] for x in out["items"]] == [f"{t['stationId']}/01" for t in twins]
+    assert [x["source"] for x in out["items"]] == ["llm"] + ["rule"] * 5
+
+    rule = {x["id"]: x for x in out["items"][1:]}
+    assert rule["C/01"]["plan"] == [{"action": "NO_ACTION"}]
+    assert rule["DROP/01"]["plan"][0] == {"action": "REMOTE_RESET"}
+    assert rule["DROP/01"]["risk"] == "ALERT"
+
+
+def test_no_llm_call_without_use_llm(stub):
+    req = AgentBatchRunRequest(twins=[_twin("A")], useLLM=False)
+    out = asyncio.run(run_agent_batch_async([], req))
+    assert out["llm"] is None and "source" not in out["items"][0]
+    assert stub.requests == []
@@ -0,0 +1,291 @@
+# tests/test_collect_link_traffic.py
+# 교통 수집기(저장소 루트 collect_link_traffic.py): httpx.MockTransport 로 서울시 TrafficInfo 흉내
+# - 토큰 버킷 속도 제한, 재시도(지수 backoff + jitter), 재시도하지 않는 상태, bulk 페이지 파싱 + 링크별 fallback
+import asyncio
+import time
+from collections import Counter
+
+import httpx
+import pytest
+
+import collect_link_traffic as clt
+
+
+def _row_xml(link_id, speed="31.5", trv="12"):
+    return f"<row><link_id>{link_id}</link_id><prcs_spd>{speed}</prcs_spd><prcs_trv_time>{trv}</prcs_trv_time></row>"
+
+
+def _ok_xml(rows, total=None):
+    total = len(rows) if total is None else total
+    return (
+        f"<TrafficInfo><list_total_count>{total}</list_total_count>"
+        f"<RESULT><CODE>INFO-000</CODE><MESSAGE>정상 처리되었습니다</MESSAGE></RESULT>{''.join(rows)}</TrafficInfo>"
+    )
+
+
+def _result_xml(code, msg="msg"):
+    return f"<RESULT><CODE>{code}</CODE><MESSAGE>{msg}</MESSAGE></RESULT>"
+
+
+def _link_of(request):
+    # /{key}/xml/TrafficInfo/{start}/{end}/{link_id}
+    return request.url.path.split("/")[-1]
+
+
+@pytest.fixture(autouse=True)
+def api_key(monkeypatch):
+    monkeypatch.setattr(clt, "SEOUL_API_KEY", "test-key")
+
+
+@pytest.fixture
+def fast(monkeypatch):
+    """backoff 대기는 기록만 하고 바로 진행, jitter 난수 고정"""
+    sleeps = []
+    real_sleep = asyncio.sleep
+
+    async def no_wait(s, *a, **kw):
+        sleeps.append(s)
+        await real_sleep(0)
+
+    monkeypatch.setattr(clt.asyncio, "sleep", no_wait)
+    monkeypatch.setattr(clt.random, "random", lambda: 0.25)
+    return sleeps
+
+
+def test_token_bucket_limits_rate():
+    bucket = clt.TokenBucket(rate=50.0, burst=5)
+
+    async def take(n):
+        stamps = []
+        for _ in range(n):
+            await bucket.acquire()
+            stamps.append(time.monotonic())
+        return stamps
+
+    t0 = time.monotonic()
+    stamps = asyncio.run(take(15))
+    assert stamps[4] - t0 < 0.05                     # burst 5개는 바로
+    assert stamps[-1] - t0 >= (15 - 5) / 50.0 * 0.9  # 나머지 10개는 초당 50개
+    assert bucket.tokens < 1
+
+
+def test_retry_with_exponential_backoff_and_jitter(fast):
+    calls = Counter()
+
+    def handler(request):
+        link = _link_of(request)
+        calls[link] += 1
+        if calls[link] <= 2:
+            return httpx.Response(503)
+        return httpx.Response(200, text=_ok_xml([_row_xml(link)]))
+
+    rows, stats = asyncio.run(clt.collect_traffic(["100"], transport=httpx.MockTransport(handler)))
+    assert rows == [{"link_id": "100", "speed": "31.5", "travel_time": "12"}]
+    assert stats["OK"] == 1 and stats["retry"] == 2
+    # BACKOFF_BASE_S * 2^n * (0.5 + jitter)
+    backoff = [s for s in fast if s > 0]
+    assert backoff == pytest.approx([clt.BACKOFF_BASE_S * 0.75, clt.BACKOFF_BASE_S * 2 * 0.75])
+
+
+def test_gives_up_after_max_retries(fast):
+    calls = Counter()
+
+    def handler(request):
+        calls[_link_of(request)] += 1
+        return httpx.Response(200, text=_result_xml("ERROR-500", "서버 오류"))
+
+    rows, stats = asyncio.run(clt.collect_traffic(["1", "2"], transport=httpx.MockTransport(handler)))
+    assert rows == []
+    assert calls == {"1": clt.MAX_RETRIES + 1, "2": clt.MAX_RETRIES + 1}
+    assert stats["ERROR-500"] == 2 and stats["retry"] == 2 * clt.MAX_RETRIES
+
+
+def test_no_retry_for_no_data_or_bad_xml():
+    calls = Counter()
+
+    def handler(request):
+        link = _link_of(request)
+        calls[link] += 1
+        if link == "empty":
+            return httpx.Response(200, text=_result_xml("INFO-200", "해당하는 데이터가 없습니다"))
+        if link == "broken":
+            return httpx.Response(200, text="<TrafficInfo><row>")
+        return httpx.Response(200, text=_ok_xml([_row_xml(link, speed="")]))
+
+    rows, stats = asyncio.run(clt.collect_traffic(["empty", "broken", "7"], transport=httpx.MockTransport(handler)))
+    assert calls == {"empty": 1, "broken": 1, "7": 1}
+    assert stats == Counter({"INFO-200": 1, "XML_PARSE_FAIL": 1, "OK": 1})
+    assert rows == [{"link_id": "7", "speed": "", "travel_time": "12"}]
+
+
+def test_missing_key_exits_in_main_not_on_import(monkeypatch):
+    monkeypatch.setattr(clt, "SEOUL_API_KEY", None)
+    with pytest.raises(SystemExit, match="SEOUL_API_KEY"):
+        clt.main()
+
+
+# ---------- bulk (페이지 단위 + 빠진 링크만 링크별) ----------
+PAGE_ROWS = [_row_xml(i, speed=str(10 + i)) for i in range(1, 6)]  # link 1..5
+
+
+def _chunked(text, size=7):
+    async def gen():
+        b = text.encode("utf-8")
+        for i in range(0, len(b), size):
+            yield b[i : i + size]
+    return gen()
+
+
+def _bulk_handler(calls, fail_pages=(), first_code=None):
+    def handler(request):
+        parts = request.url.path.strip("/").split("/")
+        if len(parts) == 6:  # 링크별: key/xml/TrafficInfo/1/1/link_id
+            calls["link:" + parts[5]] += 1
+            if parts[5] == "9":
+                return httpx.Response(200, text=_result_xml("INFO-200"))
+            return httpx.Response(200, text=_ok_xml([_row_xml(parts[5], speed="99")]))
+        start, end = int(parts[3]), int(parts[4])
+        calls[f"page:{start}-{end}"] += 1
+        if start in fail_pages:
+            return httpx.Response(500)
+        if first_code:
+            return httpx.Response(200, text=_result_xml(first_code))
+        # 7바이트씩 흘려 보내서 XMLPullParser 가 태그 중간에서 끊긴 청크를 이어 붙이는지 확인
+        return httpx.Response(200, content=_chunked(_ok_xml(PAGE_ROWS[start - 1 : end], total=len(PAGE_ROWS))))
+    return httpx.MockTransport(handler)
+
+
+def _bulk(links, transport, page_size=2):
+    return asyncio.run(clt.collect_traffic_bulk(links, page_size=page_size, transport=transport))
+
+
+def test_bulk_pages_keep_only_wanted_links():
+    calls = Counter()
+    rows, stats = _bulk(["1", "3", "5", "9"], _bulk_handler(calls))
+
+    assert {k for k in calls if k.startswith("page:")} == {"page:1-2", "page:3-4", "page:5-5"}
+    assert calls["link:9"] == 1 and sum(v for k, v in calls.items() if k.startswith("link:")) == 1
+    assert rows == [
+        {"link_id": "1", "speed": "11", "travel_time": "12"},
+        {"link_id": "3", "speed": "13", "travel_time": "12"},
+        {"link_id": "5", "speed": "15", "travel_time": "12"},
+    ]
+    assert stats["page:OK"] == 3 and stats["INFO-200"] == 1
+
+
+def test_bulk_failed_page_falls_back_per_link(fast):
+    calls = Counter()
+    rows, stats = _bulk(["1", "3", "4", "5"], _bulk_handler(calls, fail_pages=(3,)))
+
+    assert calls["page:3-4"] == clt.MAX_RETRIES + 1
+    assert stats["page:HTTP_500"] == 1
+    # 실패한 페이지의 링크만 링크별 호출
+    assert {k for k in calls if k.startswith("link:")} == {"link:3", "link:4"}
+    assert {r["link_id"]: r["speed"] for r in rows} == {"1": "11", "3": "99", "4": "99", "5": "15"}
+
+
+def test_bulk_no_data_means_all_links_per_link():
+    calls = Counter()
+    rows, stats = _bulk(["1", "2"], _bulk_handler(calls, first_code="INFO-200"))
+
+    assert calls["page:1-2"] == 1 and len([k for k in calls if k.startswith("page:")]) == 1
+    assert stats["page:INFO-200"] == 1
+    assert [r["link_id"] for r in rows] == ["1", "2"]
+
+
+# ---------- 데몬 1회 수집 (스냅샷 교체 + 시계열 + 기준선) ----------
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    import traffic_store
+
+    monkeypatch.setattr(clt, "OUT_TRAFFIC", tmp_path / "link_traffic.tsv")
+    monkeypatch.setattr(clt, "BASELINE_PATH", tmp_path / "link_baseline.npz")
+    monkeypatch.setattr(clt, "_BASELINE", {"sk": None, "saved": 0.0})
+    monkeypatch.setattr(clt, "MODE", "link")
+    monkeypatch.setattr(traffic_store, "TS_DIR", tmp_path / "traffic_ts")
+    return tmp_path
+
+
+def _patch_transport(monkeypatch, handler):
+    real = clt.collect_traffic
+
+    async def with_mock(link_ids, **kw):
+        return await real(link_ids, transport=httpx.MockTransport(handler), **kw)
+
+    monkeypatch.setattr(clt, "collect_traffic", with_mock)
+
+
+def test_sweep_once_writes_snapshot_history_baseline(store, monkeypatch):
+    _patch_transport(monkeypatch, lambda r: httpx.Response(200, text=_ok_xml([_row_xml(_link_of(r))])))
+    rows, _ = asyncio.run(clt.sweep_once(["11", "12"]))
+
+    assert [r["link_id"] for r in rows] == ["11", "12"]
+    assert (store / "link_traffic.tsv").read_text(encoding="utf-8").splitlines()[1:] == ["11\t31.5\t12", "12\t31.5\t12"]
+    assert len(list((store / "traffic_ts").glob("*.bin"))) == 1
+    assert (store / "link_baseline.npz").exists()
+
+
+def test_sweep_once_keeps_snapshot_when_nothing_fetched(store, monkeypatch):
+    (store / "link_traffic.tsv").write_text("link_id\tspeed\ttravel_time\n11\t20\t9\n", encoding="utf-8")
+    _patch_transport(monkeypatch, lambda r: httpx.Response(200, text=_result_xml("INFO-200")))
+    rows, stats = asyncio.run(clt.sweep_once(["11"]))
+
+    assert rows == [] and stats["INFO-200"] == 1
+    assert (store / "link_traffic.tsv").read_text(encoding="utf-8") == "link_id\tspeed\ttravel_time\n11\t20\t9\n"
+    assert not (store / "traffic_ts").exists()
+
+
+# ---------- adaptive: PollScheduler ----------
+@pytest.fixture
+def tiers(monkeypatch):
+    monkeypatch.setattr(clt, "TIER_INTERVAL_S", {2: 60.0, 1: 300.0, 0: 1800.0})
+    monkeypatch.setattr(clt, "MIN_INTERVAL_S", 30.0)
+
+
+def test_scheduler_tier_intervals(tiers):
+    s = clt.PollScheduler(["h", "w", "c"], now=0.0)
+    assert sorted(s.pop_due(0.0)) == ["c", "h", "w"]  # 처음엔 전부 바로
+    s.polled(["h", "w", "c"], 0.0)
+    assert s.next_due() == 1800.0
+
+    s.set_tiers(hot={"h"}, warm={"w"}, now=10.0)
+    assert [s.interval(l) for l in "hwc"] == [60.0, 300.0, 1800.0]
+    assert s.next_due() == 60.0          # 뜨거워진 링크는 마지막 수집 + 새 주기로 앞당김
+    assert s.pop_due(59.0) == []
+    assert s.pop_due(60.0) == ["h"]
+    assert s.pop_due(300.0) == ["w"]
+    assert s.pop_due(1800.0) == ["c"]    # 옛 due(1800) 항목은 버려지고 각 링크 1번씩만
+    assert s.pop_due(10_000.0) == []
+
+
+def test_scheduler_promotion_after_overdue_is_now(tiers):
+    s = clt.PollScheduler(["a"], now=0.0)
+    s.polled(s.pop_due(0.0), 0.0)
+    s.set_tiers(hot={"a"}, warm=set(), now=500.0)  # 0 + 60 은 이미 지남 → 지금
+    assert s.next_due() == 500.0
+
+
+def test_scheduler_cooling_waits_for_next_poll(tiers):
+    s = clt.PollScheduler(["a"], now=0.0)
+    s.set_tiers(hot={"a"}, warm=set(), now=0.0)
+    s.polled(s.pop_due(0.0), 0.0)
+    assert s.next_due() == 60.0
+    s.set_tiers(hot=set(), warm=set(), now=10.0)
+    assert s.next_due() == 60.0          # 이미 잡힌 수집은 그대로
+    s.polled(s.pop_due(60.0), 60.0)
+    assert s.next_due() == 60.0 + 1800.0
+
+
+def test_scheduler_volatility_shortens_interval_with_floor(tiers):
+    s = clt.PollScheduler(["a", "b"], now=0.0)
+    s.observe("a", 50.0)
+    s.observe("a", 25.0)                 # 변동 0.5 → EWMA 0.3 * 0.5
+    vol = clt.VOL_ALPHA * 0.5
+    assert s.interval("a") == pytest.approx(1800.0 / (1 + clt.VOL_GAIN * vol))
+    s.observe("a", float("nan"))         # NaN 은 무시
+    s.observe("zzz", 10.0)               # 모르는 링크도 무시
+    assert s.last_speed == {"a": 25.0}
+
+    s.set_tiers(hot={"b"}, warm=set(), now=0.0)
+    s.vol["b"] = 10.0
+    assert s.interval("b") == 30.0       # MIN_INTERVAL_S 아래로는 안 내려감
@@ -0,0 +1,58 @@
+# tests/test_depot_location.py
+# 거점 배치: PAM 교환은 그리디 목적값을 유지하거나 개선, 작은 문제에서는 전수 탐색 최적값과 비교
+from itertools import combinations
+
+import numpy as np
+import pytest
+
+from services.depot_location import (
+    DepotPlacementRequest, _greedy, _objective_cost, _swap_search, place_depots,
+)
+
+
+def _cost(F, w, chosen):
+    return float((F[chosen].min(axis=0) * w).sum())
+
+
+@pytest.mark.parametrize("seed", range(20))
+@pytest.mark.parametrize("objective", ["eta", "coverage"])
+def test_swap_never_worse_than_greedy(seed, objective):
+    rng = np.random.default_rng(seed)
+    n_cand, n_dem, k = 25, 60, 4
+    eta = rng.uniform(5, 90, (n_cand, n_dem))
+    F = _objective_cost(eta, objective, 45.0)
+    w = rng.random(n_dem)
+    w /= w.sum()
+
+    greedy = _greedy(F, w, k, None)
+    chosen, cost, _ = _swap_search(F, w, greedy)
+    assert len(set(chosen)) == k
+    assert cost == pytest.approx(_cost(F, w, chosen))
+    assert cost <= _cost(F, w, greedy) + 1e-9
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_swap_close_to_exhaustive_optimum(seed):
+    rng = np.random.default_rng(100 + seed)
+    pts = rng.random((12, 2))
+    F = np.hypot(*(pts[:, None, :] - pts[None, :, :]).transpose(2, 0, 1))
+    w = np.full(12, 1 / 12)
+    opt = min(_cost(F, w, list(c)) for c in combinations(range(12), 3))
+
+    best = min(_swap_search(F, w, _greedy(F, w, 3, f))[1] for f in [None, *range(12)])
+    assert best >= opt - 1e-12
+    assert best <= opt * 1.05
+
+
+def test_place_depots_deterministic_with_seed():
+    rng = np.random.default_rng(1)
+    twins = [
+        {"stationId": f"S{i}", "chargerId": "01", "lat": 37.45 + 0.2 * a, "lon": 126.85 + 0.3 * b,
+         "derived": {"downProb6h": float(p)}}
+        for i, (a, b, p) in enumerate(rng.random((150, 3)).tolist())
+    ]
+    req = DepotPlacementRequest(nDepots=3, maxCandidates=60, restarts=4, workers=1, seed=5)
+    a, b = place_depots(twins, req), place_depots(twins, req)
+    assert a == b
+    assert len(a["depots"]) == 3
+    assert sum(d["demandShare"] for d in a["depots"]) == pytest.approx(1.0, abs=0.01)
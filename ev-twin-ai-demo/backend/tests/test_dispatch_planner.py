@@ -0,0 +1,79 @@
+# tests/test_dispatch_planner.py
+# 출동 계획: routes 에는 SLA 안 방문만, 나머지는 unassigned 에 이유와 함께
+import numpy as np
+
+from services.dispatch_planner import DispatchCase, DispatchPlanRequest, plan_dispatch
+from services.distance_matrix import cache_stats
+from services.sim_procurement import ProviderProfile
+from services.traffic import avg_speed_kmh
+
+
+def _case(i, lat, lon, down=0):
+    return DispatchCase(
+        stationId=f"S{i}", chargerId="01", name=f"st{i}", lat=lat, lon=lon, score=1.0, downMinutes=down,
+    )
+
+
+def _req(items, crews=1, **kw):
+    kw.setdefault("timeBudgetMs", 0)
+    depots = [ProviderProfile(name="D", baseLat=37.50, baseLon=127.00, crews=crews)]
+    return DispatchPlanRequest(items=items, depots=depots, **kw)
+
+
+def _routed(res):
+    return {f"{s.stationId}/{s.chargerId}" for r in res.routes for s in r.steps}
+
+
+def test_no_crews_all_unassigned():
+    res = plan_dispatch(_req([_case(0, 37.51, 127.01)], crews=0))
+    assert [(u.id, u.reason) for u in res.unassigned] == [("S0/01", "no_crews")]
+    assert res.routes == []
+
+
+def test_sla_unreachable_reported_and_excluded():
+    # 거점 근처 1건 + 마감이 이미 지난 1건 + 너무 먼(부산) 1건
+    items = [_case(0, 37.51, 127.01), _case(1, 37.52, 127.02, down=200), _case(2, 35.18, 129.07)]
+    res = plan_dispatch(_req(items, slaMinutes=90))
+    reasons = {u.id: u.reason for u in res.unassigned}
+    assert reasons == {"S1/01": "sla_unreachable", "S2/01": "sla_unreachable"}
+    assert _routed(res) == {"S0/01"}
+    assert res.slaMisses == 2
+    assert all(s.slaHit for r in res.routes for s in r.steps)
+
+
+def test_crew_capacity_overflow():
+    # 크루 1명, 각자 단독으로는 도달 가능하지만 작업시간 때문에 전부는 못 함
+    items = [_case(i, 37.50 + 0.01 * (i + 1), 127.00) for i in range(4)]
+    res = plan_dispatch(_req(items, slaMinutes=60, serviceMinutes=40.0))
+    routed = _routed(res)
+    over = [u for u in res.unassigned if u.reason == "crew_capacity"]
+    assert over and len(routed) + len(over) == 4
+    assert all(u.bestArriveMin <= u.deadlineMin for u in over)
+    assert all(s.slaHit for r in res.routes for s in r.steps)
+    assert res.slaMisses == len(res.unassigned)
+
+
+def test_more_crews_fewer_unassigned():
+    items = [_case(i, 37.50 + 0.01 * (i + 1), 127.00) for i in range(4)]
+    res = plan_dispatch(_req(items, crews=4, slaMinutes=60, serviceMinutes=40.0))
+    assert res.unassigned == []
+    assert len(_routed(res)) == 4
+
+
+def test_uses_distance_cache_and_matches_haversine():
+    items = [_case(i, 37.40 + 0.03 * i, 126.90 + 0.02 * i) for i in range(5)]
+    req = _req(items, crews=5, slaMinutes=10_000)
+    plan_dispatch(req)
+    before = cache_stats()["hits"]
+    res = plan_dispatch(req)
+    assert cache_stats()["hits"] > before
+
+    # 각 경로의 첫 방문: legKm == 거점↔케이스 대권거리
+    kmh = avg_speed_kmh("normal")
+    for r in res.routes:
+        s = r.steps[0]
+        lat1, lon1, lat2, lon2 = map(np.radians, (37.50, 127.00, s.lat, s.lon))
+        a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+        km = 2 * 6371.0 * np.arcsin(np.sqrt(a))
+        assert abs(s.legKm - km) < 0.01
+        assert abs(s.arriveMin - km / kmh * 60.0) < 0.1
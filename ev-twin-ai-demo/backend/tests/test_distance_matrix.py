@@ -0,0 +1,85 @@
+# tests/test_distance_matrix.py
+# 거리 행렬 캐시: 좌표 내용 키, 메모리 상한, 스칼라 haversine 과 같은 값, 깨진 좌표는 NaN 으로 제외
+import numpy as np
+import pytest
+
+from services import distance_matrix as dm
+from services.sim_crew_queue import twin_weights
+from services.sim_procurement import get_incident_sample
+from services.traffic import haversine_km
+
+
+def _twins(n=50, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        {"stationId": f"S{i}", "chargerId": "01", "lat": 37.4 + 0.3 * a, "lon": 126.8 + 0.4 * b}
+        for i, (a, b) in enumerate(rng.random((n, 2)).tolist())
+    ]
+
+
+def test_version_follows_content_not_identity():
+    a = _twins()
+    b = [dict(t) for t in a]
+    va, vb = dm.twin_coords(a)[2], dm.twin_coords(b)[2]
+    assert va == vb
+    c = [dict(t) for t in a]  # 트윈 목록은 갱신 때 새 list 로 바뀐다 (같은 list 는 identity 로 재사용)
+    c[3]["lat"] += 1e-6
+    assert dm.twin_coords(c)[2] != va
+
+
+def test_depot_row_cached_by_coords_and_version():
+    lats, lons, ver = dm.twin_coords(_twins(seed=1))
+    r1 = dm.depot_row_km(37.5, 127.0, lats, lons, ver)
+    hits = dm.cache_stats()["hits"]
+    assert dm.depot_row_km(37.5, 127.0, lats, lons, ver) is r1
+    assert dm.cache_stats()["hits"] == hits + 1
+    assert not r1.flags.writeable
+
+
+def test_matrix_matches_scalar_haversine():
+    twins = _twins(20, seed=2)
+    lats, lons, ver = dm.twin_coords(twins)
+    row = dm.depot_row_km(37.55, 126.95, lats, lons, ver)
+    m = dm.station_matrix_km(lats, lons, ver)
+    for i in range(len(twins)):
+        assert row[i] == pytest.approx(haversine_km(37.55, 126.95, lats[i], lons[i]), abs=1e-9)
+        for j in range(0, len(twins), 5):
+            assert m[i, j] == pytest.approx(haversine_km(lats[i], lons[i], lats[j], lons[j]), abs=1e-9)
+
+
+def test_lru_memory_bound():
+    c = dm._LRUBytes(max_bytes=3 * 800)
+    for k in range(5):
+        c.put(k, np.zeros(100))  # 800 bytes
+    s = c.stats()
+    assert s["entries"] == 3 and s["bytes"] <= s["maxBytes"]
+    assert c.get(0) is None and c.get(4) is not None
+
+    c.put("big", np.zeros(1000))  # 상한보다 크면 저장 안 함
+    assert c.get("big") is None
+    assert c.stats()["bytes"] <= 3 * 800
+
+
+def test_bad_coords_become_nan_and_are_masked():
+    twins = _twins(6, seed=3)
+    twins[1]["lat"] = "37.5x"     # 숫자 아님
+    del twins[2]["lon"]           # 없음
+    twins[3]["lat"] = twins[3]["lon"] = 0.0  # station.tsv 빈 좌표 자리표시
+    twins[4]["lat"] = " 37.51 "   # 문자열 숫자는 허용
+
+    lats, lons, ver = dm.twin_coords(twins)
+    ok = dm.valid_coords(lats, lons)
+    assert ok.tolist() == [True, False, False, False, True, True]
+    assert np.isnan(dm.depot_row_km(37.5, 127.0, lats, lons, ver)[~ok]).all()
+
+    idx, _, _ = get_incident_sample(twins, 500, seed=7)
+    assert set(idx.tolist()) <= {0, 4, 5}
+    w = twin_weights(twins, "uniform")
+    assert w[~ok].sum() == 0 and w.sum() == pytest.approx(1.0)
+
+
+def test_no_valid_coords_gives_empty_sample():
+    twins = [{"stationId": "S0", "lat": None, "lon": None}]
+    idx, sev, u = get_incident_sample(twins, 100, seed=1)
+    assert len(idx) == len(sev) == len(u) == 0
+    assert not twin_weights(twins, "downProb").any()
@@ -0,0 +1,104 @@
+# tests/test_link_baseline.py
+# 링크 기준선(저장소 루트 link_baseline.py): P² 분위수 정확도, 표본 5개 미만, 시간대 버킷, 저장/로드, 이력 재생성
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+import traffic_store
+from link_baseline import TOD_BUCKETS, P2Sketches, rebuild_from_timeseries
+from traffic_store import KST, append_timeseries
+
+T0 = int(datetime(2026, 3, 2, 8, 0, tzinfo=KST).timestamp())  # 08시(KST)
+
+
+def _feed(sk, samples, ts=T0):
+    """samples: (표본 수 x 링크) → 수집 1회 = 링크마다 표본 1개"""
+    ids = [str(i) for i in range(samples.shape[1])]
+    for row in samples:
+        sk.update(ids, row, ts)
+
+
+@pytest.mark.parametrize("p", [0.5, 0.85, 0.95])
+def test_p2_matches_exact_quantile(p):
+    rng = np.random.default_rng(11)
+    n = 5000
+    samples = np.column_stack([
+        rng.uniform(10, 80, n),
+        rng.normal(45, 8, n).clip(1),
+        rng.lognormal(3.3, 0.4, n),
+        rng.gamma(4.0, 9.0, n),
+    ])
+    sk = P2Sketches(p)
+    _feed(sk, samples)
+
+    est = sk.estimates()
+    exact = np.quantile(samples, p, axis=0)
+    assert est[:, 8] == pytest.approx(exact, rel=0.02)
+    assert np.array_equal(est[:, 8], est[:, TOD_BUCKETS])  # 하루 전체 버킷도 같은 표본
+    assert np.isnan(est[:, 9]).all()                         # 다른 시간대는 표본 없음
+    assert (sk.count[:, 8] == n).all()
+
+
+def test_p2_tracks_shifted_distribution():
+    # 정렬된 입력(단조 증가)에서도 마커 순서가 유지되고 분위수를 따라간다
+    x = np.linspace(1.0, 100.0, 2001)[:, None]
+    sk = P2Sketches(0.85)
+    _feed(sk, x)
+    q = sk.q[0, 8]
+    assert (np.diff(q) >= 0).all()
+    assert sk.estimates()[0, 8] == pytest.approx(np.quantile(x, 0.85), rel=0.02)
+
+
+def test_fewer_than_five_samples_and_invalid_dropped():
+    sk = P2Sketches(0.85)
+    sk.update(["a", "b", "c"], [30.0, float("nan"), 0.0], T0)
+    sk.update(["a", "b", "c"], [50.0, -1.0, float("nan")], T0 + 60)
+    assert sk.link_ids == ["a"]  # NaN/0 이하만 온 링크는 만들지도 않음
+    assert sk.estimates()[0, 8] == pytest.approx(np.quantile([30.0, 50.0], 0.85))
+    assert sk.count[0, 8] == 2
+
+    sk.update(["b"], [40.0], T0 + 3600)  # 09시 버킷
+    est = sk.estimates()
+    assert sk.link_ids == ["a", "b"]
+    assert est[1, 9] == 40.0 and np.isnan(est[1, 8]) and est[1, TOD_BUCKETS] == 40.0
+
+
+def test_save_load_roundtrip(tmp_path):
+    rng = np.random.default_rng(2)
+    sk = P2Sketches(0.85)
+    _feed(sk, rng.uniform(20, 60, (50, 3)))
+    path = tmp_path / "link_baseline.npz"
+    sk.save(path)
+    assert [p.name for p in tmp_path.iterdir()] == ["link_baseline.npz"]
+
+    back = P2Sketches.load(path, 0.85)
+    assert back.link_ids == sk.link_ids
+    assert np.array_equal(back.estimates(), sk.estimates(), equal_nan=True)
+    with np.load(path) as z:
+        assert np.allclose(z["baseline"], sk.estimates(), equal_nan=True)
+
+    assert P2Sketches.load(path, 0.5).link_ids == []  # 분위수 설정이 바뀌면 새로 시작
+    assert P2Sketches.load(tmp_path / "missing.npz").link_ids == []
+
+
+def test_rebuild_from_timeseries_matches_online(tmp_path, monkeypatch):
+    monkeypatch.setattr(traffic_store, "TS_DIR", tmp_path / "traffic_ts")
+    rng = np.random.default_rng(5)
+    online = P2Sketches(0.85)
+    ids = ["101", "102", "103"]
+    for k in range(40):
+        ts = T0 + k * 300  # 08시~11시, 파티션 여러 개
+        speeds = rng.uniform(15, 70, 3).round(2)
+        rows = [{"link_id": l, "speed": s, "travel_time": 1} for l, s in zip(ids, speeds)]
+        online.update(ids, speeds.astype(np.float32), ts)
+        append_timeseries(rows, ts)
+    # 같은 초에 수집이 두 번 붙은 경우 (link_id 중복) → 두 번째 묶음으로 따로 들어감
+    dup = [{"link_id": "101", "speed": 33.0, "travel_time": 1}]
+    append_timeseries(dup, T0 + 39 * 300)
+    online.update(["101"], np.float32([33.0]), T0 + 39 * 300)
+
+    rebuilt = rebuild_from_timeseries(tmp_path / "traffic_ts", tmp_path / "link_baseline.npz", 0.85)
+    order = [rebuilt.link_ids.index(l) for l in online.link_ids]
+    assert np.allclose(rebuilt.estimates()[order], online.estimates(), equal_nan=True)
+    assert np.array_equal(rebuilt.count[order], online.count)
@@ -0,0 +1,72 @@
+# tests/test_llm_client.py
+# llm_client 를 로컬 Responses API stub(tests/llm_stub.py)에 붙여서 확인
+import asyncio
+import json
+
+import pytest
+
+from llm_stub import TEXT, start_stub
+from services import llm_client
+from services.llm_cache import LLMCache
+
+
+@pytest.fixture
+def stub(monkeypatch, tmp_path):
+    srv = start_stub(slow_s=3.0)
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setenv("OPENAI_BASE_URL", f"http://127.0.0.1:{srv.server_port}/v1")
+    monkeypatch.setattr(llm_client, "LLM_CACHE", LLMCache(tmp_path / "llm_cache.sqlite3", 3600, 100))
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def _run_on_llm_loop(coro):
+    return asyncio.run_coroutine_threadsafe(coro, llm_client._llm_loop()).result(timeout=5)
+
+
+def test_sync_call_then_cache_hit(stub):
+    assert llm_client.llm_text("sys", {"q": 1}) == (TEXT, "ok")
+    assert llm_client.llm_text("sys", {"q": 1}) == (TEXT, "cache")
+    assert len(stub.requests) == 1
+
+
+def test_async_call(stub):
+    text, status = asyncio.run(llm_client.llm_text_async("sys", {"q": 2}))
+    assert (text, status) == (TEXT, "ok")
+    assert json.loads(stub.requests[-1]["input"][1]["content"]) == {"q": 2}
+
+
+def test_timeout_falls_back(stub):
+    assert llm_client.llm_text("sys", {"q": "SLOW"}, timeout_s=0.3) == (None, "timeout")
+
+
+def test_stream_deltas_and_done(stub):
+    async def collect():
+        return [item async for item in llm_client.llm_stream_async("sys", {"q": 3})]
+
+    items = asyncio.run(collect())
+    assert "".join(x[1] for x in items if x[0] == "delta") == TEXT
+    assert items[-1] == ("done", TEXT, "ok")
+    assert stub.requests[-1]["stream"] is True
+
+
+def test_key_change_closes_old_client(stub, monkeypatch):
+    old = _run_on_llm_loop(llm_client._client())
+    monkeypatch.setenv("OPENAI_API_KEY", "other-key")
+    new = _run_on_llm_loop(llm_client._client())
+    assert new is not old
+    assert old.is_closed() and not new.is_closed()
+
+
+def test_stream_semaphore_wait_is_bounded(stub, monkeypatch):
+    # 동시 호출 슬롯이 모두 차 있으면 timeout_s + 1 안에 timeout 으로 끝나야 한다
+    _run_on_llm_loop(llm_client._client())
+    monkeypatch.setitem(llm_client._STATE, "sem", asyncio.Semaphore(0))
+
+    async def collect():
+        return [item async for item in llm_client.llm_stream_async("sys", {"q": 4}, timeout_s=0.2)]
+
+    items = asyncio.run(asyncio.wait_for(collect(), timeout=5))
+    assert items == [("done", None, "timeout")]
+    assert stub.requests == []
@@ -0,0 +1,38 @@
+# tests/test_llm_telemetry.py
+# 호출 계측: 키 없음도 호출로 기록, fallback 은 LLM 내용 없이 응답한 곳에서 집계
+import pytest
+
+from services import fleet_agent, llm_client
+from services.llm_telemetry import LLMTelemetry
+
+
+@pytest.fixture
+def telemetry(monkeypatch):
+    t = LLMTelemetry()
+    monkeypatch.setattr(llm_client, "LLM_TELEMETRY", t)
+    monkeypatch.setattr(fleet_agent, "LLM_TELEMETRY", t)
+    return t
+
+
+def test_no_key_call_is_recorded(telemetry, monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    assert llm_client.llm_text("sys", {"q": 1}, tag="t") == (None, "no_key")
+    row = telemetry.snapshot()["byTag"]["t"]
+    assert row["calls"] == 1 and row["no_key"] == 1
+
+
+def test_fallbacks_counted_where_served(telemetry):
+    payload = {"totalCandidates": 1, "top": [{"id": "S1/1", "score": 0.9}]}
+    fleet_agent._fleet_llm_result(payload, None, "timeout")   # 규칙 기반 요약
+    fleet_agent._fleet_llm_result(payload, None, "no_key")    # 키 없음 안내
+    fleet_agent._fleet_llm_result(payload, "not json", "ok")  # 파싱 실패 안내
+    fleet_agent._fleet_llm_result(payload, '{"summary": "s"}', "ok")
+    row = telemetry.snapshot()["byTag"]["fleet_prioritize"]
+    assert row["fallbacks"] == 3 and row["parseFailures"] == 1
+
+
+def test_record_trim_extra_chunks():
+    t = LLMTelemetry()
+    t.record_trim("agent_batch", extra_chunks=3)
+    row = t.snapshot()["byTag"]["agent_batch"]
+    assert row["trimmedCalls"] == 1 and row["extraChunks"] == 3 and row["itemsDropped"] == 0
@@ -0,0 +1,77 @@
+# tests/test_procurement_crn.py
+# 공통 난수(CRN): 시나리오/업체가 같은 사건 표본과 원격복구 난수를 쓰고, 표본은 한 번만 뽑는다
+import numpy as np
+import pytest
+
+from services import sim_procurement
+from services.procurement_agent import ProcurementAgentRequest, recommend_provider
+from services.sim_procurement import (
+    ProviderProfile, _provider_rows_km, get_incident_sample, run_replications, run_scenarios,
+)
+from services.traffic import avg_speed_kmh
+
+PROVIDERS = [
+    ProviderProfile(name="A", baseLat=37.50, baseLon=126.90, slaMinutes=30),
+    ProviderProfile(name="B", baseLat=37.55, baseLon=127.05, remoteRecoveryRate=0.2, slaMinutes=45),
+]
+MODES = ["free", "normal", "congested"]
+
+
+@pytest.fixture(scope="module")
+def twins():
+    rng = np.random.default_rng(8)
+    return [
+        {"stationId": f"S{i}", "chargerId": "01", "lat": 37.45 + 0.2 * a, "lon": 126.85 + 0.3 * b}
+        for i, (a, b) in enumerate(rng.random((300, 2)).tolist())
+    ]
+
+
+@pytest.fixture
+def sample_calls(monkeypatch):
+    calls = []
+    real = sim_procurement._sample_incidents
+
+    def counted(rng, valid, n):
+        calls.append(n)
+        return real(rng, valid, n)
+
+    monkeypatch.setattr(sim_procurement, "_sample_incidents", counted)
+    monkeypatch.setattr(sim_procurement, "_SAMPLES", type(sim_procurement._SAMPLES)())
+    return calls
+
+
+def test_sample_cached_by_version_seed_n(twins, sample_calls):
+    a = get_incident_sample(twins, 1000, 5)
+    assert get_incident_sample(twins, 1000, 5) is a
+    assert all(not x.flags.writeable for x in a)
+    assert get_incident_sample(twins, 1000, 6) is not a
+    assert get_incident_sample(twins, 999, 5) is not a
+    assert len(sample_calls) == 3
+
+
+def test_scenarios_share_sample(twins, sample_calls):
+    boards = run_scenarios(twins, PROVIDERS, MODES, 5000, seed=21)
+    assert len(sample_calls) == 1
+
+    by = {m: {r["provider"]: r for r in boards[m]} for m in MODES}
+    for p in PROVIDERS:
+        remote = {by[m][p.name]["remote_recovery_count"] for m in MODES}
+        assert len(remote) == 1
+        # 같은 사건 → ETA 분위수는 속도 비율만큼만 다르다
+        ratio = avg_speed_kmh("normal") / avg_speed_kmh("free")
+        assert by["free"][p.name]["eta_p90_min"] == pytest.approx(by["normal"][p.name]["eta_p90_min"] * ratio, abs=0.11)
+        rates = [by[m][p.name]["sla_hit_rate"] for m in MODES]
+        assert rates == sorted(rates, reverse=True)  # free ≥ normal ≥ congested (표본 잡음 없음)
+
+
+def test_recommend_samples_once(twins, sample_calls):
+    recommend_provider(twins, ProcurementAgentRequest(providers=PROVIDERS, nIncidents=2000, seed=3))
+    assert len(sample_calls) == 1
+
+
+def test_replications_share_draws_across_modes(twins):
+    rows_km = _provider_rows_km(twins, PROVIDERS)
+    reps = run_replications(rows_km, PROVIDERS, 800, MODES, 10, seed=2)
+    rc = [reps[m]["remote_recovery_count"] for m in MODES]
+    assert np.array_equal(rc[0], rc[1]) and np.array_equal(rc[1], rc[2])
+    assert (reps["free"]["sla_hit_rate"] >= reps["congested"]["sla_hit_rate"]).all()
@@ -0,0 +1,108 @@
+# tests/test_result_cache.py
+# 결과 캐시: single-flight, TTL 만료, LRU 축출, 예외는 캐시하지 않음
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from services import result_cache
+from services.autopilot_agent import KST, AutopilotRequest, run_autopilot
+from services.result_cache import ResultCache, canonical_key
+
+
+class _Clock:
+    def __init__(self):
+        self.t = 1000.0
+
+    def __call__(self):
+        return self.t
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = _Clock()
+    monkeypatch.setattr(result_cache.time, "monotonic", c)
+    return c
+
+
+def test_key_is_order_independent():
+    assert canonical_key("ns", 1, {"a": 1, "b": 2}) == canonical_key("ns", 1, {"b": 2, "a": 1})
+    assert canonical_key("ns", 1, {"a": 1}) != canonical_key("ns", 2, {"a": 1})
+
+
+def test_single_flight():
+    c = ResultCache(ttl_s=60)
+    calls = []
+    gate = threading.Event()
+
+    def slow():
+        calls.append(1)
+        gate.wait(5)
+        return {"v": 42}
+
+    out = [None] * 8
+    threads = [threading.Thread(target=lambda i=i: out.__setitem__(i, c.get_or_compute("ns", 1, {}, slow)))
+               for i in range(8)]
+    for t in threads:
+        t.start()
+    deadline = time.monotonic() + 5
+    while c.stats()["coalesced"] < 7 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    gate.set()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert all(o is out[0] for o in out)
+    s = c.stats()
+    assert (s["misses"], s["coalesced"], s["inflight"]) == (1, 7, 0)
+
+
+def test_ttl_expiry(clock):
+    c = ResultCache(ttl_s=10)
+    n = iter(range(100))
+    assert c.get_or_compute("ns", 1, {}, lambda: next(n)) == 0
+    clock.t += 9.9
+    assert c.get_or_compute("ns", 1, {}, lambda: next(n)) == 0
+    clock.t += 0.2
+    assert c.get_or_compute("ns", 1, {}, lambda: next(n)) == 1
+    assert c.stats()["hits"] == 1
+
+
+def test_lru_eviction(clock):
+    c = ResultCache(max_entries=2, ttl_s=60)
+    c.get_or_compute("ns", 1, {"k": "a"}, lambda: "a")
+    c.get_or_compute("ns", 1, {"k": "b"}, lambda: "b")
+    c.get_or_compute("ns", 1, {"k": "a"}, lambda: "x")  # a 최근 사용
+    c.get_or_compute("ns", 1, {"k": "c"}, lambda: "c")  # b 축출
+    assert c.stats()["evictions"] == 1
+    assert c.get_or_compute("ns", 1, {"k": "a"}, lambda: "new") == "a"
+    assert c.get_or_compute("ns", 1, {"k": "b"}, lambda: "new") == "new"
+
+
+def test_exception_not_cached():
+    c = ResultCache()
+
+    def boom():
+        raise RuntimeError("x")
+
+    with pytest.raises(RuntimeError):
+        c.get_or_compute("ns", 1, {}, boom)
+    assert c.stats()["inflight"] == 0
+    assert c.get_or_compute("ns", 1, {}, lambda: 5) == 5
+
+
+def test_autopilot_uses_given_now():
+    # 캐시 키에 넣은 분 단위 시각으로 계산해야 같은 키 = 같은 결과
+    upd = datetime(2026, 1, 1, 9, 0, tzinfo=KST)
+    twins = [{
+        "stationId": "S1", "chargerId": "01", "lat": 37.5, "lon": 127.0,
+        "signals": {"statusCode": 4, "statUpdDt": upd.strftime("%Y%m%d%H%M%S")},
+        "derived": {"health": "DOWN", "downProb6h": 0.9},
+    }]
+    req = AutopilotRequest(minDownMinutes=0)
+    a = run_autopilot(twins, req, upd + timedelta(minutes=60))
+    b = run_autopilot(twins, req, upd + timedelta(minutes=120))
+    assert a.cases and b.cases
+    assert (a.cases[0].downMinutes, b.cases[0].downMinutes) == (60, 120)
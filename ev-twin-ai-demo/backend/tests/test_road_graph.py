@@ -0,0 +1,91 @@
+# tests/test_road_graph.py
+# 양방향 Dijkstra == 단방향 최단시간 트리, 교통 버전이 바뀌면 트리 캐시 무효화
+import numpy as np
+import pytest
+
+from services import road_graph
+from services.road_graph import RoadGraph
+
+
+def _grid_graph(n=12, seed=0):
+    """n x n 격자, 대부분 양방향 + 일부 일방통행, 링크 길이 무작위"""
+    rng = np.random.default_rng(seed)
+    node = lambda r, c: r * n + c
+    src, dst = [], []
+    for r in range(n):
+        for c in range(n):
+            for dr, dc in ((0, 1), (1, 0)):
+                if r + dr < n and c + dc < n:
+                    a, b = node(r, c), node(r + dr, c + dc)
+                    src.append(a); dst.append(b)
+                    if rng.random() > 0.15:
+                        src.append(b); dst.append(a)
+    m = len(src)
+    lat = 37.5 + np.repeat(np.arange(n), n) * 0.002
+    lon = 127.0 + np.tile(np.arange(n), n) * 0.002
+    g = RoadGraph([f"L{i}" for i in range(m)], np.array(src), np.array(dst),
+                  rng.uniform(50, 400, m), lat, lon)
+    speeds = {f"L{i}": float(v) for i, v in enumerate(rng.uniform(5, 60, m))}
+    g.apply_speeds(speeds, "v1")
+    return g, speeds
+
+
+def test_bidirectional_matches_tree():
+    g, _ = _grid_graph()
+    rng = np.random.default_rng(1)
+    for s in rng.integers(0, g.n_nodes, 10).tolist():
+        tree = g.tree_from(s)
+        for t in rng.integers(0, g.n_nodes, 20).tolist():
+            bi = g.shortest_time_s(s, t)
+            if np.isfinite(tree[t]):
+                assert bi == pytest.approx(tree[t], rel=1e-9)
+            else:
+                assert bi == float("inf")
+
+
+def test_unreachable_is_inf():
+    g = RoadGraph(["a"], np.array([0]), np.array([1]), np.array([100.0]),
+                  np.array([37.5, 37.51, 37.52]), np.array([127.0, 127.0, 127.0]))
+    g.apply_speeds({}, "v1")
+    assert g.shortest_time_s(1, 0) == float("inf")
+    assert np.isinf(g.tree_from(0)[2])
+
+
+def test_tree_cache_invalidated_on_traffic_version():
+    g, speeds = _grid_graph()
+    t1 = g.tree_from(0)
+    assert g.tree_from(0) is t1  # 같은 버전 → 캐시
+
+    g.apply_speeds({k: v / 2 for k, v in speeds.items()}, "v2")
+    t2 = g.tree_from(0)
+    assert t2 is not t1
+    finite = np.isfinite(t1) & (t1 > 0)
+    assert np.allclose(t2[finite], 2 * t1[finite])  # 모든 링크 속도 절반 → 시간 두 배
+
+
+def test_tree_cache_lru_bound(monkeypatch):
+    monkeypatch.setattr(road_graph, "TREE_CACHE_SIZE", 4)
+    g, _ = _grid_graph(n=5)
+    for s in range(10):
+        g.tree_from(s)
+    assert len(g._trees) == 4
+    assert [k[0] for k in g._trees] == [6, 7, 8, 9]
+
+
+def test_get_road_graph_reapplies_on_tsv_change(tmp_path, monkeypatch):
+    g, _ = _grid_graph(n=4)
+    tsv = tmp_path / "link_traffic.tsv"
+    tsv.write_text("link_id\tspeed\nL0\t10\n", encoding="utf-8")
+    monkeypatch.setattr(road_graph, "LINK_TRAFFIC_PATH", tsv)
+    monkeypatch.setitem(road_graph._GRAPH, "graph", g)
+
+    assert road_graph.get_road_graph() is g
+    v1 = g.version
+    w1 = g.weight_s[0]
+    g.tree_from(0)
+
+    tsv.write_text("link_id\tspeed\nL0\t20.0\n", encoding="utf-8")
+    road_graph.get_road_graph()
+    assert g.version != v1
+    assert g.weight_s[0] == pytest.approx(w1 / 2)
+    assert not any(k[1] == v1 for k in g._trees)
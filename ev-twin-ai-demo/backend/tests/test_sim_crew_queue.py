@@ -0,0 +1,76 @@
+# tests/test_sim_crew_queue.py
+# 크루 대기열: 손으로 계산한 작은 예, crews=1 vs 사실상 무한 크루, 크루가 늘면 대기는 줄기만 한다
+import numpy as np
+import pytest
+
+from services.sim_crew_queue import CrewQueueSimRequest, _simulate_provider, run_crew_queue_sim
+from services.sim_procurement import ProviderProfile
+
+
+@pytest.fixture(scope="module")
+def twins():
+    rng = np.random.default_rng(2)
+    return [
+        {"stationId": f"S{i}", "chargerId": "01", "lat": 37.45 + 0.2 * a, "lon": 126.85 + 0.3 * b,
+         "derived": {"downProb6h": float(p)}}
+        for i, (a, b, p) in enumerate(rng.random((200, 3)).tolist())
+    ]
+
+
+def test_single_crew_hand_computed():
+    # 이동 10 + 작업 30 + 복귀 10 = 크루 50분 점유. 0, 1, 2분 도착 → 출발 0, 50, 100
+    arrive = np.array([0.0, 1.0, 2.0])
+    r = _simulate_provider(arrive, np.full(3, 10.0), np.zeros(3, bool), 1, 30.0, True)
+    assert r["wait"].tolist() == [0.0, 49.0, 98.0]
+    assert r["response"].tolist() == [10.0, 59.0, 108.0]
+    assert r["busy_total"] == 150.0
+    assert r["max_queue"] == 2
+
+    # 복귀 없음 → 40분 점유
+    r = _simulate_provider(arrive, np.full(3, 10.0), np.zeros(3, bool), 1, 30.0, False)
+    assert r["wait"].tolist() == [0.0, 39.0, 78.0]
+
+
+def test_remote_recovery_skips_crew():
+    arrive = np.array([0.0, 1.0, 2.0])
+    r = _simulate_provider(arrive, np.full(3, 10.0), np.array([False, True, False]), 1, 30.0, True)
+    assert r["wait"].tolist() == [0.0, 0.0, 48.0]
+    assert r["response"][1] == 0.0
+
+
+def test_one_crew_vs_unlimited(twins):
+    base = dict(days=2.0, incidentsPerDay=300.0, serviceMinutes=45.0, seed=4)
+    prov = lambda c: ProviderProfile(name=f"c{c}", baseLat=37.5, baseLon=127.0, crews=c, slaMinutes=60)
+    res = run_crew_queue_sim(twins, CrewQueueSimRequest(providers=[prov(1), prov(10_000)], **base))
+    board = {r["crews"]: r for r in res["scoreboard"]}
+
+    inf = board[10_000]
+    assert inf["queue_wait_mean_min"] == 0.0 and inf["max_queue"] == 0
+    one = board[1]
+    assert one["queue_wait_mean_min"] > 60.0  # 300건/일 x ~(45+이동)분 ≫ 1440분 → 과부하
+    assert one["crew_utilization"] > 0.95
+    assert one["sla_hit_rate"] < inf["sla_hit_rate"]
+    # 같은 사건 흐름(공통 난수) → 원격 복구 건수도 같다
+    assert one["remote_recovery_count"] == inf["remote_recovery_count"]
+
+
+def test_wait_non_increasing_in_crews(twins):
+    req = CrewQueueSimRequest(
+        providers=[ProviderProfile(name=f"c{c}", baseLat=37.5, baseLon=127.0, crews=c) for c in (1, 2, 3, 5, 8)],
+        days=3.0, incidentsPerDay=150.0, seed=9,
+    )
+    board = sorted(run_crew_queue_sim(twins, req)["scoreboard"], key=lambda r: r["crews"])
+    waits = [r["queue_wait_mean_min"] for r in board]
+    assert all(a >= b for a, b in zip(waits, waits[1:])), waits
+
+
+def test_unlimited_crews_response_is_travel(twins):
+    # 대기 0 → 응답시간 분위수 == 이동시간 분위수(원격 복구는 0)
+    req = CrewQueueSimRequest(
+        providers=[ProviderProfile(name="inf", baseLat=37.5, baseLon=127.0, crews=10_000, remoteRecoveryRate=0.0)],
+        days=1.0, incidentsPerDay=500.0, seed=1, trafficMode="free",
+    )
+    r = run_crew_queue_sim(twins, req)["scoreboard"][0]
+    assert r["dispatched"] == r["incidents"]
+    assert r["queue_wait_p90_min"] == 0.0
+    assert r["response_p90_min"] < 60.0  # 서울 시내 자유 흐름 이동
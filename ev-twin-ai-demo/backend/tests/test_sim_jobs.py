@@ -0,0 +1,130 @@
+# tests/test_sim_jobs.py
+# 시뮬레이션 job: 대기 중 취소, 실행 중 취소, 조기 종료, TTL 정리, SSE 이벤트 이름
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from services import sim_jobs
+from services.sim_jobs import ProcurementSimJobRequest, cancel_job, get_job, job_events, submit_procurement_sim_job
+from services.sim_procurement import ProviderProfile
+
+
+@pytest.fixture(autouse=True)
+def executor(monkeypatch):
+    ex = ThreadPoolExecutor(max_workers=1, thread_name_prefix="test-job")
+    monkeypatch.setattr(sim_jobs, "_EXECUTOR", ex)
+    yield ex
+    ex.shutdown(wait=True)
+
+
+@pytest.fixture(scope="module")
+def twins():
+    rng = np.random.default_rng(0)
+    return [
+        {"stationId": f"S{i}", "chargerId": "01", "lat": 37.45 + 0.2 * a, "lon": 126.85 + 0.3 * b}
+        for i, (a, b) in enumerate(rng.random((300, 2)).tolist())
+    ]
+
+
+def _wait(job_id, timeout=20.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = get_job(job_id)
+        if job["status"] in sim_jobs.TERMINAL:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job not finished: {get_job(job_id)}")
+
+
+def test_cancel_while_queued_never_runs():
+    gate = threading.Event()
+    seen = []
+
+    def blocker(job_id, twins, req):
+        gate.wait(10)
+        sim_jobs._update(job_id, status="done")
+
+    def runner(job_id, twins, req):
+        seen.append(get_job(job_id)["status"])
+
+    first = sim_jobs._submit("t", blocker, [], SimpleNamespace(replications=1))["jobId"]
+    second = sim_jobs._submit("t", runner, [], SimpleNamespace(replications=1))["jobId"]
+    assert cancel_job(second)["status"] == "queued"
+    gate.set()
+
+    assert _wait(first)["status"] == "done"
+    job = _wait(second)
+    assert job["status"] == "cancelled"
+    assert seen == []
+    assert job["expiresAt"] is not None
+
+
+def test_cancel_while_running(twins):
+    providers = [ProviderProfile(name=n, baseLat=37.5, baseLon=127.0) for n in "AB"]
+    req = ProcurementSimJobRequest(providers=providers, nIncidents=20000, replications=5000,
+                                   batchSize=2, earlyStop=False, workers=1, seed=1)
+    job_id = submit_procurement_sim_job(twins, req)["jobId"]
+    deadline = time.monotonic() + 10
+    while (get_job(job_id)["partial"] is None) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    cancel_job(job_id)
+    job = _wait(job_id)
+    assert job["status"] == "cancelled"
+    assert job["result"] is None
+    assert 0 < job["progress"]["done"] < req.replications
+
+
+def test_early_stop_when_winner_settles(twins):
+    providers = [
+        ProviderProfile(name="near", baseLat=37.55, baseLon=127.0, remoteRecoveryRate=0.9, slaMinutes=90),
+        ProviderProfile(name="far", baseLat=35.1, baseLon=129.0, remoteRecoveryRate=0.0, slaMinutes=10),
+    ]
+    req = ProcurementSimJobRequest(providers=providers, nIncidents=200, replications=1000,
+                                   batchSize=10, minReplications=20, workers=1, seed=2)
+    job = _wait(submit_procurement_sim_job(twins, req)["jobId"])
+    assert job["status"] == "done" and job["stoppedEarly"]
+    assert job["result"]["replications"] == 20
+    assert job["result"]["scoreboard"][0]["provider"] == "near"
+
+
+def test_no_early_stop_runs_all(twins):
+    providers = [ProviderProfile(name=n, baseLat=37.5, baseLon=127.0) for n in "AB"]
+    req = ProcurementSimJobRequest(providers=providers, nIncidents=50, replications=30,
+                                   batchSize=7, earlyStop=False, workers=1, seed=3)
+    job = _wait(submit_procurement_sim_job(twins, req)["jobId"])
+    assert job["status"] == "done" and not job["stoppedEarly"]
+    assert job["result"]["replications"] == 30
+
+
+def test_ttl_purge(monkeypatch):
+    monkeypatch.setattr(sim_jobs, "JOB_TTL_S", 0.05)
+    job_id = sim_jobs._submit("t", lambda j, t, r: sim_jobs._update(j, status="done"), [],
+                              SimpleNamespace(replications=1))["jobId"]
+    assert _wait(job_id)["status"] == "done"
+    time.sleep(0.1)
+    assert get_job(job_id) is None
+    assert job_id not in sim_jobs._JOBS
+
+
+def test_sse_named_events(twins):
+    providers = [ProviderProfile(name=n, baseLat=37.5, baseLon=127.0) for n in "AB"]
+    req = ProcurementSimJobRequest(providers=providers, nIncidents=50, replications=20,
+                                   batchSize=5, earlyStop=False, workers=1, seed=4)
+    job_id = submit_procurement_sim_job(twins, req)["jobId"]
+
+    async def collect(jid):
+        return [c async for c in job_events(jid, poll_s=0.01)]
+
+    chunks = asyncio.run(collect(job_id))
+    names = [c.split("\n", 1)[0] for c in chunks]
+    assert all(n in ("event: partial", "event: final") for n in names)
+    assert names[-1] == "event: final" and names.count("event: final") == 1
+    assert '"status": "done"' in chunks[-1]
+
+    missing = asyncio.run(collect("nope"))
+    assert missing == ['event: final\ndata: {"jobId": "nope", "status": "not_found"}\n\n']
@@ -0,0 +1,78 @@
+# tests/test_sim_procurement.py
+# 벡터화 엔진 == 예전 사건 x 업체 파이썬 루프 (같은 표본/난수, 고정 seed)
+import numpy as np
+import pytest
+
+from services.sim_procurement import (
+    SEV_DOWN, ProcurementSimRequest, ProviderProfile, get_incident_sample, run_procurement_sim,
+)
+from services.traffic import estimate_eta_min
+
+
+@pytest.fixture(scope="module")
+def twins():
+    rng = np.random.default_rng(0)
+    return [
+        {"stationId": f"S{i}", "chargerId": "01", "lat": 37.45 + 0.2 * a, "lon": 126.85 + 0.3 * b}
+        for i, (a, b) in enumerate(rng.random((300, 2)).tolist())
+    ]
+
+
+PROVIDERS = [
+    ProviderProfile(name="A", baseLat=37.50, baseLon=126.90, slaMinutes=30),
+    ProviderProfile(name="B", baseLat=37.55, baseLon=127.05, remoteRecoveryRate=0.2, slaMinutes=45),
+    ProviderProfile(name="C", baseLat=37.60, baseLon=127.00, remoteRecoveryRate=0.6, slaMinutes=20),
+]
+
+
+def _loop_scoreboard(twins, req):
+    """예전 run_procurement_sim 루프 그대로 (random 대신 같은 표본/난수를 받아 씀)"""
+    idx, sev, u = get_incident_sample(twins, req.nIncidents, req.seed)
+    board = []
+    for p in req.providers:
+        etas, met, remote_ok = [], 0, 0
+        for i, s, r in zip(idx.tolist(), sev.tolist(), u.tolist()):
+            t = twins[i]
+            remote_prob = p.remoteRecoveryRate * (0.5 if s == SEV_DOWN else 1.0)
+            if r < remote_prob:
+                eta = 0.0
+                remote_ok += 1
+            else:
+                eta = estimate_eta_min(p.baseLat, p.baseLon, t["lat"], t["lon"], req.trafficMode)
+            etas.append(eta)
+            if eta <= p.slaMinutes:
+                met += 1
+        etas_sorted = sorted(etas)
+        n = len(etas_sorted)
+        board.append({
+            "provider": p.name,
+            "sla_minutes": p.slaMinutes,
+            "sla_hit_rate": round(met / max(n, 1), 3),
+            "eta_p50_min": round(etas_sorted[int(0.50 * (n - 1))] if n else 0.0, 1),
+            "eta_p90_min": round(etas_sorted[int(0.90 * (n - 1))] if n else 0.0, 1),
+            "remote_recovery_count": remote_ok,
+        })
+    board.sort(key=lambda x: (-x["sla_hit_rate"], x["eta_p90_min"]))
+    return board
+
+
+@pytest.mark.parametrize("mode", ["free", "normal", "congested"])
+@pytest.mark.parametrize("n", [1, 7, 2000])
+def test_matches_scalar_loop(twins, mode, n):
+    req = ProcurementSimRequest(providers=PROVIDERS, nIncidents=n, trafficMode=mode, seed=11)
+    got = run_procurement_sim(twins, req)
+    assert got["trafficMode"] == mode and got["nIncidents"] == n
+    assert got["scoreboard"] == _loop_scoreboard(twins, req)
+
+
+def test_same_seed_same_result(twins):
+    req = ProcurementSimRequest(providers=PROVIDERS, nIncidents=500, seed=3)
+    assert run_procurement_sim(twins, req) == run_procurement_sim(twins, req)
+    other = run_procurement_sim(twins, req.model_copy(update={"seed": 4}))
+    assert other != run_procurement_sim(twins, req)
+
+
+def test_zero_incidents(twins):
+    res = run_procurement_sim(twins, ProcurementSimRequest(providers=PROVIDERS, nIncidents=0, seed=1))
+    assert [r["sla_hit_rate"] for r in res["scoreboard"]] == [0.0, 0.0, 0.0]
+    assert all(r["eta_p90_min"] == 0.0 for r in res["scoreboard"])
@@ -0,0 +1,51 @@
+# tests/test_sim_procurement_concurrency.py
+# 같은 seed 요청을 스레드/프로세스에서 동시에 돌려도 순차 실행과 결과가 같은지 확인
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from services.sim_procurement import ProcurementSimRequest, ProviderProfile, run_procurement_sim
+
+N_JOBS = 32
+WORKERS = 8
+
+
+def _job(args):
+    twins, req_json = args
+    return run_procurement_sim(twins, ProcurementSimRequest.model_validate_json(req_json))
+
+
+@pytest.fixture(scope="module")
+def jobs():
+    rng = np.random.default_rng(0)
+    twins = [
+        {"stationId": f"S{i}", "chargerId": "01", "lat": 37.45 + 0.2 * a, "lon": 126.85 + 0.3 * b}
+        for i, (a, b) in enumerate(rng.random((2000, 2)).tolist())
+    ]
+    providers = [
+        ProviderProfile(name="A", baseLat=37.50, baseLon=126.90, slaMinutes=30),
+        ProviderProfile(name="B", baseLat=37.55, baseLon=127.05, remoteRecoveryRate=0.2, slaMinutes=30),
+    ]
+    modes = ["free", "normal", "congested"]
+    return [
+        (twins, ProcurementSimRequest(
+            providers=providers, nIncidents=20000, trafficMode=modes[k % 3], seed=k % 5,
+        ).model_dump_json())
+        for k in range(N_JOBS)
+    ]
+
+
+@pytest.fixture(scope="module")
+def expected(jobs):
+    return [_job(j) for j in jobs]
+
+
+def test_threads_match_sequential(jobs, expected):
+    with ThreadPoolExecutor(max_workers=WORKERS) as ex:
+        assert list(ex.map(_job, jobs)) == expected
+
+
+def test_processes_match_sequential(jobs, expected):
+    with ProcessPoolExecutor(max_workers=min(WORKERS, 4)) as ex:
+        assert list(ex.map(_job, jobs)) == expected
@@ -0,0 +1,84 @@
+# tests/test_sim_replications.py
+# 반복 실행: t 기반 신뢰구간 커버리지, 반복 1회(퇴화) 처리, 1위 확률, 워커 수와 무관한 결과
+import numpy as np
+import pytest
+
+from services.sim_procurement import (
+    ProviderProfile, _provider_rows_km, _t_quantile, run_replications, summarize_replications,
+)
+from services.traffic import eta_min_from_km
+
+PROVIDERS = [
+    ProviderProfile(name="A", baseLat=37.50, baseLon=126.90, remoteRecoveryRate=0.3, slaMinutes=30),
+    ProviderProfile(name="B", baseLat=37.60, baseLon=127.10, remoteRecoveryRate=0.5, slaMinutes=30),
+]
+
+
+@pytest.fixture(scope="module")
+def rows_km():
+    rng = np.random.default_rng(5)
+    twins = [
+        {"stationId": f"S{i}", "chargerId": "01", "lat": 37.45 + 0.2 * a, "lon": 126.85 + 0.3 * b}
+        for i, (a, b) in enumerate(rng.random((400, 2)).tolist())
+    ]
+    return _provider_rows_km(twins, PROVIDERS)
+
+
+def _true_hit_rate(rows_km, k, mode="normal"):
+    # 트윈 균등 샘플, severity 균등(DOWN 1/3 은 원격 확률 절반). SLA 안이면 무조건 hit, 밖이면 원격 복구일 때만
+    near = (eta_min_from_km(rows_km[k], mode) <= PROVIDERS[k].slaMinutes).mean()
+    remote = PROVIDERS[k].remoteRecoveryRate * (1 / 3 * 0.5 + 2 / 3)
+    return near + (1 - near) * remote
+
+
+def test_t_quantile_close_to_table():
+    # 양측 95% / 99% t 표 값
+    for df, exp in ((1, 12.706), (2, 4.303), (3, 3.182), (5, 2.571), (10, 2.228), (30, 2.042)):
+        assert _t_quantile(0.975, df) == pytest.approx(exp, rel=0.01)
+    for df, exp in ((1, 63.657), (2, 9.925), (4, 4.604), (10, 3.169)):
+        assert _t_quantile(0.995, df) == pytest.approx(exp, rel=0.02)
+
+
+def test_ci_coverage(rows_km):
+    truth = [_true_hit_rate(rows_km, k) for k in range(len(PROVIDERS))]
+    trials, covered = 200, np.zeros(len(PROVIDERS))
+    for s in range(trials):
+        reps = run_replications(rows_km, PROVIDERS, 60, ["normal"], 8, seed=1000 + s)["normal"]
+        for row in summarize_replications(PROVIDERS, reps, 0.95):
+            k = [p.name for p in PROVIDERS].index(row["provider"])
+            lo, hi = row["sla_hit_rate_ci"]
+            covered[k] += lo <= truth[k] <= hi
+    rate = covered / trials
+    assert ((rate > 0.88) & (rate < 0.995)).all(), rate
+
+
+def test_single_replication_degenerate(rows_km):
+    reps = run_replications(rows_km, PROVIDERS, 100, ["normal"], 1, seed=3)["normal"]
+    rows = summarize_replications(PROVIDERS, reps, 0.95)
+    for row in rows:
+        for m in ("sla_hit_rate", "eta_p50_min", "eta_p90_min"):
+            lo, hi = row[f"{m}_ci"]
+            assert lo == hi == pytest.approx(row[m], abs=0.1)
+            assert np.isfinite([lo, hi]).all()
+    assert sorted(r["p_rank_first"] for r in rows) == [0.0, 1.0]
+
+
+def test_p_rank_first():
+    # 반복별로 1위 업체를 지정: A 가 3번, B 가 1번 (동률이면 p90 낮은 쪽)
+    reps = {
+        "sla_hit_rate": np.array([[0.9, 0.8], [0.9, 0.8], [0.7, 0.7], [0.6, 0.9]]),
+        "eta_p50_min": np.zeros((4, 2)),
+        "eta_p90_min": np.array([[10, 10], [10, 10], [5, 9], [10, 10]], dtype=float),
+        "remote_recovery_count": np.zeros((4, 2)),
+    }
+    rows = {r["provider"]: r for r in summarize_replications(PROVIDERS, reps, 0.95)}
+    assert rows["A"]["p_rank_first"] == 0.75
+    assert rows["B"]["p_rank_first"] == 0.25
+
+
+def test_workers_do_not_change_results(rows_km):
+    one = run_replications(rows_km, PROVIDERS, 200, ["normal", "free"], 12, seed=9, workers=1)
+    many = run_replications(rows_km, PROVIDERS, 200, ["normal", "free"], 12, seed=9, workers=4)
+    for mode in one:
+        for k in one[mode]:
+            assert np.array_equal(one[mode][k], many[mode][k])
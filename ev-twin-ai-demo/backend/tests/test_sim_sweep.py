@@ -0,0 +1,89 @@
+# tests/test_sim_sweep.py
+# 민감도 격자: 요청 검증(422), montecarlo == run_procurement_sim, SLA 축 단조, 파레토 최소점
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+
+from services.sim_procurement import ProcurementSimRequest, ProviderProfile, run_procurement_sim
+from services.sim_sweep import MAX_GRID_POINTS, ProcurementSweepRequest, _minimal_points, run_procurement_sweep
+
+PROVIDER = ProviderProfile(name="P", baseLat=37.52, baseLon=126.98, remoteRecoveryRate=0.3, slaMinutes=40)
+
+
+@pytest.fixture(scope="module")
+def twins():
+    rng = np.random.default_rng(4)
+    return [
+        {"stationId": f"S{i}", "chargerId": "01", "lat": 37.45 + 0.2 * a, "lon": 126.85 + 0.3 * b,
+         "derived": {"downProb6h": float(p)}}
+        for i, (a, b, p) in enumerate(rng.random((250, 3)).tolist())
+    ]
+
+
+def test_grid_too_large_is_422():
+    import main
+
+    body = {
+        "provider": PROVIDER.model_dump(),
+        "remoteRecoveryRates": [i / 1000 for i in range(1000)],
+        "slaMinutes": list(range(1, 22)),  # 1000 x 21 = 21000
+    }
+    assert 1000 * 21 > MAX_GRID_POINTS
+    r = TestClient(main.app).post("/sim/procurement/sweep", json=body)
+    assert r.status_code == 422
+    assert "grid too large" in r.text
+
+
+def test_montecarlo_rejects_crews_axis():
+    with pytest.raises(ValidationError, match="ignores crews"):
+        ProcurementSweepRequest(provider=PROVIDER, crews=[1, 2], engine="montecarlo")
+    # 값 1개는 허용, auto 는 crew_queue 로 간다
+    ProcurementSweepRequest(provider=PROVIDER, crews=[2], engine="montecarlo")
+    ProcurementSweepRequest(provider=PROVIDER, crews=[1, 2], engine="auto")
+
+
+def test_montecarlo_point_matches_procurement_sim(twins):
+    req = ProcurementSweepRequest(provider=PROVIDER, nIncidents=3000, seed=7, trafficModes=["normal", "free"])
+    res = run_procurement_sweep(twins, req)
+    assert res["engine"] == "montecarlo" and res["gridPoints"] == 2
+    for point in res["surface"]:
+        sim = run_procurement_sim(twins, ProcurementSimRequest(
+            providers=[PROVIDER], nIncidents=3000, seed=7, trafficMode=point["trafficMode"],
+        ))["scoreboard"][0]
+        for k in ("sla_hit_rate", "eta_p50_min", "eta_p90_min"):
+            assert point[k] == sim[k]
+
+
+def test_sla_and_rate_axes_monotone(twins):
+    req = ProcurementSweepRequest(
+        provider=PROVIDER, nIncidents=2000, seed=1,
+        remoteRecoveryRates=[0.0, 0.2, 0.5], slaMinutes=[10, 20, 40, 80],
+    )
+    res = run_procurement_sweep(twins, req)
+    hit = np.array([p["sla_hit_rate"] for p in res["surface"]]).reshape(3, 4)
+    assert (np.diff(hit, axis=1) >= 0).all()
+    assert (np.diff(hit, axis=0) >= 0).all()
+
+
+def test_crew_queue_crews_axis(twins):
+    req = ProcurementSweepRequest(
+        provider=PROVIDER, crews=[1, 2, 6], slaMinutes=[60], days=2.0, incidentsPerDay=150.0, seed=3,
+    )
+    res = run_procurement_sweep(twins, req)
+    assert res["engine"] == "crew_queue"
+    hits = [p["sla_hit_rate"] for p in sorted(res["surface"], key=lambda p: p["crews"])]
+    assert hits == sorted(hits) and hits[0] < hits[-1]
+
+
+def test_minimal_points():
+    slas = np.array([10.0, 20.0, 30.0])
+    # crews 2 x rate 2 x sla 3
+    hit = np.array([
+        [[0.1, 0.5, 0.95], [0.2, 0.92, 0.99]],
+        [[0.3, 0.5, 0.99], [0.93, 0.99, 1.0]],
+    ])
+    pts = _minimal_points(hit, slas, 0.9)
+    # (0,0)→sla 30, (0,1)→20, (1,0)→30 (crews 만 더 많고 sla 개선 없음 → 지배됨), (1,1)→10
+    assert sorted(pts) == [(0, 0, 2), (0, 1, 1), (1, 1, 0)]
+    assert _minimal_points(hit, slas, 1.01) == []
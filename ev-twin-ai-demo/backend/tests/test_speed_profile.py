@@ -0,0 +1,276 @@
+# tests/test_speed_profile.py
+# 시간대 속도 프로파일: build_speed_profile.py(저장소 루트)로 작은 프로파일을 만들고 services/speed_profile 조회 확인
+# - 버킷 계산(KST, 하루 넘김), 최근접 링크 → 권역 → 전체 평균 fallback, MIN_KMH, 구간 속도(조화평균)
+# - profile 모드 배선: 조달 시뮬레이션 / sweep / 거점 배치 / 출동 계획이 per-pair 속도를 쓰는지
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import build_speed_profile as bsp
+import traffic_store
+from services import dispatch_planner
+from services import speed_profile as sp
+from services.depot_location import DepotPlacementRequest, _travel_min
+from services.dispatch_planner import DispatchCase, DispatchPlanRequest, plan_dispatch
+from services.distance_matrix import twin_coords
+from services.sim_crew_queue import CrewQueueSimRequest, run_crew_queue_sim
+from services.sim_procurement import (
+    SEV_DOWN, ProcurementSimRequest, ProviderProfile, _provider_rows_km, get_incident_sample, run_procurement_sim,
+    run_replications,
+)
+from services.sim_sweep import ProcurementSweepRequest, run_procurement_sweep
+from services.speed_profile import KST
+from services.traffic import avg_speed_kmh, estimate_eta_min, haversine_km, haversine_matrix_km
+
+T8 = int(datetime(2026, 3, 2, 8, 0, tzinfo=KST).timestamp())  # 08:00 KST → 버킷 96
+B8 = 96
+
+# link_id → 좌표. 1·4 는 같은 권역(약 400m 간격), 2 는 약 7km 떨어진 권역, 3 은 표본 없음
+LINKS = {
+    "1": (37.5034, 127.0034),
+    "4": (37.5034, 127.0079),
+    "2": (37.5534, 127.0534),
+    "3": (37.6034, 127.1034),
+}
+NEAR1 = (37.5036, 127.0036)
+NEAR2 = (37.5536, 127.0536)
+# (link_id, ts, speed). NaN / 0 / 모르는 링크는 버려져야 함
+SAMPLES = [
+    ("1", T8, 20.0), ("1", T8 + 300, 40.0),
+    ("4", T8, 30.0), ("4", T8 + 600, 2.0),
+    ("2", T8, 60.0),
+    ("2", T8 + 300, float("nan")), ("3", T8, 0.0), ("999", T8, 80.0),
+]
+
+
+@pytest.fixture
+def profile(tmp_path, monkeypatch):
+    link_map = tmp_path / "link_map.tsv"
+    link_map.write_text(
+        "stationId\tlink_id\tlat\tlon\n" + "".join(f"S{l}\t{l}\t{a}\t{b}\n" for l, (a, b) in LINKS.items()),
+        encoding="utf-8",
+    )
+    ts_dir = tmp_path / "traffic_ts"
+    monkeypatch.setattr(traffic_store, "TS_DIR", ts_dir)
+    monkeypatch.setattr(bsp, "TS_DIR", ts_dir)
+    monkeypatch.setattr(bsp, "IN_LINK_MAP", link_map)
+    for l, ts, v in SAMPLES:
+        traffic_store.append_timeseries([{"link_id": l, "speed": v, "travel_time": 1}], ts)
+
+    out = tmp_path / "speed_profile"
+    meta = bsp.build(out)
+    monkeypatch.setattr(sp, "PROFILE_DIR", out)
+    monkeypatch.setattr(sp, "_STATE", {k: None for k in sp._STATE})
+    return out, meta
+
+
+@pytest.fixture
+def no_profile(tmp_path, monkeypatch):
+    monkeypatch.setattr(sp, "PROFILE_DIR", tmp_path / "missing")
+    monkeypatch.setattr(sp, "_STATE", {k: None for k in sp._STATE})
+
+
+def _glob(b):
+    return float(np.load(sp.PROFILE_DIR / "areas.npy")[-1, b])
+
+
+# ---------- build_speed_profile.py ----------
+def test_build_links_areas_meta(profile):
+    out, meta = profile
+    ids = meta["link_ids"]
+    assert ids == ["1", "2", "3", "4"] and meta["samples"] == 5 and meta["bucketMin"] == 5
+
+    links = np.load(out / "links.npy")
+    assert links.shape == (4, 288) and links.dtype == np.float16
+    row = {l: links[i] for i, l in enumerate(ids)}
+    assert row["1"][B8] == 20 and row["1"][B8 + 1] == 40 and np.isnan(row["1"][B8 + 2])
+    assert row["4"][B8 + 2] == 2 and row["2"][B8] == 60 and np.isnan(row["2"][B8 + 1])
+    assert np.isnan(row["3"]).all()
+    assert np.isfinite(links).sum() == 5
+
+    areas = np.load(out / "areas.npy")
+    assert areas.shape == (meta["areas"] + 1, 288) and np.isfinite(areas).all()
+    glob = areas[-1].astype(np.float64)
+    assert glob[B8] == pytest.approx((20 + 30 + 60) / 3, rel=1e-3)
+    assert glob[B8 + 1] == 40 and glob[B8 + 2] == 2
+    # 빈 버킷은 하루 주기 선형 보간 → 전부 [2, 40] 사이, 자정 넘어서도 이어짐
+    assert glob.min() >= 2 and glob.max() <= 40 + 1e-6
+
+    assert not list(out.glob("*.tmp*"))
+
+
+def test_build_link_grid(profile):
+    out, meta = profile
+    lg = np.load(out / "link_grid.npy")
+    assert lg.shape == (meta["linkRows"], meta["linkCols"])
+
+    def cell(lat, lon):
+        return lg[int((lat - meta["lat0"]) // meta["linkCellDeg"]), int((lon - meta["lon0"]) // meta["linkCellDeg"])]
+
+    ids = meta["link_ids"]
+    assert ids[cell(*NEAR1)] == "1"
+    assert ids[cell(*NEAR2)] == "2"
+    assert cell(*LINKS["3"]) == -1  # 표본 없는 링크는 최근접 후보가 아님
+    assert set(np.unique(lg)) <= {-1, 0, 1, 3}
+
+
+def test_fill_circular():
+    row = np.full(8, np.nan)
+    row[1], row[5] = 10.0, 30.0
+    out = bsp._fill_circular(row)
+    assert out.tolist() == [15.0, 10.0, 15.0, 20.0, 25.0, 30.0, 25.0, 20.0]
+    assert np.isnan(bsp._fill_circular(np.full(3, np.nan))).all()
+
+
+# ---------- 버킷 계산 ----------
+def test_bucket_of():
+    assert sp.bucket_of(datetime(2026, 3, 2, 8, 7, tzinfo=KST)) == 97
+    assert sp.bucket_of(datetime(2026, 3, 2, 8, 7)) == 97                                  # naive = KST
+    assert sp.bucket_of(datetime(2026, 3, 1, 23, 4, tzinfo=timezone.utc)) == 96            # UTC → KST 08:04
+    assert sp.bucket_of(datetime(2026, 3, 2, 0, 0, tzinfo=timezone(timedelta(hours=9)))) == 0
+    assert 0 <= sp.bucket_of() < 288
+
+
+def test_bucket_of_minutes(no_profile):
+    got = sp.bucket_of_minutes([0.0, 4.99, 5.0, 1439.0, 1440.0, 1445.5])
+    assert got.tolist() == [0, 0, 1, 287, 288, 289]  # 하루 넘김은 조회 쪽에서 % 288
+    assert int(sp.bucket_of_minutes(8 * 60.0)) == B8
+
+
+# ---------- 조회 ----------
+def test_point_kmh_link_then_area_then_global(profile):
+    assert float(sp.point_kmh(*NEAR1, B8)) == 20.0
+    assert float(sp.point_kmh(*NEAR1, B8 + 1)) == 40.0
+    # 링크 표본 없는 버킷 → 권역 속도 (링크 1·4 권역: 표본 없는 버킷은 전체 평균)
+    assert float(sp.point_kmh(*NEAR1, B8 - 5)) == float(sp.area_kmh(*NEAR1, B8 - 5)) == pytest.approx(_glob(B8 - 5))
+    assert float(sp.area_kmh(*NEAR1, B8)) == 25.0                     # 권역 = (20 + 30) / 2
+    # 하루 넘긴 버킷은 288 로 나머지
+    assert float(sp.point_kmh(*NEAR1, B8 + 288)) == 20.0
+    # 격자 밖 → 전체 평균 행
+    assert float(sp.point_kmh(35.1, 129.0, B8)) == pytest.approx(_glob(B8))
+    # MIN_KMH 아래로는 안 내려감 (링크 4 의 2 km/h)
+    assert float(sp.point_kmh(*LINKS["4"], B8 + 2)) == sp.MIN_KMH
+
+
+def test_vectorized_lookups(profile):
+    lats = np.array([NEAR1[0], NEAR2[0], 35.1])
+    lons = np.array([NEAR1[1], NEAR2[1], 129.0])
+    buckets = np.array([B8, B8, B8 + 1])
+    v = sp.point_kmh(lats, lons, buckets)
+    assert v.tolist() == [20.0, 60.0, pytest.approx(_glob(B8 + 1))]
+
+    trip = sp.trip_kmh(*NEAR1, lats[:2], lons[:2], B8)
+    assert trip == pytest.approx([20.0, 2 / (1 / 20 + 1 / 60)])
+
+    m = sp.pair_kmh(lats, lons, lats[:2], lons[:2], B8)
+    assert m.shape == (3, 2)
+    for i in range(3):
+        assert m[i] == pytest.approx(sp.trip_kmh(lats[i], lons[i], lats[:2], lons[:2], B8))
+    assert float(sp.network_kmh(B8)) == pytest.approx(_glob(B8))
+
+
+def test_reload_and_missing(profile):
+    out, _ = profile
+    assert sp.load_speed_profile()
+    v = sp.profile_version()
+    (out / "meta.json").unlink()
+    assert sp.profile_version() is None
+    assert sp.point_kmh(*NEAR1, B8) is None and sp.trip_kmh(*NEAR1, *NEAR2, B8) is None
+    assert sp.pair_kmh([1.0], [1.0], [1.0], [1.0], B8) is None and sp.network_kmh(B8) is None
+    assert v is not None
+
+
+def test_estimate_eta_profile_vs_fallback(profile, monkeypatch):
+    dist = haversine_km(*NEAR1, *NEAR2)
+    depart = datetime(2026, 3, 2, 8, 2, tzinfo=KST)
+    assert estimate_eta_min(*NEAR1, *NEAR2, "profile", depart) == pytest.approx(dist / 30.0 * 60.0, rel=1e-6)
+
+    monkeypatch.setattr(sp, "PROFILE_DIR", sp.PROFILE_DIR / "gone")
+    assert estimate_eta_min(*NEAR1, *NEAR2, "profile", depart) == pytest.approx(dist / 32.0 * 60.0)
+    assert avg_speed_kmh("profile") == 32.0
+
+
+# ---------- profile 모드 배선 ----------
+PROVIDER = ProviderProfile(name="P", baseLat=NEAR1[0], baseLon=NEAR1[1], remoteRecoveryRate=0.2, slaMinutes=15)
+
+
+@pytest.fixture
+def twins():
+    rng = np.random.default_rng(3)
+    pts = [NEAR1, NEAR2, LINKS["4"], (37.58, 127.02), (35.1, 129.0)]
+    return [
+        {"stationId": f"S{i}", "chargerId": "01", "lat": lat, "lon": lon, "derived": {"downProb6h": float(p)}}
+        for i, ((lat, lon), p) in enumerate(zip([pts[k % len(pts)] for k in range(40)], rng.random(40)))
+    ]
+
+
+def test_procurement_sim_uses_pair_speeds(profile, twins):
+    req = ProcurementSimRequest(providers=[PROVIDER], nIncidents=3000, seed=5, trafficMode="profile", startHour=8.0)
+    row = run_procurement_sim(twins, req)["scoreboard"][0]
+
+    idx, sev, u = get_incident_sample(twins, 3000, 5)
+    lats, lons, _ = twin_coords(twins)
+    kmh = sp.trip_kmh(PROVIDER.baseLat, PROVIDER.baseLon, lats[idx], lons[idx], B8)
+    remote = u < PROVIDER.remoteRecoveryRate * np.where(sev == SEV_DOWN, 0.5, 1.0)
+    eta = np.where(remote, 0.0, _provider_rows_km(twins, [PROVIDER])[0, idx] / np.maximum(kmh, 5.0) * 60.0)
+    assert row["sla_hit_rate"] == round(float((eta <= PROVIDER.slaMinutes).mean()), 3)
+    assert row["eta_p90_min"] == round(float(np.sort(eta)[int(0.9 * (len(eta) - 1))]), 1)
+
+    other = run_procurement_sim(twins, req.model_copy(update={"startHour": 3.0}))["scoreboard"][0]
+    assert other["eta_p90_min"] != row["eta_p90_min"]  # 버킷이 다르면 속도가 다르다
+
+
+def test_replications_use_kmh_rows(twins):
+    rows_km = _provider_rows_km(twins, [PROVIDER])
+    free = run_replications(rows_km, [PROVIDER], 500, ["free"], 4, seed=1)["free"]
+    prof = run_replications(
+        rows_km, [PROVIDER], 500, ["profile"], 4, seed=1, kmh_rows=np.full(rows_km.shape, avg_speed_kmh("free")),
+    )["profile"]
+    for k in free:
+        assert np.array_equal(free[k], prof[k])
+
+
+def test_sweep_profile_matches_sims(profile, twins):
+    mc = run_procurement_sweep(twins, ProcurementSweepRequest(
+        provider=PROVIDER, nIncidents=3000, seed=5, trafficModes=["profile"], startHour=8.0,
+    ))["surface"][0]
+    sim = run_procurement_sim(twins, ProcurementSimRequest(
+        providers=[PROVIDER], nIncidents=3000, seed=5, trafficMode="profile", startHour=8.0,
+    ))["scoreboard"][0]
+    assert (mc["sla_hit_rate"], mc["eta_p90_min"]) == (sim["sla_hit_rate"], sim["eta_p90_min"])
+
+    kw = dict(days=1.0, incidentsPerDay=300.0, seed=4, trafficMode="profile", startHour=7.5)
+    cq = run_procurement_sweep(twins, ProcurementSweepRequest(
+        provider=PROVIDER, engine="crew_queue", trafficModes=["profile"],
+        **{k: v for k, v in kw.items() if k != "trafficMode"},
+    ))["surface"][0]
+    crew = run_crew_queue_sim(twins, CrewQueueSimRequest(providers=[PROVIDER], **kw))["scoreboard"][0]
+    assert (cq["sla_hit_rate"], cq["eta_p90_min"]) == (crew["sla_hit_rate"], crew["response_p90_min"])
+
+
+def test_depot_travel_uses_pair_speeds(profile):
+    o = np.array([NEAR1[0], NEAR2[0]]), np.array([NEAR1[1], NEAR2[1]])
+    d = np.array([NEAR2[0], 35.1, NEAR1[0]]), np.array([NEAR2[1], 129.0, NEAR1[1]])
+    eta, engine = _travel_min(*o, *d, DepotPlacementRequest(trafficMode="profile", startHour=8.0))
+    km = haversine_matrix_km(*o, *d)
+    assert engine == "straight_line"
+    assert eta == pytest.approx(km / sp.pair_kmh(*o, *d, B8) * 60.0)
+
+
+def test_dispatch_uses_pair_speeds(profile, monkeypatch):
+    monkeypatch.setattr(dispatch_planner, "bucket_of", lambda: B8)
+    case = DispatchCase(stationId="S2", chargerId="01", name="s2", lat=NEAR2[0], lon=NEAR2[1], score=1.0)
+    depot = ProviderProfile(name="D", baseLat=NEAR1[0], baseLon=NEAR1[1])
+    res = plan_dispatch(DispatchPlanRequest(items=[case], depots=[depot], trafficMode="profile", timeBudgetMs=0))
+    (step,) = res.routes[0].steps
+    assert step.arriveMin == pytest.approx(haversine_km(*NEAR1, *NEAR2) / 30.0 * 60.0, abs=0.05)
+
+
+def test_recommend_rejects_profile_scenario_422():
+    import main
+
+    body = {"providers": [PROVIDER.model_dump()], "scenarios": [{"name": "peak", "trafficMode": "profile"}]}
+    r = TestClient(main.app).post("/agent/procurement/recommend", json=body)
+    assert r.status_code == 422 and "profile" in r.text
@@ -0,0 +1,88 @@
+# tests/test_traffic_store.py
+# 교통 저장소(저장소 루트 traffic_store.py): link_traffic.tsv 원자적 교체, 시간 파티션 .bin append/읽기, 보존 정책
+import csv
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+import traffic_store as ts_mod
+from traffic_store import KST, TS_DTYPE, append_timeseries, apply_retention, read_timeseries, write_traffic_tsv
+
+T0 = int(datetime(2026, 3, 2, 8, 30, tzinfo=KST).timestamp())  # 2026-03-02 08시(KST) 파티션
+
+
+@pytest.fixture
+def ts_dir(tmp_path, monkeypatch):
+    d = tmp_path / "traffic_ts"
+    monkeypatch.setattr(ts_mod, "TS_DIR", d)
+    return d
+
+
+def _rows(n, speed=30.0):
+    return [{"link_id": str(1000 + i), "speed": str(speed + i), "travel_time": "12"} for i in range(n)]
+
+
+def _read_tsv(path):
+    with open(path, encoding="utf-8") as f:
+        return list(csv.DictReader(f, delimiter="\t"))
+
+
+def test_tsv_replaced_atomically(tmp_path):
+    path = tmp_path / "data" / "link_traffic.tsv"
+    write_traffic_tsv(path, _rows(3))
+    write_traffic_tsv(path, _rows(2, speed=50.0))
+    assert _read_tsv(path) == _rows(2, speed=50.0)
+    assert [p.name for p in path.parent.iterdir()] == ["link_traffic.tsv"]  # tmp 파일 안 남음
+
+
+def test_tsv_failed_write_keeps_previous(tmp_path):
+    path = tmp_path / "link_traffic.tsv"
+    write_traffic_tsv(path, _rows(3))
+    with pytest.raises(ValueError):
+        write_traffic_tsv(path, _rows(1) + [{"link_id": "x", "speed": "1", "travel_time": "1", "extra": "?"}])
+    assert _read_tsv(path) == _rows(3)  # 반쯤 쓴 파일은 tmp 에만 있고 교체되지 않음
+
+
+def test_hourly_partitions_and_partial_record(ts_dir):
+    p1 = append_timeseries(_rows(3), T0)
+    p1b = append_timeseries(_rows(2, speed=40.0) + [{"link_id": "A-1", "speed": "1", "travel_time": "1"}], T0 + 600)
+    p2 = append_timeseries(_rows(1), T0 + 3600)
+    assert p1 == p1b and p1.name == "2026030208.bin" and p2.name == "2026030209.bin"
+
+    rec = read_timeseries(p1)
+    assert rec.dtype == TS_DTYPE and len(rec) == 5  # 숫자가 아닌 link_id 는 건너뜀
+    assert rec["ts"].tolist() == [T0] * 3 + [T0 + 600] * 2
+    assert rec["speed"].tolist() == [30.0, 31.0, 32.0, 40.0, 41.0]
+
+    with open(p1, "ab") as f:  # 쓰다 끊긴 레코드 조각
+        f.write(b"\x01" * (TS_DTYPE.itemsize // 2))
+    assert len(read_timeseries(p1)) == 5
+
+
+def test_retention_by_age(ts_dir, monkeypatch):
+    monkeypatch.setattr(ts_mod, "RETENTION_DAYS", 1.0)
+    for h in (0, 20, 25, 47, 48):
+        append_timeseries(_rows(1), T0 + h * 3600)
+    now = T0 + 48 * 3600
+    assert apply_retention(now) == 2  # 24시간보다 오래된 0h, 20h 파티션
+    left = sorted(p.name for p in ts_dir.glob("*.bin"))
+    assert left == ["2026030309.bin", "2026030407.bin", "2026030408.bin"]
+
+
+def test_retention_by_size_keeps_current(ts_dir, monkeypatch):
+    monkeypatch.setattr(ts_mod, "RETENTION_DAYS", 30.0)
+    for h in range(4):
+        append_timeseries(_rows(100), T0 + h * 3600)  # 파티션당 2400바이트
+    monkeypatch.setattr(ts_mod, "MAX_TS_MB", 5000 / (1024 * 1024))
+    assert apply_retention(T0 + 3 * 3600) == 2
+    assert sorted(p.name for p in ts_dir.glob("*.bin")) == ["2026030210.bin", "2026030211.bin"]
+
+    monkeypatch.setattr(ts_mod, "MAX_TS_MB", 0.0)
+    apply_retention(T0 + 3 * 3600)
+    assert [p.name for p in ts_dir.glob("*.bin")] == ["2026030211.bin"]  # 지금 쓰는 파티션은 남김
+    assert np.array_equal(read_timeseries(ts_dir / "2026030211.bin")["link_id"], np.arange(1000, 1100))
+
+
+def test_retention_without_dir(ts_dir):
+    assert apply_retention(T0) == 0
@@ -0,0 +1,84 @@
+# tests/test_vertex_cache.py
+# 보간점 열 캐시: mtime/size 같으면 해시 생략, touch 만 되면 sha256 으로 재사용, 내용 바뀌면 무효
+import os
+
+import numpy as np
+import pytest
+
+from services import vertex_cache
+from services.vertex_cache import VERTEX_CACHE_FORMAT, file_sha256, load_vertex_cache, save_vertex_cache
+
+
+@pytest.fixture
+def files(tmp_path):
+    src = tmp_path / "vertex.xlsx"
+    src.write_bytes(b"original vertex file")
+    cache = src.with_suffix(".npz")
+    cols = {
+        "link_ids": np.array(["A", "B"]),
+        "codes": np.array([0, 0, 1], dtype=np.int32),
+        "ver_seq": np.array([1, 2, 1], dtype=np.int64),
+        "x": np.array([1.0, 2.0, 3.0]),
+        "y": np.array([4.0, 5.0, 6.0]),
+    }
+    save_vertex_cache(cache, cols, src.stat(), file_sha256(src))
+    return src, cache, cols
+
+
+@pytest.fixture
+def hash_calls(monkeypatch):
+    calls = []
+
+    def counted(path):
+        calls.append(path)
+        return file_sha256(path)
+
+    monkeypatch.setattr(vertex_cache, "file_sha256", counted)
+    return calls
+
+
+def test_same_stat_skips_hash(files, hash_calls):
+    src, cache, cols = files
+    got = load_vertex_cache(src, cache)
+    assert hash_calls == []
+    for k, v in cols.items():
+        assert np.array_equal(got[k], v)
+
+
+def test_touched_source_verified_by_hash(files, hash_calls):
+    src, cache, _ = files
+    st = src.stat()
+    os.utime(src, ns=(st.st_atime_ns, st.st_mtime_ns + 5_000_000_000))
+
+    assert load_vertex_cache(src, cache) is not None
+    assert len(hash_calls) == 1
+    assert load_vertex_cache(src, cache) is not None  # refresh_stat 없음 → 다시 해시
+    assert len(hash_calls) == 2
+
+    assert load_vertex_cache(src, cache, refresh_stat=True) is not None
+    assert len(hash_calls) == 3
+    assert load_vertex_cache(src, cache) is not None  # 캐시의 mtime 갱신됨 → 해시 생략
+    assert len(hash_calls) == 3
+
+
+def test_changed_content_invalidates(files):
+    src, cache, _ = files
+    src.write_bytes(b"edited vertex file!!")
+    assert load_vertex_cache(src, cache) is None
+
+
+def test_format_bump_and_missing_cache(files, monkeypatch):
+    src, cache, _ = files
+    monkeypatch.setattr(vertex_cache, "VERTEX_CACHE_FORMAT", VERTEX_CACHE_FORMAT + 1)
+    assert load_vertex_cache(src, cache) is None
+    assert load_vertex_cache(src, cache.with_name("none.npz")) is None
+
+
+def test_road_graph_reads_shared_cache(files):
+    from services.road_graph import _load_vertex_arrays
+
+    src, _, _ = files
+    lid, seq, x, y = _load_vertex_arrays(src)
+    assert lid.tolist() == ["A", "A", "B"]
+    assert seq.tolist() == [1, 2, 1]
+    assert x.tolist() == [1.0, 2.0, 3.0]
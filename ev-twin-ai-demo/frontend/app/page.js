@@ -190,18 +190,35 @@ export default function Page() {
 
       pushEvent("Autopilot LLM 요약 요청");
 
-      const res = await fetch(`${API}/agent/fleet/autopilot/explain`, {
+      // SSE 스트림: partial(중간 파싱 결과)로 카드를 바로 채우고, final 로 확정
+      const res = await fetch(`${API}/agent/fleet/autopilot/explain/stream`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify({ cases: run.payload.cases, topK: 15 }),
       });
-
-      const explain = await res.json();
-      if (!res.ok) throw new Error(explain?.detail ?? JSON.stringify(explain));
-
-      setAutoRuns((prev) =>
-        prev.map((x) => (x.id === runId ? { ...x, explain } : x))
-      );
+      if (!res.ok || !res.body) throw new Error(await res.text());
+
+      const setExplain = (explain) =>
+        setAutoRuns((prev) => prev.map((x) => (x.id === runId ? { ...x, explain } : x)));
+
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buf = "";
+      for (;;) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buf += decoder.decode(value, { stream: true });
+        let cut;
+        while ((cut = buf.indexOf("\n\n")) !== -1) {
+          const block = buf.slice(0, cut);
+          buf = buf.slice(cut + 2);
+          const ev = block.match(/^event: (.*)$/m)?.[1];
+          const data = block.match(/^data: (.*)$/m)?.[1];
+          if (!data) continue;
+          if (ev === "partial") setExplain({ ...JSON.parse(data), streaming: true });
+          else if (ev === "final") setExplain(JSON.parse(data));
+        }
+      }
 
       pushEvent("Autopilot LLM 요약 완료");
     } catch (e) {
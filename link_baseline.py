@@ -0,0 +1,169 @@
+# =========================================================
+# link_baseline.py
+# - 링크별 · 시간대별 자유주행(free-flow) 속도 기준선
+# - P² 분위수 스케치(Jain & Chlamtac): 스케치 1개 = 마커 5개(높이/위치) + 표본 수
+#   → 이력이 아무리 길어도 링크당 메모리 고정
+# - 여러 스케치를 numpy 로 한 번에 갱신 (수집 1회 = 링크마다 표본 1개)
+# - 결과는 link_baseline.npz 로 저장(tmp → os.replace), 백엔드 services/traffic_baseline.py 가 읽음
+# - `python link_baseline.py` : traffic_ts/*.bin 이력으로 처음부터 다시 만들기
+# =========================================================
+import os
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+
+from traffic_store import BASELINE_PATH, TS_DIR, read_timeseries
+
+KST = timezone(timedelta(hours=9))
+FREEFLOW_Q = float(os.getenv("TRAFFIC_FREEFLOW_Q", "0.85"))  # 자유주행 속도로 볼 분위수
+TOD_BUCKETS = 24  # 시간대(KST 시) 버킷 + 마지막 1칸 = 하루 전체
+
+
+class P2Sketches:
+    """
+    (링크 × (TOD_BUCKETS + 1)) 개의 P² 스케치.
+    q: 마커 높이, n: 마커 위치(0부터), count: 표본 수. count < 5 이면 q 에 표본을 그대로 모아둔다
+    """
+
+    def __init__(self, p: float = FREEFLOW_Q, link_ids=None, q=None, n=None, count=None):
+        self.p = p
+        self.dn = np.array([0.0, p / 2, p, (1 + p) / 2, 1.0])
+        self.link_ids = list(link_ids or [])
+        self.index = {l: i for i, l in enumerate(self.link_ids)}
+        b = TOD_BUCKETS + 1
+        self.q = q if q is not None else np.zeros((0, b, 5))
+        self.n = n if n is not None else np.zeros((0, b, 5))
+        self.count = count if count is not None else np.zeros((0, b), dtype=np.int64)
+
+    def _rows(self, link_ids) -> np.ndarray:
+        new = [l for l in dict.fromkeys(link_ids) if l not in self.index]
+        if new:
+            for l in new:
+                self.index[l] = len(self.link_ids)
+                self.link_ids.append(l)
+            k, b = len(new), TOD_BUCKETS + 1
+            self.q = np.concatenate([self.q, np.zeros((k, b, 5))])
+            self.n = np.concatenate([self.n, np.zeros((k, b, 5))])
+            self.count = np.concatenate([self.count, np.zeros((k, b), dtype=np.int64)])
+        return np.fromiter((self.index[l] for l in link_ids), dtype=np.int64, count=len(link_ids))
+
+    def update(self, link_ids, speeds, ts: int):
+        """수집 1회분 (link_id 중복 없음). 속도가 NaN/0 이하인 표본은 버린다"""
+        speeds = np.asarray(speeds, dtype=np.float64)
+        ok = np.isfinite(speeds) & (speeds > 0)
+        if not ok.any():
+            return
+        rows = self._rows([l for l, m in zip(link_ids, ok) if m])
+        x = speeds[ok]
+        hour = datetime.fromtimestamp(ts, KST).hour
+        self._update_flat(rows, hour, x)
+        self._update_flat(rows, TOD_BUCKETS, x)
+
+    def _update_flat(self, rows: np.ndarray, bucket: int, x: np.ndarray):
+        c = self.count[rows, bucket]
+
+        # 초기 구간: 표본 5개가 모일 때까지 그대로 저장, 5개가 되면 정렬해서 마커로
+        init = c < 5
+        if init.any():
+            r = rows[init]
+            self.q[r, bucket, c[init]] = x[init]
+            self.count[r, bucket] += 1
+            done = r[self.count[r, bucket] == 5]
+            self.q[done, bucket] = np.sort(self.q[done, bucket], axis=1)
+            self.n[done, bucket] = np.arange(5.0)
+
+        m = ~init
+        if not m.any():
+            return
+        r, xv = rows[m], x[m]
+        q = self.q[r, bucket]
+        n = self.n[r, bucket]
+
+        # 표본이 들어갈 칸 k (q[k] <= x < q[k+1]) 와 양 끝 마커 갱신
+        k = np.sum(q[:, 1:4] <= xv[:, None], axis=1)
+        q[:, 0] = np.minimum(q[:, 0], xv)
+        q[:, 4] = np.maximum(q[:, 4], xv)
+        n += np.arange(5)[None, :] > k[:, None]
+        total = self.count[r, bucket] + 1
+        desired = (total - 1)[:, None] * self.dn[None, :]
+
+        # 가운데 마커 3개 위치/높이 보정 (포물선 예측, 범위를 벗어나면 선형)
+        for i in (1, 2, 3):
+            d = desired[:, i] - n[:, i]
+            move = ((d >= 1) & (n[:, i + 1] - n[:, i] > 1)) | ((d <= -1) & (n[:, i - 1] - n[:, i] < -1))
+            if not move.any():
+                continue
+            s = np.sign(d)
+            qp = q[:, i] + s / (n[:, i + 1] - n[:, i - 1]) * (
+                (n[:, i] - n[:, i - 1] + s) * (q[:, i + 1] - q[:, i]) / (n[:, i + 1] - n[:, i])
+                + (n[:, i + 1] - n[:, i] - s) * (q[:, i] - q[:, i - 1]) / (n[:, i] - n[:, i - 1])
+            )
+            q_adj = np.where(s > 0, q[:, i + 1], q[:, i - 1])
+            n_adj = np.where(s > 0, n[:, i + 1], n[:, i - 1])
+            ql = q[:, i] + s * (q_adj - q[:, i]) / (n_adj - n[:, i])
+            qn = np.where((q[:, i - 1] < qp) & (qp < q[:, i + 1]), qp, ql)
+            q[:, i] = np.where(move, qn, q[:, i])
+            n[:, i] = np.where(move, n[:, i] + s, n[:, i])
+
+        self.q[r, bucket] = q
+        self.n[r, bucket] = n
+        self.count[r, bucket] = total
+
+    def estimates(self) -> np.ndarray:
+        """(링크, 버킷) 분위수 추정. 표본 5개 미만이면 모인 표본의 분위수, 0개면 NaN"""
+        est = self.q[:, :, 2].copy()
+        small = self.count < 5
+        if small.any():
+            li, bi = np.nonzero(small)
+            for a, b in zip(li, bi):
+                c = self.count[a, b]
+                est[a, b] = np.quantile(self.q[a, b, :c], self.p) if c else np.nan
+        return est
+
+    def save(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp.npz")
+        np.savez(
+            tmp,
+            link_ids=np.array(self.link_ids, dtype=str),
+            q=self.q, n=self.n, count=self.count,
+            baseline=self.estimates().astype(np.float32),
+            p=np.float64(self.p),
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path, p: float = FREEFLOW_Q) -> "P2Sketches":
+        if not path.exists():
+            return cls(p)
+        with np.load(path) as z:
+            if float(z["p"]) != p or z["q"].shape[1] != TOD_BUCKETS + 1:
+                return cls(p)  # 분위수/버킷 설정이 바뀌었으면 새로 시작
+            return cls(p, z["link_ids"].tolist(), z["q"], z["n"], z["count"])
+
+
+def rebuild_from_timeseries(ts_dir: Path, out_path: Path, p: float = FREEFLOW_Q) -> P2Sketches:
+    """traffic_ts/*.bin 을 시간순으로 다시 먹여서 기준선 재생성"""
+    sk = P2Sketches(p)
+    for part in sorted(ts_dir.glob("*.bin")):
+        rec = read_timeseries(part)
+        for ts in np.unique(rec["ts"]):
+            r = rec[rec["ts"] == ts]
+            # 같은 초에 수집이 두 번 붙었으면 link_id 가 겹친다 → 등장 순번별로 나눠서 넣음
+            ids = r["link_id"]
+            order = np.argsort(ids, kind="stable")
+            s = ids[order]
+            pos = np.arange(len(s))
+            rank = np.empty(len(s), dtype=np.int64)
+            rank[order] = pos - np.maximum.accumulate(np.where(np.r_[True, s[1:] != s[:-1]], pos, 0))
+            for k in range(int(rank.max()) + 1 if len(rank) else 0):
+                rk = r[rank == k]
+                sk.update(rk["link_id"].astype(str).tolist(), rk["speed"], int(ts))
+    sk.save(out_path)
+    return sk
+
+
+if __name__ == "__main__":
+    sk = rebuild_from_timeseries(TS_DIR, BASELINE_PATH)
+    print(f"[OK] baseline: links={len(sk.link_ids)} samples={int(sk.count[:, TOD_BUCKETS].sum())} → {BASELINE_PATH}")
@@ -8,6 +8,8 @@
 #   (너 테스트 결과: EPSG 5181 median dist ≈ 117m)
 # - LINK_POINTS_PATH가 .xlsx 이므로 pandas.read_excel로 읽음 (dict 반환 방지/멀티시트 처리)
 # - station.tsv는 인코딩(utf-8/cp949/euc-kr) fallback + tsv/csv delimiter sniff
+# - LINK_VERTEX xlsx 파싱은 수 분 걸림 → 처음 한 번만 열(column) 배열 .npz 캐시로 변환
+#   (원본 sha256 기준, LINK_ID는 사전 인코딩). 이후 실행은 np.load 한 번 (`python make_tsv.py vertex-cache`: 변환만)
 #
 # 필요:
 #   pip install pyproj pandas openpyxl numpy
@@ -17,6 +19,7 @@
 #   pip install requests
 
 import os
+import sys
 import csv
 import time
 from pathlib import Path
@@ -37,6 +40,10 @@ try:
 except Exception as e:
     raise SystemExit("pandas가 필요합니다. `pip install pandas openpyxl` 후 다시 실행하세요.") from e
 
+# ====== 보간점 열 캐시 형식 (백엔드 services/vertex_cache.py 공용) ======
+sys.path.insert(0, str(Path(__file__).resolve().parent / "ev-twin-ai-demo" / "backend"))
+from services.vertex_cache import file_sha256, load_vertex_cache, save_vertex_cache  # noqa: E402
+
 # ====== (선택) 실시간 속도 조회용 ======
 try:
     import requests
@@ -55,6 +62,9 @@ STATION_TSV = DATA_DIR / "station.tsv"
 # ✅ 서울시 교통소통 "서비스링크 보간점 정보(LINK_VERTEX)" (xlsx)
 LINK_POINTS_PATH = DATA_DIR / "서비스링크 보간점 정보(LINK_VERTEX)_2025.xlsx"
 
+# ✅ 보간점 열 캐시 (원본 옆 같은 이름 .npz, services/road_graph.py 도 같이 읽음)
+LINK_POINTS_CACHE = LINK_POINTS_PATH.with_suffix(".npz")
+
 OUT_LINK_MAP = DATA_DIR / "link_map.tsv"
 OUT_TRAFFIC = DATA_DIR / "station_traffic.tsv"
 
@@ -187,40 +197,67 @@ def load_station_points() -> List[Dict]:
 # ============================================================
 # 링크 보간점 로딩 (엑셀 컬럼: LINK_ID, GRS80TM_X, GRS80TM_Y 확정)
 # ============================================================
-def load_link_points() -> Tuple[np.ndarray, List[str]]:
+def convert_link_vertex(src: Path) -> Dict[str, np.ndarray]:
     """
-    LINK_POINTS_PATH에서 보간점 좌표를 읽고,
-    KDTree용 numpy 배열(X,Y) + 각 점의 link_id 리스트를 반환
+    LINK_VERTEX xlsx → 열 배열
+    - 필요한 열만 문자열로 읽고, 숫자 변환은 열 단위(pd.to_numeric)로 한 번에
+    - LINK_ID는 사전 인코딩: link_ids(정렬된 고유값) + codes(int32)
+    - (LINK_ID, VER_SEQ) 순으로 정렬 → road_graph 가 그대로 링크별 폴리라인으로 씀
     """
-    rows = read_table_any(LINK_POINTS_PATH)
-
-    xs, ys, lids = [], [], []
-    for r in rows:
-        lid = get_col_any(r, ["LINK_ID"])
-        x_s = get_col_any(r, ["GRS80TM_X"])
-        y_s = get_col_any(r, ["GRS80TM_Y"])
-        if not lid or not x_s or not y_s:
-            continue
-        try:
-            x = float(x_s)
-            y = float(y_s)
-        except:
-            continue
-
-        lids.append(lid)
-        xs.append(x)
-        ys.append(y)
-
-    if len(lids) == 0:
-        sample_cols = list(rows[0].keys()) if rows else []
+    need = {"LINK_ID", "VER_SEQ", "GRS80TM_X", "GRS80TM_Y"}
+    df = pd.read_excel(src, sheet_name=0, engine="openpyxl", dtype=str,
+                       usecols=lambda c: str(c).strip() in need)
+    df.columns = [str(c).strip() for c in df.columns]
+    missing = {"LINK_ID", "GRS80TM_X", "GRS80TM_Y"} - set(df.columns)
+    if missing:
         raise SystemExit(
-            f"링크 보간점 파일에서 좌표를 못 읽음: {LINK_POINTS_PATH}\n"
-            f"첫 행 컬럼들: {sample_cols}\n"
+            f"링크 보간점 파일에 필요한 컬럼이 없음: {sorted(missing)} ({src})\n"
             f"→ 엑셀 컬럼명이 LINK_ID/GRS80TM_X/GRS80TM_Y인지 확인"
         )
 
-    pts = np.column_stack([np.array(xs, dtype=np.float64), np.array(ys, dtype=np.float64)])
-    return pts, lids
+    lid = df["LINK_ID"].fillna("").str.strip().to_numpy(dtype=str)
+    x = pd.to_numeric(df["GRS80TM_X"], errors="coerce").to_numpy(dtype=np.float64)
+    y = pd.to_numeric(df["GRS80TM_Y"], errors="coerce").to_numpy(dtype=np.float64)
+    if "VER_SEQ" in df.columns:
+        seq = pd.to_numeric(df["VER_SEQ"], errors="coerce").fillna(0).to_numpy(dtype=np.int64)
+    else:
+        seq = np.zeros(len(df), dtype=np.int64)
+
+    ok = (lid != "") & np.isfinite(x) & np.isfinite(y)
+    link_ids, codes = np.unique(lid[ok], return_inverse=True)
+    codes = codes.astype(np.int32)
+    seq, x, y = seq[ok], x[ok], y[ok]
+
+    order = np.lexsort((seq, codes))
+    return {"link_ids": link_ids, "codes": codes[order], "ver_seq": seq[order], "x": x[order], "y": y[order]}
+
+
+def load_link_vertex_columns(src: Path = LINK_POINTS_PATH, cache: Path = LINK_POINTS_CACHE) -> Dict[str, np.ndarray]:
+    """캐시가 원본과 같으면 그대로, 아니면 xlsx 변환 후 캐시 저장 (검사/저장 규칙은 services/vertex_cache.py)"""
+    cols = load_vertex_cache(src, cache, refresh_stat=True)
+    if cols is not None:
+        return cols
+
+    st = src.stat()
+    t0 = time.perf_counter()
+    cols = convert_link_vertex(src)
+    save_vertex_cache(cache, cols, st, file_sha256(src))
+    print(f"[OK] LINK_VERTEX cache -> {cache} (points={len(cols['codes'])}, "
+          f"links={len(cols['link_ids'])}, {time.perf_counter() - t0:.1f}s)")
+    return cols
+
+
+def load_link_points() -> Tuple[np.ndarray, np.ndarray]:
+    """
+    LINK_POINTS_PATH에서 보간점 좌표를 읽고(열 캐시 경유),
+    KDTree용 numpy 배열(X,Y) + 각 점의 link_id 배열을 반환
+    """
+    cols = load_link_vertex_columns()
+    if len(cols["codes"]) == 0:
+        raise SystemExit(f"링크 보간점 파일에서 좌표를 못 읽음: {LINK_POINTS_PATH}")
+
+    pts = np.column_stack([cols["x"], cols["y"]])
+    return pts, cols["link_ids"][cols["codes"]]
 
 
 # ============================================================
@@ -235,16 +272,16 @@ def build_kdtree(points_xy: np.ndarray):
 
 
 def nearest_link_id(
-    tree_obj, mode: str, points_xy: np.ndarray, lids: List[str], x: float, y: float
+    tree_obj, mode: str, points_xy: np.ndarray, lids: np.ndarray, x: float, y: float
 ) -> Tuple[str, float]:
     if mode == "scipy":
         dist, idx = tree_obj.query([x, y], k=1)
-        return lids[int(idx)], float(dist)
+        return str(lids[int(idx)]), float(dist)
 
     # numpy brute-force fallback (느림)
     d2 = np.sum((points_xy - np.array([x, y], dtype=np.float64)) ** 2, axis=1)
     idx = int(np.argmin(d2))
-    return lids[idx], float(np.sqrt(d2[idx]))
+    return str(lids[idx]), float(np.sqrt(d2[idx]))
 
 
 # ============================================================
@@ -303,6 +340,13 @@ def fetch_trafficinfo(link_id: str) -> Optional[Dict]:
 # main
 # ============================================================
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "vertex-cache":
+        if not LINK_POINTS_PATH.exists():
+            raise SystemExit(f"서비스링크 보간점 파일이 필요함: {LINK_POINTS_PATH}")
+        cols = load_link_vertex_columns()
+        print(f"[OK] {LINK_POINTS_CACHE} (points={len(cols['codes'])}, links={len(cols['link_ids'])})")
+        return
+
     if not STATION_TSV.exists():
         raise SystemExit(f"station.tsv 없음: {STATION_TSV}")
     if not LINK_POINTS_PATH.exists():
@@ -0,0 +1,118 @@
+# =========================================================
+# traffic_store.py
+# - 교통 수집 데이터 경로 + 저장 형식 (collect_link_traffic / link_baseline / build_speed_profile 공용)
+# - API 키 검사·HTTP 의존성 없음 → 오프라인 재생성 스크립트가 키 없이 import 가능
+# - link_traffic.tsv : tmp 파일에 쓰고 os.replace (원자적 교체)
+# - traffic_ts/YYYYMMDDHH.bin (KST 시간 단위) : (link_id, ts, speed, travel_time) 24바이트 레코드 append
+#   보존: TRAFFIC_TS_RETENTION_DAYS 지난 파티션 / TRAFFIC_TS_MAX_MB 넘는 오래된 파티션 삭제
+# =========================================================
+import csv
+import os
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+from dotenv import load_dotenv
+
+for _p in (Path(__file__).resolve().parent / ".env", Path(__file__).resolve().parent.parent / ".env"):
+    if _p.exists():
+        load_dotenv(_p)
+        break
+
+# -------------------------
+# 경로
+# -------------------------
+BASE_DIR = Path(os.getenv("EV_TWIN_BASE_DIR", r"D:\DigitalTwin\ev-twin-ai-demo"))
+DATA_DIR = BASE_DIR / "data"
+
+IN_LINK_MAP = DATA_DIR / "link_map.tsv"
+OUT_TRAFFIC = DATA_DIR / "link_traffic.tsv"
+TS_DIR = DATA_DIR / "traffic_ts"
+BASELINE_PATH = DATA_DIR / "link_baseline.npz"
+
+# -------------------------
+# 시계열 저장
+# -------------------------
+RETENTION_DAYS = float(os.getenv("TRAFFIC_TS_RETENTION_DAYS", "14"))
+MAX_TS_MB = float(os.getenv("TRAFFIC_TS_MAX_MB", "2048"))
+KST = timezone(timedelta(hours=9))
+
+# 레코드 24바이트. 파일 = 이 dtype 레코드를 이어 붙인 것 (np.fromfile 로 바로 읽힘)
+TS_DTYPE = np.dtype([("link_id", "<i8"), ("ts", "<i8"), ("speed", "<f4"), ("travel_time", "<f4")])
+
+
+def _float(v) -> float:
+    try:
+        return float(v) if v not in (None, "", "null") else float("nan")
+    except ValueError:
+        return float("nan")
+
+
+def write_traffic_tsv(path: Path, out_rows):
+    """tmp 파일에 쓰고 fsync 후 os.replace (같은 디렉터리 → 원자적 교체)"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8", newline="") as f:
+        w = csv.DictWriter(
+            f,
+            fieldnames=["link_id", "speed", "travel_time"],
+            delimiter="\t"
+        )
+        w.writeheader()
+        w.writerows(out_rows)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _partition(ts: int) -> Path:
+    return TS_DIR / (datetime.fromtimestamp(ts, KST).strftime("%Y%m%d%H") + ".bin")
+
+
+def append_timeseries(out_rows, ts: int) -> Path:
+    """수집 1회분을 시간 파티션 파일 끝에 붙인다 (숫자가 아닌 link_id 는 건너뜀)"""
+    rows = [r for r in out_rows if str(r["link_id"]).isdigit()]
+    rec = np.empty(len(rows), dtype=TS_DTYPE)
+    rec["link_id"] = [int(r["link_id"]) for r in rows]
+    rec["ts"] = ts
+    rec["speed"] = [_float(r["speed"]) for r in rows]
+    rec["travel_time"] = [_float(r["travel_time"]) for r in rows]
+
+    path = _partition(ts)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "ab") as f:
+        f.write(rec.tobytes())
+    return path
+
+
+def read_timeseries(path: Path) -> np.ndarray:
+    """파티션 1개 읽기. 쓰다 끊긴 마지막 레코드 조각은 버린다"""
+    raw = np.fromfile(path, dtype=np.uint8)
+    n = raw.size // TS_DTYPE.itemsize
+    return raw[: n * TS_DTYPE.itemsize].view(TS_DTYPE)
+
+
+def apply_retention(now_ts: int):
+    """보존 기간 지난 파티션 삭제 → 그래도 MAX_TS_MB 넘으면 오래된 것부터 삭제. return 삭제 수"""
+    if not TS_DIR.exists():
+        return 0
+    parts = sorted(TS_DIR.glob("*.bin"))  # 이름 = YYYYMMDDHH → 정렬 = 시간순
+    cutoff = datetime.fromtimestamp(now_ts - RETENTION_DAYS * 86400, KST).strftime("%Y%m%d%H")
+    removed = 0
+    keep = []
+    for p in parts:
+        if p.stem < cutoff:
+            p.unlink(missing_ok=True)
+            removed += 1
+        else:
+            keep.append(p)
+
+    total = sum(p.stat().st_size for p in keep)
+    limit = MAX_TS_MB * 1024 * 1024
+    for p in keep[:-1]:  # 지금 쓰는 파티션은 남긴다
+        if total <= limit:
+            break
+        total -= p.stat().st_size
+        p.unlink(missing_ok=True)
+        removed += 1
+    return removed